@@ -8,7 +8,11 @@ echo [Step 1] Checking & Installing Requirements...
 pip install -r requirements.txt
 
 echo.
-echo [Step 2] Launching the App...
+echo [Step 2] Applying Database Migrations...
+python -m backend.migrations
+
+echo.
+echo [Step 3] Launching the App...
 echo.
 streamlit run frontend/app.py
 
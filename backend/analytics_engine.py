@@ -0,0 +1,205 @@
+"""In-process columnar copy of the expense table for dashboard analytics.
+
+``ColumnarStore`` keeps every expense as NumPy arrays sorted by date:
+
+- ``expense_date`` as days since 1970-01-01 (int32), so a date range is two
+  binary searches giving one contiguous slice;
+- category, sub-category and normalized transaction type as int32 codes into
+  per-column dictionaries, so a filter compares integers and a group-by is a
+  ``bincount``;
+- ``amount`` in cents (int64), so sums are exact.
+
+It answers the same questions as db_helper's analytics functions, with the
+same filters and result shapes. db_helper loads it once and keeps it current
+from the change feed (see ANALYTICS ENGINE there).
+"""
+from datetime import date
+from decimal import Decimal
+import numpy as np
+
+
+EPOCH = date(1970, 1, 1).toordinal()
+CENT = Decimal("0.01")
+
+
+class Dictionary:
+    """Value <-> int32 code for one string column. Codes are never reused."""
+
+    def __init__(self):
+        self.values = []
+        self._codes = {}
+
+    def code(self, value):
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def codes(self, values):
+        """Codes of the known ``values``; unknown values match nothing."""
+        return np.array([self._codes[v] for v in values if v in self._codes], dtype=np.int32)
+
+    def codes_where(self, predicate):
+        return np.array([code for code, value in enumerate(self.values) if predicate(value)], dtype=np.int32)
+
+
+def _day(value):
+    if isinstance(value, str):
+        value = date.fromisoformat(value)
+    return value.toordinal() - EPOCH
+
+
+def _cents(value):
+    return int((Decimal(str(value)) * 100).to_integral_value())
+
+
+def _money(cents):
+    return (Decimal(int(cents)) / 100).quantize(CENT)
+
+
+class ColumnarStore:
+    """Sorted NumPy columns of the expense table.
+
+    Updates build new arrays and swap them in with one assignment, so a query
+    running meanwhile sees either the old rows or the new ones. Updates
+    themselves must not overlap; db_helper serialises them.
+    """
+
+    COLUMNS = ("id", "day", "category", "sub_category", "transaction_type", "type_norm", "amount", "has_amount")
+
+    def __init__(self):
+        self.version = None
+        self.source = None
+        self.categories = Dictionary()
+        self.sub_categories = Dictionary()
+        self.types = Dictionary()          # transaction_type as written
+        self.type_norms = Dictionary()     # LOWER(TRIM(transaction_type)), like transaction_type_norm
+        self.columns = self._encode([])
+
+    def __len__(self):
+        return len(self.columns["id"])
+
+    # --- LOADING ---
+    def _encode(self, rows):
+        n = len(rows)
+        columns = {
+            "id": np.empty(n, dtype=np.int64),
+            "day": np.empty(n, dtype=np.int32),
+            "category": np.empty(n, dtype=np.int32),
+            "sub_category": np.empty(n, dtype=np.int32),
+            "transaction_type": np.empty(n, dtype=np.int32),
+            "type_norm": np.empty(n, dtype=np.int32),
+            "amount": np.empty(n, dtype=np.int64),
+            "has_amount": np.empty(n, dtype=bool),
+        }
+        for i, row in enumerate(rows):
+            columns["id"][i] = row["id"]
+            columns["day"][i] = _day(row["expense_date"])
+            columns["category"][i] = self.categories.code(row["category"])
+            columns["sub_category"][i] = self.sub_categories.code(row["sub_category"])
+            columns["transaction_type"][i] = self.types.code(row["transaction_type"])
+            columns["type_norm"][i] = self.type_norms.code((row["transaction_type"] or "").strip().lower())
+            columns["has_amount"][i] = row["amount"] is not None
+            columns["amount"][i] = _cents(row["amount"]) if row["amount"] is not None else 0
+        order = np.lexsort((columns["id"], columns["day"]))
+        return {name: values[order] for name, values in columns.items()}
+
+    def load(self, rows, version, source=None):
+        # The dictionaries are kept: codes are never reused, so a query still
+        # reading the old columns decodes them correctly
+        self.columns = self._encode(rows)
+        self.version = version
+        self.source = source
+
+    def apply(self, changes):
+        """Apply one page of ``db_helper.expense_changes``."""
+        columns = self.columns
+        gone = [row["id"] for row in changes["deletes"]] + [row["id"] for row in changes["upserts"]]
+        if gone:
+            keep = ~np.isin(columns["id"], np.array(gone, dtype=np.int64))
+            if not keep.all():
+                columns = {name: values[keep] for name, values in columns.items()}
+        if changes["upserts"]:
+            new = self._encode(changes["upserts"])
+            # Merge the sorted new rows into place: one binary search, one copy per column
+            at = np.searchsorted(columns["day"], new["day"], side="right")
+            columns = {name: np.insert(values, at, new[name]) for name, values in columns.items()}
+        self.columns = columns
+        self.version = changes["next_since"]
+
+    # --- FILTERS ---
+    def _select(self, start_date=None, end_date=None, min_amount=None, max_amount=None,
+                categories=None, sub_category=None, transaction_types=None):
+        """The matching rows as ``{column: values}``, filtered like db_helper.build_expense_filter.
+
+        The date range is two binary searches on the sorted ``day`` column and
+        becomes a slice (no copy); the other filters combine into one mask.
+        """
+        columns = self.columns
+        day = columns["day"]
+        lo = 0 if start_date is None else int(np.searchsorted(day, _day(start_date), side="left"))
+        hi = len(day) if end_date is None else int(np.searchsorted(day, _day(end_date), side="right"))
+        window = {name: values[lo:max(lo, hi)] for name, values in columns.items()}
+
+        masks = []
+        if min_amount is not None:
+            masks.append(window["has_amount"] & (window["amount"] >= _cents(min_amount)))
+        if max_amount is not None:
+            masks.append(window["has_amount"] & (window["amount"] <= _cents(max_amount)))
+        if categories:
+            masks.append(np.isin(window["category"], self.categories.codes(categories)))
+        if sub_category:
+            # LIKE '%term%': match the (few) dictionary values, then compare codes
+            term = sub_category.lower()
+            masks.append(np.isin(window["sub_category"],
+                                 self.sub_categories.codes_where(lambda value: term in (value or "").lower())))
+        if transaction_types:
+            masks.append(np.isin(window["type_norm"],
+                                 self.type_norms.codes(t.strip().lower() for t in transaction_types)))
+        if not masks:
+            return window
+        mask = np.logical_and.reduce(masks)
+        return {name: values[mask] for name, values in window.items()}
+
+    # --- QUERIES ---
+    def _group(self, keys, rows, size):
+        """Total cents and row count per integer key, as arrays indexed by key."""
+        amounts = np.where(rows["has_amount"], rows["amount"], 0)
+        totals = np.bincount(keys, weights=amounts, minlength=size) if len(keys) else np.zeros(size)
+        return totals, np.bincount(keys, minlength=size)
+
+    def expense_totals(self, **filters):
+        rows = self._select(**filters)
+        totals, counts = self._group(rows["type_norm"], rows, len(self.type_norms.values))
+        by_type = sorted(({"transaction_type": self.type_norms.values[code], "total": _money(totals[code]),
+                           "count": int(counts[code])} for code in np.flatnonzero(counts)),
+                         key=lambda row: row["total"], reverse=True)
+        by_name = {row["transaction_type"]: float(row["total"]) for row in by_type}
+        return {
+            "total_income": by_name.get("income", 0.0),
+            "total_expense": by_name.get("expense", 0.0),
+            "count": int(counts.sum()),
+            "by_type": by_type,
+        }
+
+    def category_share(self, **filters):
+        rows = self._select(**filters)
+        totals, counts = self._group(rows["category"], rows, len(self.categories.values))
+        return sorted(({"category": self.categories.values[code], "total": _money(totals[code]),
+                        "count": int(counts[code])} for code in np.flatnonzero(counts)),
+                      key=lambda row: row["total"], reverse=True)
+
+    def expense_trend(self, bucket="day", **filters):
+        rows = self._select(**filters)
+        days = rows["day"]
+        if bucket == "week":
+            days = days - (days + 3) % 7            # 1970-01-01 was a Thursday; weeks start on Monday
+        elif bucket == "month":
+            days = days.astype("datetime64[D]").astype("datetime64[M]").astype("datetime64[D]").astype(np.int32)
+        elif bucket != "day":
+            raise ValueError(f"Unknown trend bucket: {bucket!r}")
+        periods, keys = np.unique(days, return_inverse=True)
+        totals, counts = self._group(keys, rows, len(periods))
+        return [{"period": date.fromordinal(int(period) + EPOCH), "total": _money(totals[i]),
+                 "count": int(counts[i])} for i, period in enumerate(periods)]
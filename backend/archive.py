@@ -0,0 +1,36 @@
+"""Move old years of expenses to Parquet files (see backend.parquet_archive).
+
+    python -m backend.archive              # archive years older than archive_config["keep_years"]
+    python -m backend.archive --keep 3     # keep three years in the database
+    python -m backend.archive --list       # show the archived years
+
+On MySQL the emptied yearly partitions are dropped afterwards.
+"""
+import argparse
+from backend import db_helper, migrations, parquet_archive
+
+
+def run(keep_years=None):
+    moved = db_helper.archive_expenses(keep_years)
+    for year in moved:
+        migrations.drop_partition(year)
+    return moved
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archive old expenses to Parquet.")
+    parser.add_argument("--keep", type=int, help="years kept in the database (default: %(default)s)",
+                        default=parquet_archive.archive_config["keep_years"])
+    parser.add_argument("--list", action="store_true", help="list archived years and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for year in parquet_archive.archived_years():
+            print(f"{year}  {parquet_archive.path_for(year)}")
+        return
+    for year, rows in run(args.keep).items():
+        print(f"{year}: {rows} expenses archived")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+
+
+class ResultCache:
+    """In-process LRU cache for query results, bounded by size and TTL.
+
+    Every entry remembers the data version it was computed under. Writers call
+    ``bump_version()`` after they commit, which makes every older entry stale
+    at once, so a reader never gets totals from before the latest write.
+
+    Cached values are shared between callers and must not be mutated.
+
+    ``revalidate``, if set, is called before every lookup; it may call
+    ``bump_version()`` when it learns that the data changed elsewhere.
+    """
+
+    def __init__(self, maxsize=256, ttl=60.0, enabled=True):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.enabled = enabled
+        self.revalidate = None
+        self._entries = OrderedDict()   # key -> (version, stored_at, value)
+        self._version = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    @property
+    def version(self):
+        return self._version
+
+    def bump_version(self):
+        with self._lock:
+            self._version += 1
+            self._invalidations += 1
+            return self._version
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get(self, key):
+        """Return ``(True, value)`` for a fresh entry, ``(False, None)`` otherwise."""
+        if self.revalidate is not None:
+            self.revalidate()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                version, stored_at, value = entry
+                if version == self._version and now - stored_at <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return True, value
+                del self._entries[key]
+            self._misses += 1
+            return False, None
+
+    def put(self, key, value, version):
+        with self._lock:
+            if version != self._version:
+                return  # a write landed while the query ran
+            self._entries[key] = (version, time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "data_version": self._version,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def cached(self, vary=None):
+        """Decorator caching a function by its name and normalized arguments.
+
+        ``vary`` is an optional zero-argument callable whose result is added to
+        the key, for functions that depend on something other than their
+        arguments (e.g. today's date). Coroutine functions are cached too; the
+        key uses the function's qualified name, so a db_async function shares
+        its entries with the db_helper function of the same name.
+        """
+        def decorator(func):
+            signature = inspect.signature(func)
+
+            def make_key(args, kwargs):
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                return (func.__qualname__, _normalize(tuple(bound.arguments.items())),
+                        _normalize(vary()) if vary else None)
+
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    if not self.enabled:
+                        return await func(*args, **kwargs)
+                    key = make_key(args, kwargs)
+                    hit, value = self.get(key)
+                    if hit:
+                        return value
+                    version = self._version
+                    value = await func(*args, **kwargs)
+                    self.put(key, value, version)
+                    return value
+
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                key = make_key(args, kwargs)
+                hit, value = self.get(key)
+                if hit:
+                    return value
+                version = self._version
+                value = func(*args, **kwargs)
+                self.put(key, value, version)
+                return value
+
+            return wrapper
+        return decorator
+
+
+def _normalize(value):
+    """Turn equivalent arguments (date vs ISO string, 5 vs 5.0, list vs tuple) into one hashable key."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float, Decimal)):
+        return float(value)
+    if isinstance(value, (list, tuple)):
+        return tuple(_normalize(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted((_normalize(v) for v in value), key=repr))
+    if isinstance(value, dict):
+        return tuple(sorted((k, _normalize(v)) for k, v in value.items()))
+    return value
@@ -0,0 +1,140 @@
+"""Apache Arrow IPC and Parquet encodings for expense result sets.
+
+List and query routes return one of these instead of JSON when the request's
+``Accept`` header asks for it (see ``negotiate``). Columns are typed: dates
+are ``date32`` and amounts ``decimal128(10, 2)``, so a client gets a
+DataFrame without parsing per-row Python objects::
+
+    response = requests.get(url, headers={"Accept": columnar.ARROW_STREAM})
+    df = columnar.read_frame(response.content, response.headers["content-type"])
+
+pyarrow is imported on first use; without it these formats are unavailable
+and the routes answer in JSON.
+"""
+import io
+from decimal import Decimal
+
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+PARQUET = "application/vnd.apache.parquet"
+MEDIA_TYPES = (ARROW_STREAM, PARQUET)
+
+EXPENSE_COLUMNS = ("id", "expense_date", "category", "sub_category", "transaction_type", "amount")
+
+_schema = None
+
+
+def available():
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def negotiate(accept):
+    """The columnar media type ``accept`` prefers over JSON, or None."""
+    if not accept:
+        return None
+    offers = []
+    for position, item in enumerate(accept.split(",")):
+        media_type, *params = [part.strip() for part in item.split(";")]
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            offers.append((-q, position, media_type.lower()))
+    for _, _, media_type in sorted(offers):
+        if media_type in MEDIA_TYPES:
+            return media_type if available() else None
+        if media_type in ("application/json", "*/*", "application/*"):
+            return None
+    return None
+
+
+def expense_schema():
+    global _schema
+    if _schema is None:
+        import pyarrow as pa
+        _schema = pa.schema([
+            ("id", pa.int64()),
+            ("expense_date", pa.date32()),
+            ("category", pa.string()),
+            ("sub_category", pa.string()),
+            ("transaction_type", pa.string()),
+            ("amount", pa.decimal128(10, 2)),
+        ])
+    return _schema
+
+
+def _amount(value):
+    if value is None or isinstance(value, Decimal):
+        return value
+    return Decimal(str(value))
+
+
+def to_table(rows):
+    """Build an Arrow table from expense row dicts, one column at a time."""
+    import pyarrow as pa
+    schema = expense_schema()
+    columns = {name: [row.get(name) for row in rows] for name in EXPENSE_COLUMNS}
+    columns["amount"] = [_amount(v) for v in columns["amount"]]
+    return pa.Table.from_pydict(columns, schema=schema)
+
+
+def serialize(rows, media_type):
+    """Encode a list of expense rows as ``media_type`` bytes."""
+    import pyarrow as pa
+    table = to_table(rows)
+    sink = pa.BufferOutputStream()
+    if media_type == PARQUET:
+        import pyarrow.parquet as pq
+        pq.write_table(table, sink, compression="zstd")
+    else:
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def ipc_chunks(rows, batch_size=10_000):
+    """Yield an Arrow IPC stream for an iterable of rows, one record batch per ``batch_size`` rows.
+
+    Used for streamed responses: memory stays bounded by one batch.
+    """
+    import pyarrow as pa
+    buffer = io.BytesIO()
+    writer = pa.ipc.new_stream(buffer, expense_schema())
+
+    def drain():
+        data = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            writer.write_table(to_table(batch))
+            batch = []
+            yield drain()
+    if batch:
+        writer.write_table(to_table(batch))
+    writer.close()
+    yield drain()
+
+
+def read_frame(content, media_type=ARROW_STREAM):
+    """Load a columnar response body into a pandas DataFrame."""
+    import pyarrow as pa
+    media_type = media_type.split(";")[0].strip()
+    if media_type == PARQUET:
+        import pyarrow.parquet as pq
+        table = pq.read_table(pa.BufferReader(content))
+    else:
+        table = pa.ipc.open_stream(content).read_all()
+    return table.to_pandas()
@@ -0,0 +1,285 @@
+"""Async read path for the FastAPI server.
+
+The read functions of db_helper, as coroutines on an asyncio connection pool,
+so ``async def`` routes wait on the database without holding one of
+Starlette's threadpool workers. They run the same SQL (backend.queries), the
+reads that combine sources run db_helper's read plans, and they share its
+storage backend and result cache. Writes stay in db_helper:
+they maintain the rollup and bump the cache version in one place.
+
+MySQL uses the asyncio driver bundled with mysql-connector-python
+(``mysql.connector.aio``); SQLite connections each run on a worker thread.
+"""
+import asyncio
+import weakref
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+from backend import metrics
+from backend import db_helper, queries
+from backend.db_helper import get_backend, pool_config, result_cache
+from backend.db_pool import AsyncConnectionPool
+from backend.metrics import instrument
+from logging_setup import sampled, setup_logger
+
+
+logger = setup_logger('db_async')
+
+_pools = weakref.WeakKeyDictionary()   # event loop -> (primary backend, {backend: pool})
+
+
+def get_pool(backend=None):
+    """The running event loop's pool for ``backend`` (default: the primary).
+
+    All of a loop's pools are rebuilt after db_helper.configure() switches backend.
+    """
+    loop = asyncio.get_running_loop()
+    primary = get_backend()
+    entry = _pools.get(loop)
+    if entry is None or entry[0] is not primary:
+        if entry is not None:
+            for pool in entry[1].values():
+                loop.create_task(pool.dispose())
+        entry = _pools[loop] = (primary, {})
+    backend = backend or primary
+    pool = entry[1].get(backend)
+    if pool is None:
+        pool = entry[1][backend] = AsyncConnectionPool(
+            backend.async_connect,
+            pool_size=pool_config["pool_size"],
+            max_overflow=pool_config["max_overflow"],
+            timeout=pool_config["timeout"],
+            recycle=pool_config["recycle"],
+            ping=backend.async_ping if pool_config["pre_ping"] else None,
+            reset=backend.async_reset if pool_config["reset_on_checkout"] else None,
+        )
+        logger.info("Async connection pool created: %s", pool_config)
+    return pool
+
+
+def pool_stats():
+    """Stats of every async pool: one per event loop and backend that has been used."""
+    return [pool.stats() for _, pools in list(_pools.values()) for pool in list(pools.values())]
+
+
+async def dispose_pool():
+    """Close the idle connections of the running loop's pools (e.g. on server shutdown)."""
+    entry = _pools.pop(asyncio.get_running_loop(), None)
+    if entry is not None:
+        for pool in entry[1].values():
+            await pool.dispose()
+
+
+async def _acquire(read_only):
+    """``(backend, pool, connection)``: a replica's for reads when one has caught up, else the primary's."""
+    replica = db_helper.read_replica() if read_only else None
+    if replica is not None:
+        pool = get_pool(replica.backend)
+        connection = await _replica_connection(replica, pool)
+        if connection is not None:
+            return replica.backend, pool, connection
+    pool = get_pool()
+    return get_backend(), pool, await pool.acquire()
+
+async def _replica_connection(replica, pool):
+    # As db_helper._replica_connection: confirm the replica's version in the read's snapshot
+    try:
+        connection = await pool.acquire()
+    except Exception as e:
+        db_helper.replica_failed(replica, e)
+        return None
+    try:
+        cursor = await replica.backend.async_cursor(connection)
+        await replica.backend.async_begin_snapshot(cursor)
+        await cursor.execute(db_helper.REPLICA_VERSION_QUERY)
+        caught_up = db_helper.replica_caught_up(replica, await cursor.fetchone())
+        await cursor.close()
+        if not caught_up:
+            await connection.rollback()
+    except Exception as e:
+        await pool.release(connection, discard=True)
+        db_helper.replica_failed(replica, e)
+        return None
+    if not caught_up:
+        await pool.release(connection)
+        return None
+    return connection
+
+
+@asynccontextmanager
+async def get_connection(read_only=False):
+    backend, pool, connection = await _acquire(read_only)
+    metrics.DB_POOL_WAIT.observe(pool.last_wait)
+    discard = False
+    try:
+        cursor = await backend.async_cursor(connection)
+    except BaseException:
+        await pool.release(connection, discard=True)
+        raise
+    try:
+        yield metrics.AsyncTimedCursor(cursor)
+        await connection.commit()
+    except backend.Error as err:
+        discard = not await _safe_rollback(backend, connection)
+        logger.error("Database error: %s", err)
+        raise err
+    except BaseException:
+        discard = not await _safe_rollback(backend, connection)
+        raise
+    finally:
+        try:
+            await cursor.close()
+        except backend.Error:
+            discard = True
+        await pool.release(connection, discard=discard)
+
+
+async def _safe_rollback(backend, connection):
+    try:
+        await connection.rollback()
+        return True
+    except backend.Error:
+        return False
+
+
+async def _fetchall(query, params=()):
+    async with get_connection(read_only=True) as cursor:
+        await cursor.execute(query, params)
+        return await cursor.fetchall()
+
+
+async def _fetchone(query, params=()):
+    async with get_connection(read_only=True) as cursor:
+        await cursor.execute(query, params)
+        return await cursor.fetchone()
+
+async def _run(plan):
+    """Drive one of db_helper's read plans (see READ PLANS there) without blocking the loop."""
+    result = None
+    while True:
+        try:
+            step = plan.send(result)
+        except StopIteration as done:
+            return done.value
+        kind, *args = step
+        if kind == "call":
+            result = await asyncio.to_thread(*args)
+        elif kind == "fetchall":
+            result = await _fetchall(*args)
+        else:
+            result = await _fetchone(*args)
+
+# --- FETCH ALL ---
+@instrument
+async def show_all_expenses():
+    logger.info("Fetching all expenses...", extra=sampled(100))
+    results = await _run(db_helper.all_expenses_plan())
+    logger.debug("Total expenses fetched: %s", len(results))
+    return results
+
+@instrument
+async def list_expenses(limit=100, after=None):
+    """One keyset-paginated page, as db_helper.list_expenses."""
+    logger.info("Fetching expenses page: limit=%s, after=%s", limit, after, extra=sampled(100))
+    return await _run(db_helper.page_plan(limit, after))
+
+# --- SEARCH FUNCTIONS ---
+@result_cache.cached()
+@instrument
+async def search_by_id(expense_id):
+    logger.info("Searching expense by ID: %s", expense_id)
+    result = await _fetchone(*queries.expense_by_id(expense_id))
+    if not result:
+        logger.warning("⚠️ No record found for ID: %s", expense_id)
+    return result
+
+@result_cache.cached()
+@instrument
+async def search_by_category(category):
+    logger.info("Searching by Category: %s", category)
+    return await _fetchall(*queries.expenses_by_category(category))
+
+@result_cache.cached()
+@instrument
+async def search_by_sub_category(sub_category):
+    logger.info("Searching by Sub-Category: %s", sub_category)
+    return await _run(db_helper.sub_category_plan(sub_category))
+
+async def suggest_sub_categories(prefix, limit=None):
+    return await _run(db_helper.suggest_plan(prefix, limit))
+
+@result_cache.cached()
+@instrument
+async def search_by_transaction_type(transaction_type):
+    logger.info("Searching by Transaction Type: %s", transaction_type)
+    return await _fetchall(*queries.expenses_by_transaction_type(transaction_type))
+
+# --- FILTERS ---
+@result_cache.cached()
+@instrument
+async def filter_by_date_range(start_date, end_date):
+    logger.info("Filtering by Date Range: %s to %s", start_date, end_date)
+    return await _run(db_helper.date_range_plan(start_date, end_date))
+
+@result_cache.cached()
+@instrument
+async def filter_by_amount_range(min_amount, max_amount):
+    logger.info("Filtering by Amount: %s to %s", min_amount, max_amount)
+    return await _fetchall(*queries.expenses_by_amount_range(min_amount, max_amount))
+
+@result_cache.cached()
+@instrument
+async def query_expenses(start_date=None, end_date=None, min_amount=None, max_amount=None,
+                         categories=None, sub_category=None, transaction_types=None,
+                         sort="date_desc", limit=None, offset=0):
+    filters = {"start_date": start_date, "end_date": end_date, "min_amount": min_amount,
+               "max_amount": max_amount, "categories": categories, "sub_category": sub_category,
+               "transaction_types": transaction_types}
+    logger.info("Querying expenses: %s | sort=%s, limit=%s, offset=%s",
+                {k: v for k, v in filters.items() if v} or "no filter", sort, limit, offset)
+    return await _run(db_helper.query_plan(sort, limit, offset, **filters))
+
+# --- ANALYTICS ---
+@result_cache.cached()
+@instrument
+async def expense_totals(**filters):
+    logger.info("Calculating totals for filters: %s", filters)
+    return await _run(db_helper.totals_plan(**filters))
+
+@result_cache.cached()
+@instrument
+async def category_share(**filters):
+    logger.info("Calculating category share for filters: %s", filters)
+    return await _run(db_helper.category_share_plan(**filters))
+
+@result_cache.cached()
+@instrument
+async def expense_trend(bucket="day", **filters):
+    logger.info("Calculating %s trend for filters: %s", bucket, filters)
+    return await _run(db_helper.trend_plan(bucket, **filters))
+
+# --- TOTALS ---
+@result_cache.cached(vary=date.today)
+@instrument
+async def total_expense_today():
+    logger.info("Calculating total expense for TODAY")
+    today = datetime.today().date()
+    return queries.total_value(await _fetchone(*queries.expense_total(get_backend(), today, today)))
+
+@result_cache.cached(vary=date.today)
+@instrument
+async def total_expense_this_month():
+    logger.info("Calculating total expense for THIS MONTH")
+    today = date.today()
+    return queries.total_value(await _fetchone(*queries.expense_total(get_backend(), today.replace(day=1), today)))
+
+@result_cache.cached()
+@instrument
+async def total_expense_by_year():
+    logger.info("Calculating total expense by YEAR")
+    return await _fetchall(*queries.expense_totals_by_year(get_backend()))
+
+async def dashboard_summary():
+    """Today's, this month's and the year-wise totals, queried concurrently."""
+    today, month, by_year = await asyncio.gather(
+        total_expense_today(), total_expense_this_month(), total_expense_by_year())
+    return {"total_expense_today": today, "total_expense_this_month": month, "year_wise": by_year}
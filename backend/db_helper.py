@@ -1,12 +1,34 @@
-import mysql.connector
+import asyncio
+import itertools
+import os
+import threading
+import time
 from contextlib import contextmanager
 from datetime import datetime, date
-from logging_setup import setup_logger
+from functools import partial
+from decimal import Decimal
+from backend import metrics, parquet_archive, queries, storage
+from backend.analytics_engine import ColumnarStore
+from backend.cache import ResultCache
+from backend.db_pool import ConnectionPool
+from backend.metrics import instrument
+from backend.queries import EXPENSE_FIELDS, build_expense_filter, decode_page_cursor, encode_page_cursor
+from backend.replicas import Replica, ReplicaSet
+from backend.subcategory_index import SubCategoryIndex
+from logging_setup import sampled, setup_logger
 
 
 logger = setup_logger('db_helper')
 
-# Database Configuration
+# Storage engine: "mysql" (db_config below) or "sqlite" (an embedded file)
+storage_config = {
+    "engine": os.environ.get("BILANCIO_DB_ENGINE", "mysql"),
+    "sqlite_path": os.environ.get(
+        "BILANCIO_SQLITE_PATH",
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "expense.db")),
+}
+
+# Database Configuration (MySQL)
 db_config = {
     "host": "localhost",
     "user": "root",
@@ -14,175 +36,1133 @@ db_config = {
     "database": "expense"
 }
 
+# Connection Pool Configuration
+pool_config = {
+    "pool_size": 5,            # connections kept open between requests
+    "max_overflow": 10,        # extra connections allowed under load
+    "timeout": 30,             # seconds to wait for a free connection
+    "recycle": 3600,           # reconnect connections older than this (seconds)
+    "pre_ping": True,          # check the connection is alive on checkout
+    "reset_on_checkout": False # reset session state on checkout
+}
+
+# Result Cache Configuration (search, filter and summary results)
+cache_config = {
+    "enabled": True,
+    "maxsize": 256,            # cached results kept (least recently used dropped first)
+    "ttl": 60,                 # seconds a result may be served
+}
+
+# Data Version Configuration
+version_config = {
+    "refresh": 1.0,            # seconds between re-reads of data_version (writes by other processes)
+}
+
+# Read Replica Configuration (searches, filters and summaries; writes always use the primary)
+replica_config = {
+    "replicas": [],            # one dict per replica: db_config overrides (MySQL) or {"sqlite_path": ...}
+    "health_interval": 5.0,    # seconds between health checks of each replica
+    "read_your_writes": 2.0,   # seconds this process reads from the primary after it writes (0 = off)
+}
+
+# Sub-Category Index Configuration (typeahead and substring search)
+suggest_config = {
+    "limit": 10,               # suggestions returned by default
+    "max_ids": 1000,           # above this many matches a search lets the database scan instead
+}
+
+# Analytics Engine Configuration (expense_totals, category_share, expense_trend)
+analytics_config = {
+    "engine": os.environ.get("BILANCIO_ANALYTICS_ENGINE", "0") == "1",   # answer from in-memory columns
+}
+
+_backend = None
+_pool = None
+_replicas = None
+_pool_lock = threading.Lock()
+
+# Every committed write bumps the cache's version, which invalidates all cached results
+# (see DATA VERSION below for writes made by other processes).
+result_cache = ResultCache(**cache_config)
+
+metrics.registry.register_collector(
+    "db_pool_connections", "gauge", "Pooled connections by state.",
+    lambda: [({"state": state}, pool_stats()[state]) for state in ("in_use", "idle", "open")] if _pool else [])
+metrics.registry.register_collector(
+    "result_cache_events_total", "counter", "Result cache lookups and evictions.",
+    lambda: [({"event": event}, cache_stats()[event]) for event in ("hits", "misses", "evictions", "invalidations")])
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _pool_lock:
+            if _backend is None:
+                _backend = storage.create_backend(storage_config, db_config)
+                logger.info("Storage engine: %s", _backend.name)
+    return _backend
+
+
+def _new_pool(backend):
+    return ConnectionPool(
+        backend.connect,
+        pool_size=pool_config["pool_size"],
+        max_overflow=pool_config["max_overflow"],
+        timeout=pool_config["timeout"],
+        recycle=pool_config["recycle"],
+        ping=backend.ping if pool_config["pre_ping"] else None,
+        reset=backend.reset if pool_config["reset_on_checkout"] else None,
+    )
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        backend = get_backend()
+        with _pool_lock:
+            if _pool is None:
+                _pool = _new_pool(backend)
+                logger.info("Connection pool created: %s", pool_config)
+    return _pool
+
+
+def reset_pool():
+    """Close the pools so the next checkout connects with the current configuration."""
+    global _pool, _backend, _replicas
+    with _pool_lock:
+        if _pool is not None:
+            _pool.dispose()
+        if _replicas is not None:
+            _replicas.close()
+        _pool = None
+        _backend = None
+        _replicas = None
+
+
+def configure(engine=None, sqlite_path=None, replicas=None, **db_changes):
+    """Switch storage engine, replicas or connection settings at runtime, e.g. ``configure(engine="sqlite")``."""
+    if engine is not None:
+        storage_config["engine"] = engine
+    if sqlite_path is not None:
+        storage_config["sqlite_path"] = sqlite_path
+    if replicas is not None:
+        replica_config["replicas"] = replicas
+    db_config.update(db_changes)
+    reset_pool()
+    _forget_data_version()
+    result_cache.bump_version()
+
+
+def pool_stats():
+    return get_pool().stats()
+
+
+def replica_stats():
+    replicas = get_replicas()
+    return replicas.stats() if replicas else []
+
+
+def cache_stats():
+    return result_cache.stats()
+
+
+# --- READ REPLICAS ---
+# Reads that pass read_only=True go round-robin to healthy replicas. A background
+# thread checks each replica; one that cannot be reached is skipped until a check
+# succeeds again. For read_your_writes seconds after this process writes, its reads
+# go to the primary. Otherwise the read first reads the replica's data version in
+# its own snapshot: if the replica has not reached the version this process last
+# saw (see DATA VERSION), which keys the ETags and the result cache, the primary
+# answers instead. A replica is thus never used with rows older than the version
+# it is served under, and need not wait for a health check to be used again.
+REPLICA_VERSION_QUERY = "SELECT version FROM data_version WHERE id = 1"
+_last_write_at = float("-inf")      # time.monotonic() of this process's latest write
+
+def _replica_backend(settings):
+    settings = dict(settings)
+    settings.pop("name", None)
+    sqlite_path = settings.pop("sqlite_path", storage_config["sqlite_path"])
+    return storage.create_backend({**storage_config, "sqlite_path": sqlite_path}, {**db_config, **settings})
+
+def _check_replica(replica):
+    connection = replica.pool.acquire()
+    discard = True
+    try:
+        cursor = replica.backend.cursor(connection)
+        cursor.execute(REPLICA_VERSION_QUERY)
+        row = cursor.fetchone()
+        cursor.close()
+        connection.rollback()
+        discard = False
+        return row["version"] if row else 0
+    finally:
+        replica.pool.release(connection, discard=discard)
+
+def get_replicas():
+    """The ReplicaSet of replica_config["replicas"], or None without replicas."""
+    global _replicas
+    if _replicas is None and replica_config["replicas"]:
+        with _pool_lock:
+            if _replicas is None:
+                replicas = []
+                for n, settings in enumerate(replica_config["replicas"], start=1):
+                    backend = _replica_backend(settings)
+                    replicas.append(Replica(settings.get("name", f"replica{n}"), backend, _new_pool(backend)))
+                _replicas = ReplicaSet(replicas, _check_replica, replica_config["health_interval"])
+                logger.info("Read replicas configured: %s", [r.name for r in replicas])
+    return _replicas
+
+def read_replica():
+    """The replica for the next read, or None to read from the primary.
+
+    The caller must still confirm with replica_caught_up, in the read's snapshot.
+    """
+    replicas = get_replicas()
+    if replicas is None or _version is None:
+        return None      # nothing to compare a replica's version with yet
+    if time.monotonic() - _last_write_at < replica_config["read_your_writes"]:
+        return None
+    return replicas.choose()
+
+def replica_caught_up(replica, row):
+    """Whether ``replica``, whose REPLICA_VERSION_QUERY returned ``row``, may serve this read."""
+    version = row["version"] if row else 0
+    replica.version = max(replica.version or 0, version)
+    return _version is not None and version >= _version
+
+def _replica_connection(replica):
+    """A connection to ``replica`` in a snapshot that has this process's data version, or None."""
+    try:
+        connection = replica.pool.acquire()
+    except Exception as e:
+        replica_failed(replica, e)
+        return None
+    try:
+        cursor = replica.backend.cursor(connection)
+        replica.backend.begin_snapshot(cursor)
+        cursor.execute(REPLICA_VERSION_QUERY)
+        caught_up = replica_caught_up(replica, cursor.fetchone())
+        cursor.close()
+        if not caught_up:
+            connection.rollback()
+    except Exception as e:
+        replica.pool.release(connection, discard=True)
+        replica_failed(replica, e)
+        return None
+    if not caught_up:
+        replica.pool.release(connection)
+        return None
+    return connection
+
+def replica_failed(replica, error):
+    """Take ``replica`` out of rotation until its next successful health check."""
+    _replicas.mark_down(replica, error)
+
 @contextmanager
-def get_connection():
-    connection = mysql.connector.connect(**db_config)
-    cursor = connection.cursor(dictionary=True)
+def get_connection(read_only=False):
+    """A cursor in a transaction, committed on success and rolled back on error.
+
+    ``read_only=True`` lets a replica serve it; if the replica cannot be
+    reached, or lags behind, the primary is used instead.
+    """
+    pool, backend = get_pool(), get_backend()
+    connection = None
+    replica = read_replica() if read_only else None
+    if replica is not None:
+        connection = _replica_connection(replica)
+        if connection is not None:
+            pool, backend = replica.pool, replica.backend
+    if connection is None:
+        connection = pool.acquire()
+    metrics.DB_POOL_WAIT.observe(pool.last_wait)
+    cursor = backend.cursor(connection)
+    discard = False
     try:
-        yield cursor
+        yield metrics.TimedCursor(cursor)
         connection.commit()
-    except mysql.connector.Error as err:
-        connection.rollback()
-        logger.error(f"Database error: {err}")
+    except backend.Error as err:
+        discard = not _safe_rollback(backend, connection)
+        logger.error("Database error: %s", err)
         raise err
+    except BaseException:
+        discard = not _safe_rollback(backend, connection)
+        raise
     finally:
-        cursor.close()
-        connection.close()
+        try:
+            cursor.close()
+        except backend.Error:
+            discard = True
+        pool.release(connection, discard=discard)
+
+
+def _safe_rollback(backend, connection):
+    # A pooled connection must never go back with an open transaction.
+    try:
+        connection.rollback()
+        return True
+    except backend.Error:
+        return False
+
+# --- DATA VERSION ---
+# data_version holds one counter that every write increments in its own transaction.
+# It drives ETags on the read endpoints and invalidates the result cache when another
+# process (a second API worker, the Streamlit app) writes.
+_version_lock = threading.Lock()
+_version = None            # last data version seen by this process
+_modified_at = time.time() # when this process first saw it
+_checked_at = float("-inf")
+
+def _forget_data_version():
+    global _version, _checked_at
+    with _version_lock:
+        _version, _checked_at = None, float("-inf")
+
+def _bump_data_version(cursor):
+    """Take the next data version inside the caller's transaction.
+
+    The row stays locked until commit, so writers commit in version order and
+    the change feed can use the version as its cursor.
+    """
+    cursor.execute("UPDATE data_version SET version = version + 1 WHERE id = 1")
+    cursor.execute("SELECT version FROM data_version WHERE id = 1")
+    return cursor.fetchone()["version"]
+
+def _observe_data_version(version):
+    """Remember ``version``; returns True (and drops cached results) if it is newer than the last one seen."""
+    global _version, _modified_at, _checked_at
+    with _version_lock:
+        _checked_at = time.monotonic()
+        if _version is not None and version <= _version:
+            return False
+        changed = _version is not None
+        _version = version
+        _modified_at = time.time()
+    if changed:
+        result_cache.bump_version()
+    return changed
+
+def _data_changed(version):
+    """Record a committed write: cached results go stale and the ETag moves on."""
+    global _last_write_at
+    _last_write_at = time.monotonic()
+    if not _observe_data_version(version):
+        result_cache.bump_version()
+
+def data_version_is_stale():
+    """True when the next data_version() call will query the database."""
+    return time.monotonic() - _checked_at >= version_config["refresh"]
+
+def data_version():
+    """``(version, modified_at)`` of the expense data.
+
+    Served from memory and re-read from the database at most every
+    ``version_config["refresh"]`` seconds, so a write by another process is
+    noticed within that interval.
+    """
+    if data_version_is_stale():
+        with get_connection() as cursor:
+            cursor.execute("SELECT version FROM data_version WHERE id = 1")
+            row = cursor.fetchone()
+        _observe_data_version(row["version"] if row else 0)
+    return _version, _modified_at
+
+def _revalidate_cache():
+    if not data_version_is_stale():
+        return
+    try:
+        asyncio.get_running_loop()
+        return      # never block an event loop; the server refreshes in its threadpool
+    except RuntimeError:
+        data_version()
+
+result_cache.revalidate = _revalidate_cache
+
+# --- DAILY ROLLUP ---
+# expense_daily_rollup holds SUM(amount) and COUNT(*) per (day, category, transaction_type).
+# Every write below updates it inside the same transaction as the base table change,
+# and the /summary endpoints read from it. backend.rollup can verify or rebuild it.
+def _rollup_apply(cursor, deltas):
+    """Apply ``(day, category, transaction_type, amount_delta, count_delta)`` tuples."""
+    if not deltas:
+        return
+    cursor.executemany(
+        get_backend().upsert_add("expense_daily_rollup", ["day", "category", "transaction_type"],
+                                 ["total", "txn_count"]),
+        deltas)
+    if any(d[4] < 0 for d in deltas):
+        cursor.executemany(
+            """DELETE FROM expense_daily_rollup
+               WHERE day = %s AND category = %s AND transaction_type = %s AND txn_count <= 0""",
+            [d[:3] for d in deltas if d[4] < 0])
+
+def _rollup_delta(row, sign=1):
+    amount = Decimal(str(row["amount"] or 0))
+    return (row["expense_date"], row["category"], row["transaction_type"], sign * amount, sign)
+
+def _rollup_deltas(rows):
+    """Merge the deltas of many inserted rows into one per rollup key."""
+    return _merge_deltas(_rollup_delta(dict(zip(EXPENSE_COLUMNS, row))) for row in rows)
+
+def _merge_deltas(deltas):
+    """One delta per rollup key; keys whose changes cancel out are dropped."""
+    merged = {}
+    for day, category, transaction_type, amount, count in deltas:
+        key = (day, category, transaction_type)
+        total, n = merged.get(key, (Decimal(0), 0))
+        merged[key] = (total + amount, n + count)
+    return [(*key, total, n) for key, (total, n) in merged.items() if total or n]
+
+def _now():
+    return datetime.now().replace(microsecond=0)
 
 # --- INSERT ---
+@instrument
 def add_expense(expense_date, category, sub_category, transaction_type, amount):
-    logger.info(f"Adding Expense: Date={expense_date}, Category={category},Sub_category={sub_category},transaction_type ={transaction_type} Amount={amount}")
+    """Insert one expense; returns its id, or None if the insert failed."""
+    logger.debug("Adding Expense: Date=%s, Category=%s, Sub_category=%s, transaction_type=%s, Amount=%s",
+                 expense_date, category, sub_category, transaction_type, amount)
     try:
         with get_connection() as cursor:
-            query = """INSERT INTO expense(expense_date, category, sub_category, transaction_type, amount)
-                     VALUES(%s, %s, %s, %s, %s)"""
-            cursor.execute(query, (expense_date, category, sub_category, transaction_type, amount))
+            version = _bump_data_version(cursor)
+            now = _now()
+            query = """INSERT INTO expense(expense_date, category, sub_category, transaction_type, amount,
+                                           created_at, updated_at, change_version)
+                     VALUES(%s, %s, %s, %s, %s, %s, %s, %s)"""
+            cursor.execute(query, (expense_date, category, sub_category, transaction_type, amount,
+                                   now, now, version))
+            expense_id = cursor.lastrowid
+            _rollup_apply(cursor, _rollup_deltas([(expense_date, category, sub_category, transaction_type, amount)]))
             logger.info("✅ Expense added successfully")
+        _data_changed(version)
+        return expense_id
     except Exception as e:
-        logger.error(f"❌ Failed to add expense: {e}")
+        logger.error("❌ Failed to add expense: %s", e)
+
+# --- BULK INSERT ---
+EXPENSE_COLUMNS = ("expense_date", "category", "sub_category", "transaction_type", "amount")
+
+def _batched(rows, batch_size):
+    batch = []
+    for row in rows:
+        if isinstance(row, dict):
+            row = tuple(row[col] for col in EXPENSE_COLUMNS)
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _insert_batch(cursor, batch):
+    """Insert tuples in EXPENSE_COLUMNS order under a new data version, which is returned."""
+    version = _bump_data_version(cursor)
+    stamp = (_now(), _now(), version)
+    # executemany rewrites a simple INSERT into one multi-row VALUES statement
+    cursor.executemany("""INSERT INTO expense(expense_date, category, sub_category, transaction_type, amount,
+                                              created_at, updated_at, change_version)
+                          VALUES(%s, %s, %s, %s, %s, %s, %s, %s)""", [row + stamp for row in batch])
+    _rollup_apply(cursor, _rollup_deltas(batch))
+    return version
+
+@instrument
+def insert_expenses(rows):
+    """Insert ``rows`` in one transaction and return their ids, in order.
+
+    Unlike add_expenses there is no batching and errors are raised; used by
+    the server's group-commit queue.
+    """
+    batch = [tuple(row[col] for col in EXPENSE_COLUMNS) if isinstance(row, dict) else tuple(row)
+             for row in rows]
+    with get_connection() as cursor:
+        version = _insert_batch(cursor, batch)
+        # The version is this transaction's alone, so its rows are exactly the batch
+        cursor.execute("SELECT id FROM expense WHERE change_version = %s ORDER BY id", (version,))
+        ids = [row["id"] for row in cursor.fetchall()]
+    _data_changed(version)
+    return ids
+
+@instrument
+def add_expenses(rows, batch_size=1000, first_batch=1):
+    """Insert many expenses, ``batch_size`` rows per multi-row INSERT and transaction.
+
+    ``rows`` is any iterable of dicts keyed by EXPENSE_COLUMNS or tuples in that
+    order; it is consumed lazily. A failing batch is rolled back on its own and
+    does not stop the following batches. Returns one result dict per batch.
+    """
+    logger.info("Bulk inserting expenses in batches of %s", batch_size)
+    results = []
+    for batch_no, batch in enumerate(_batched(rows, batch_size), start=first_batch):
+        try:
+            with get_connection() as cursor:
+                version = _insert_batch(cursor, batch)
+            _data_changed(version)
+            results.append({"batch": batch_no, "rows": len(batch), "inserted": len(batch), "ok": True})
+        except Exception as e:
+            logger.error("❌ Bulk insert batch %s failed: %s", batch_no, e)
+            results.append({"batch": batch_no, "rows": len(batch), "inserted": 0, "ok": False, "error": str(e)})
+    inserted = sum(r["inserted"] for r in results)
+    logger.info("✅ Bulk insert finished: %s rows in %s batches", inserted, len(results),
+                extra={"inserted": inserted, "batches": len(results)})
+    return results
 
 # --- FETCH ALL ---
+@instrument
 def show_all_expenses():
-    logger.info("Fetching all expenses...")
+    logger.info("Fetching all expenses...", extra=sampled(100))
+    results = _run(all_expenses_plan())
+    logger.debug("Total expenses fetched: %s", len(results))
+    return results
+
+# --- PAGINATED / STREAMING FETCH ---
+@instrument
+def list_expenses(limit=100, after=None):
+    """One page of expenses, newest first, using keyset pagination on (expense_date, id).
+
+    ``after`` is the ``next_after`` cursor of the previous page. Returns a dict with
+    the page ``items`` and the cursor for the next page (None on the last page).
+    """
+    logger.info("Fetching expenses page: limit=%s, after=%s", limit, after, extra=sampled(100))
+    page = _run(page_plan(limit, after))
+    logger.debug("Page fetched: %s expenses, has_more=%s", len(page["items"]), page["next_after"] is not None)
+    return page
+
+def stream_expenses(batch_size=1000, sort="date_desc", **filters):
+    """Yield every expense matching ``filters`` without loading them all into memory.
+
+    ``filters`` are the keyword filters of build_expense_filter. Both storage
+    backends hand out unbuffered cursors, so rows are read ``batch_size`` at a
+    time with fetchmany. The pooled connection stays checked
+    out until the generator is exhausted or closed. Archived rows in range are
+    merged into the stream in ``sort`` order as they are read (see archived_expenses).
+    """
+    query, params = queries.expense_query(sort, **filters)
+    logger.info("Streaming expenses in batches of %s: %s", batch_size, filters or "no filter")
+    archived = archived_expenses(sort, **filters)
+    with get_connection(read_only=True) as cursor:
+        cursor.execute(query, params)
+
+        def live():
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield from rows
+
+        yield from queries.merge_sorted(live(), archived, sort=sort)
+
+# --- CHANGE FEED ---
+# Every write stamps the rows it touches with its data version, and deletes leave a
+# tombstone, so a client holding a copy of the table can ask for what changed since
+# the version it last saw instead of downloading everything again. Archiving
+# leaves tombstones too: the feed describes the live table only.
+CHANGE_FIELDS = f"{EXPENSE_FIELDS}, created_at, updated_at, change_version"
+
+@instrument
+def expense_changes(since=0, limit=1000):
+    """Rows written and ids deleted after data version ``since``.
+
+    Returns ``{"upserts", "deletes", "next_since", "has_more"}``. Pass
+    ``next_since`` back as ``since`` to get the next page; a page holds about
+    ``limit`` changes but never splits one version (e.g. a bulk insert batch),
+    so applying pages in order always leaves the client at a committed state.
+    """
+    logger.info("Fetching changes since version %s (limit=%s)", since, limit, extra=sampled(100))
     with get_connection() as cursor:
-        query = "SELECT * FROM expense ORDER BY expense_date DESC, id DESC"
-        cursor.execute(query)
-        results = cursor.fetchall()
-        logger.info(f"Total expenses fetched: {len(results)}")
-        return results
+        # One snapshot for the whole page: versions up to `current` are all committed in it
+        get_backend().begin_snapshot(cursor)
+        cursor.execute("SELECT version FROM data_version WHERE id = 1")
+        row = cursor.fetchone()
+        current = row["version"] if row else 0
+        until = current
+        cursor.execute("""SELECT change_version FROM (
+                              SELECT change_version FROM expense WHERE change_version > %s
+                              UNION ALL
+                              SELECT change_version FROM expense_tombstone WHERE change_version > %s
+                          ) AS changes
+                          ORDER BY change_version LIMIT 1 OFFSET %s""", (since, since, limit))
+        overflow = cursor.fetchone()
+        if overflow and overflow["change_version"] <= current:
+            # Stop before the version that overflows the page, unless it is the first one
+            until = overflow["change_version"] - 1
+            if until <= since:
+                until = overflow["change_version"]
+        cursor.execute(f"""SELECT {CHANGE_FIELDS} FROM expense
+                           WHERE change_version > %s AND change_version <= %s
+                           ORDER BY change_version, id""", (since, until))
+        upserts = cursor.fetchall()
+        cursor.execute("""SELECT id, deleted_at, change_version FROM expense_tombstone
+                          WHERE change_version > %s AND change_version <= %s
+                          ORDER BY change_version, id""", (since, until))
+        deletes = cursor.fetchall()
+    logger.debug("Changes %s..%s: %s upserts, %s deletes", since, until, len(upserts), len(deletes))
+    return {"upserts": upserts, "deletes": deletes, "next_since": max(until, since), "has_more": until < current}
+
+# --- SUB-CATEGORY INDEX ---
+# search_by_sub_category matches '%term%', which no B-tree index can serve. The distinct
+# sub-categories are few, so they are indexed by trigram in memory and kept current from
+# the change feed; a search resolves the term to expense ids and reads those rows by key.
+sub_category_index = SubCategoryIndex()
+_sub_category_lock = threading.Lock()
+
+def sub_category_index_is_current():
+    """True when the index is known to be up to date, without touching the database."""
+    return (sub_category_index.source is _backend and sub_category_index.version == _version
+            and not data_version_is_stale())
+
+def sync_sub_category_index():
+    """Load the index on first use and apply the writes made since."""
+    with _sub_category_lock:
+        backend = get_backend()
+        if sub_category_index.source is not backend:
+            with get_connection() as cursor:
+                # Version first: a write landing between the two reads is applied again below, harmlessly
+                cursor.execute("SELECT version FROM data_version WHERE id = 1")
+                row = cursor.fetchone()
+                cursor.execute("SELECT id, sub_category FROM expense")
+                sub_category_index.load(cursor.fetchall(), row["version"] if row else 0, source=backend)
+            logger.info("Sub-category index loaded: %s values", len(sub_category_index))
+        version, _ = data_version()
+        while sub_category_index.version < version:
+            changes = expense_changes(sub_category_index.version, limit=10000)
+            sub_category_index.apply(changes)
+            if not changes["has_more"]:
+                break
+    return sub_category_index
+
+def _current_sub_category_index():
+    # A read plan (see READ PLANS): the index answers from memory, only catching up needs the database
+    if sub_category_index_is_current():
+        return sub_category_index
+    return (yield ("call", sync_sub_category_index))
+
+def sub_category_ids_plan(term):
+    """Ids of the expenses whose sub-category contains ``term``.
+
+    None when the database should match instead: the term holds LIKE
+    wildcards, or it matches more than ``suggest_config["max_ids"]`` rows.
+    """
+    if "%" in term or "_" in term:
+        return None
+    ids = (yield from _current_sub_category_index()).matching_ids(term)
+    return None if len(ids) > suggest_config["max_ids"] else ids
+
+def suggest_plan(prefix, limit=None):
+    return (yield from _current_sub_category_index()).suggest(prefix, limit or suggest_config["limit"])
+
+def suggest_sub_categories(prefix, limit=None):
+    """Typeahead: ``[{"sub_category", "count"}]`` for sub-categories containing ``prefix``."""
+    return _run(suggest_plan(prefix, limit))
+
+# --- ANALYTICS ENGINE ---
+# With analytics_config["engine"] on, the dashboard aggregates are computed from a
+# columnar copy of the expense table held in memory (see analytics_engine), kept
+# current from the change feed like the sub-category index. A date range is a
+# binary search there and a GROUP BY a bincount, with no round trip per request.
+analytics_engine = ColumnarStore()
+_analytics_lock = threading.Lock()
+
+def analytics_engine_serves(filters):
+    """True when the engine is on and can answer ``filters`` exactly as the SQL would."""
+    sub_category = filters.get("sub_category") or ""
+    return analytics_config["engine"] and "%" not in sub_category and "_" not in sub_category
+
+def analytics_engine_is_current():
+    """True when the engine is known to be up to date, without touching the database."""
+    return (analytics_engine.source is _backend and analytics_engine.version == _version
+            and not data_version_is_stale())
+
+def sync_analytics_engine():
+    """Load the engine on first use and apply the writes made since."""
+    with _analytics_lock:
+        backend = get_backend()
+        if analytics_engine.source is not backend:
+            with get_connection() as cursor:
+                # Version first: a write landing between the two reads is applied again below, harmlessly
+                cursor.execute("SELECT version FROM data_version WHERE id = 1")
+                row = cursor.fetchone()
+                cursor.execute("""SELECT id, expense_date, category, sub_category, transaction_type, amount
+                                  FROM expense""")
+                analytics_engine.load(cursor.fetchall(), row["version"] if row else 0, source=backend)
+            logger.info("Analytics engine loaded: %s expenses", len(analytics_engine))
+        version, _ = data_version()
+        while analytics_engine.version < version:
+            changes = expense_changes(analytics_engine.version, limit=10000)
+            analytics_engine.apply(changes)
+            if not changes["has_more"]:
+                break
+    return analytics_engine
+
+def _current_analytics_engine():
+    # A read plan, like _current_sub_category_index
+    if analytics_engine_is_current():
+        return analytics_engine
+    return (yield ("call", sync_analytics_engine))
+
+# --- READ PLANS ---
+# Reads that combine sources (the live table, the in-memory indexes, the Parquet
+# archive) are written once, as generators that yield each piece of I/O they need
+# and are sent its result:
+#   ("fetchall" | "fetchone", query, params)  the rows of a read-only query
+#   ("call", func, *args)                      func(*args), which may block on files or the database
+# _run drives a plan here; db_async drives the same plans on its event loop, so the
+# two read paths differ only in how they wait.
+def _run(plan):
+    result = None
+    while True:
+        try:
+            step = plan.send(result)
+        except StopIteration as done:
+            return done.value
+        kind, *args = step
+        if kind == "call":
+            func, *args = args
+            result = func(*args)
+        else:
+            with get_connection(read_only=True) as cursor:
+                cursor.execute(*args)
+                result = cursor.fetchall() if kind == "fetchall" else cursor.fetchone()
+
+def _archive_in_range(filters):
+    return parquet_archive.overlaps(filters.get("start_date"), filters.get("end_date"))
+
+def all_expenses_plan():
+    results = yield ("fetchall", *queries.all_expenses())
+    if parquet_archive.overlaps():
+        results = queries.merge_page(results, (yield ("call", archived_rows)))
+    return results
+
+def page_plan(limit, after=None):
+    rows = yield ("fetchall", *queries.expense_page(limit, after))
+    if parquet_archive.overlaps(None, queries.decode_page_cursor(after)[0] if after else None):
+        # Both sides hold up to limit + 1 rows past the cursor, so the merge still tells whether more follow
+        archived = yield ("call", archived_page, limit + 1, after)
+        rows = queries.merge_page(rows, archived, limit=limit + 1)
+    return queries.page_result(rows, limit)
+
+def sub_category_plan(sub_category):
+    ids = yield from sub_category_ids_plan(sub_category)
+    if ids is not None and not ids:
+        return []
+    return (yield ("fetchall", *queries.expenses_by_sub_category(sub_category, ids)))
+
+def date_range_plan(start_date, end_date):
+    results = yield ("fetchall", *queries.expenses_by_date_range(start_date, end_date))
+    if parquet_archive.overlaps(start_date, end_date):
+        results = merge_archived(results, (yield ("call", parquet_archive.read, start_date, end_date)))
+    return results
+
+def query_plan(sort="date_desc", limit=None, offset=0, **filters):
+    archived = []
+    if _archive_in_range(filters):
+        # The page is cut after merging: no more than its end is needed from either side
+        archived = yield ("call", partial(archived_rows, sort, None if limit is None else offset + limit, **filters))
+    if not archived:
+        return (yield ("fetchall", *queries.expense_query(sort, limit, offset, **filters)))
+    results = yield ("fetchall", *queries.expense_query(sort, None if limit is None else offset + limit, 0,
+                                                        **filters))
+    return queries.merge_page(results, archived, sort, limit, offset)
+
+def _groups_plan(by, sql, from_engine, bucket="day", **filters):
+    """Analytics rows grouped ``by``: from the engine or the SQL, plus the archived groups in range."""
+    if analytics_engine_serves(filters):
+        results = from_engine((yield from _current_analytics_engine()))
+    else:
+        results = yield ("fetchall", *sql)
+    archived = []
+    if _archive_in_range(filters):
+        archived = yield ("call", partial(archived_groups, by, bucket, **filters))
+    return queries.merge_groups(results, archived, by)
+
+def totals_plan(**filters):
+    by_type = yield from _groups_plan("transaction_type", queries.totals_by_type(get_backend(), **filters),
+                                      lambda engine: engine.expense_totals(**filters)["by_type"], **filters)
+    return queries.totals_summary(by_type)
+
+def category_share_plan(**filters):
+    return (yield from _groups_plan("category", queries.category_totals(get_backend(), **filters),
+                                    lambda engine: engine.category_share(**filters), **filters))
+
+def trend_plan(bucket="day", **filters):
+    return (yield from _groups_plan("period", queries.trend(get_backend(), bucket, **filters),
+                                    lambda engine: engine.expense_trend(bucket, **filters), bucket, **filters))
 
 # --- SEARCH FUNCTIONS ---
+@result_cache.cached()
+@instrument
 def search_by_id(expense_id):
-    logger.info(f"Searching expense by ID: {expense_id}")
-    with get_connection() as cursor:
-        query = "SELECT * FROM expense WHERE id=%s"
-        cursor.execute(query, (expense_id,))
+    logger.info("Searching expense by ID: %s", expense_id)
+    with get_connection(read_only=True) as cursor:
+        cursor.execute(*queries.expense_by_id(expense_id))
         result = cursor.fetchone()
         if result:
-            logger.info("✅ Record found")
+            logger.debug("✅ Record found")
         else:
-            logger.warning(f"⚠️ No record found for ID: {expense_id}")
+            logger.warning("⚠️ No record found for ID: %s", expense_id)
         return result
 
+@result_cache.cached()
+@instrument
 def search_by_category(category):
-    logger.info(f"Searching by Category: {category}")
-    with get_connection() as cursor:
-        query = "SELECT * FROM expense WHERE category=%s ORDER BY expense_date DESC"
-        cursor.execute(query, (category,))
+    logger.info("Searching by Category: %s", category)
+    with get_connection(read_only=True) as cursor:
+        cursor.execute(*queries.expenses_by_category(category))
         results = cursor.fetchall()
-        logger.info(f"Found {len(results)} records for category '{category}'")
+        logger.debug("Found %s records for category '%s'", len(results), category)
         return results
 
+@result_cache.cached()
+@instrument
 def search_by_sub_category(sub_category):
-    logger.info(f"Searching by Sub-Category: {sub_category}")
-    with get_connection() as cursor:
-        query = "SELECT * FROM expense WHERE sub_category LIKE %s ORDER BY expense_date DESC"
-        cursor.execute(query, (f"%{sub_category}%",))
-        results = cursor.fetchall()
-        logger.info(f"Found {len(results)} records for sub-category '{sub_category}'")
-        return results
-
+    logger.info("Searching by Sub-Category: %s", sub_category)
+    results = _run(sub_category_plan(sub_category))
+    logger.debug("Found %s records for sub-category '%s'", len(results), sub_category)
+    return results
 
+@result_cache.cached()
+@instrument
 def search_by_transaction_type(transaction_type):
-    logger.info(f"Searching by Transaction Type: {transaction_type}")
-    with get_connection() as cursor:
-        # SQL Query में LOWER() और TRIM() लगाया है (ताकि case sensitivity की दिक्कत न हो)
-        query = "SELECT * FROM expense WHERE LOWER(TRIM(transaction_type)) = LOWER(TRIM(%s)) ORDER BY expense_date DESC"
-
-        cursor.execute(query, (transaction_type,))
+    logger.info("Searching by Transaction Type: %s", transaction_type)
+    with get_connection(read_only=True) as cursor:
+        cursor.execute(*queries.expenses_by_transaction_type(transaction_type))
         results = cursor.fetchall()
-        logger.info(f"Found {len(results)} records for type '{transaction_type}'")
+        logger.debug("Found %s records for type '%s'", len(results), transaction_type)
         return results
 
 # --- FILTERS ---
+@result_cache.cached()
+@instrument
 def filter_by_date_range(start_date, end_date):
-    logger.info(f"Filtering by Date Range: {start_date} to {end_date}")
-    with get_connection() as cursor:
-        query = """
-        SELECT * FROM expense
-        WHERE expense_date BETWEEN %s AND %s
-        ORDER BY expense_date DESC
-        """
-        cursor.execute(query, (start_date, end_date))
-        results = cursor.fetchall()
-        logger.info(f"Found {len(results)} records in date range")
-        return results
+    logger.info("Filtering by Date Range: %s to %s", start_date, end_date)
+    results = _run(date_range_plan(start_date, end_date))
+    logger.debug("Found %s records in date range", len(results))
+    return results
 
+@result_cache.cached()
+@instrument
 def filter_by_amount_range(min_amount, max_amount):
-    logger.info(f"Filtering by Amount: {min_amount} to {max_amount}")
-    with get_connection() as cursor:
-        query = """
-        SELECT * FROM expense
-        WHERE amount BETWEEN %s AND %s
-        ORDER BY amount DESC
-        """
-        cursor.execute(query, (min_amount, max_amount))
+    logger.info("Filtering by Amount: %s to %s", min_amount, max_amount)
+    with get_connection(read_only=True) as cursor:
+        cursor.execute(*queries.expenses_by_amount_range(min_amount, max_amount))
         results = cursor.fetchall()
-        logger.info(f"Found {len(results)} records in amount range")
+        logger.debug("Found %s records in amount range", len(results))
         return results
 
+# --- COMPOSABLE QUERY ---
+@result_cache.cached()
+@instrument
+def query_expenses(start_date=None, end_date=None, min_amount=None, max_amount=None,
+                   categories=None, sub_category=None, transaction_types=None,
+                   sort="date_desc", limit=None, offset=0):
+    """Expenses matching every given filter, in one SQL statement plus the archived rows in range."""
+    filters = {"start_date": start_date, "end_date": end_date, "min_amount": min_amount,
+               "max_amount": max_amount, "categories": categories, "sub_category": sub_category,
+               "transaction_types": transaction_types}
+    logger.info("Querying expenses: %s | sort=%s, limit=%s, offset=%s",
+                {k: v for k, v in filters.items() if v} or "no filter", sort, limit, offset)
+    results = _run(query_plan(sort, limit, offset, **filters))
+    logger.debug("Found %s records for query", len(results))
+    return results
+
+# --- ANALYTICS ---
+# GROUP BY in the database so the dashboard receives chart points, not raw rows.
+# Every function accepts the same keyword filters as build_expense_filter. The
+# groups of the archived years in range are added to the live table's.
+@result_cache.cached()
+@instrument
+def expense_totals(**filters):
+    logger.info("Calculating totals for filters: %s", filters)
+    return _run(totals_plan(**filters))
+
+@result_cache.cached()
+@instrument
+def category_share(**filters):
+    logger.info("Calculating category share for filters: %s", filters)
+    return _run(category_share_plan(**filters))
+
+@result_cache.cached()
+@instrument
+def expense_trend(bucket="day", **filters):
+    logger.info("Calculating %s trend for filters: %s", bucket, filters)
+    return _run(trend_plan(bucket, **filters))
+
 # --- TOTALS ---
+@result_cache.cached(vary=date.today)
+@instrument
 def total_expense_today():
     logger.info("Calculating total expense for TODAY")
     today = datetime.today().date()
-    with get_connection() as cursor:
-        query = """SELECT SUM(amount) as today_total FROM expense 
-                   WHERE expense_date = %s AND transaction_type = 'Expense'"""
-        cursor.execute(query, (today,))
-        data = cursor.fetchone()
-        total = float(data["today_total"]) if data and data["today_total"] else 0.0
-        logger.info(f"Today's Total: {total}")
+    with get_connection(read_only=True) as cursor:
+        cursor.execute(*queries.expense_total(get_backend(), today, today))
+        total = queries.total_value(cursor.fetchone())
+        logger.debug("Today's Total: %s", total)
         return total
 
+@result_cache.cached(vary=date.today)
+@instrument
 def total_expense_this_month():
     logger.info("Calculating total expense for THIS MONTH")
     today = date.today()
-    first_day = today.replace(day=1)
-    with get_connection() as cursor:
-        query = """SELECT SUM(amount) as month_total FROM expense 
-                   WHERE expense_date BETWEEN %s AND %s
-                   AND transaction_type = 'Expense'"""
-        cursor.execute(query, (first_day, today))
-        data = cursor.fetchone()
-        total = float(data["month_total"]) if data and data["month_total"] else 0.0
-        logger.info(f"Month's Total: {total}")
+    with get_connection(read_only=True) as cursor:
+        cursor.execute(*queries.expense_total(get_backend(), today.replace(day=1), today))
+        total = queries.total_value(cursor.fetchone())
+        logger.debug("Month's Total: %s", total)
         return total
 
+@result_cache.cached()
+@instrument
 def total_expense_by_year():
     logger.info("Calculating total expense by YEAR")
-    with get_connection() as cursor:
-        query = """
-        SELECT YEAR(expense_date) AS year, SUM(amount) AS total
-        FROM expense
-        WHERE transaction_type = 'Expense'
-        GROUP BY YEAR(expense_date)
-        ORDER BY year DESC
-        """
-        cursor.execute(query)
+    with get_connection(read_only=True) as cursor:
+        cursor.execute(*queries.expense_totals_by_year(get_backend()))
         results = cursor.fetchall()
-        logger.info(f"Yearly data fetched for {len(results)} years")
+        logger.debug("Yearly data fetched for %s years", len(results))
         return results
 
 # --- UPDATE & DELETE ---
+def _add_tombstones(cursor, ids, version):
+    cursor.executemany("INSERT INTO expense_tombstone (id, deleted_at, change_version) VALUES (%s, %s, %s)",
+                       [(id, _now(), version) for id in ids])
+
+def _lock_expense(cursor, id):
+    backend = get_backend()
+    backend.begin_write(cursor)
+    cursor.execute(f"SELECT {EXPENSE_FIELDS} FROM expense WHERE id=%s{backend.for_update}", (id,))
+    return cursor.fetchone()
+
+@instrument
 def update_expense(id, expense_date, category, sub_category, transaction_type, amount):
-    logger.info(f"Updating Expense ID: {id} | New Data: {amount}, {category}")
+    logger.info("Updating Expense ID: %s", id)
+    logger.debug("New Data: %s, %s", amount, category)
     try:
         with get_connection() as cursor:
+            old = _lock_expense(cursor, id)
+            version = _bump_data_version(cursor)
             query = """UPDATE expense
                        SET expense_date=%s, category=%s, sub_category=%s, 
-                           transaction_type=%s, amount=%s
+                           transaction_type=%s, amount=%s,
+                           updated_at=%s, change_version=%s
                        WHERE id=%s"""
-            cursor.execute(query, (expense_date, category, sub_category, transaction_type, amount, id))
-            logger.info(f"✅ Expense ID {id} updated successfully")
+            cursor.execute(query, (expense_date, category, sub_category, transaction_type, amount,
+                                   _now(), version, id))
+            if old:
+                new = {"expense_date": expense_date, "category": category,
+                       "transaction_type": transaction_type, "amount": amount}
+                _rollup_apply(cursor, [_rollup_delta(old, -1), _rollup_delta(new)])
+            logger.info("✅ Expense ID %s updated successfully", id)
+        _data_changed(version)
     except Exception as e:
-        logger.error(f"❌ Failed to update expense {id}: {e}")
+        logger.error("❌ Failed to update expense %s: %s", id, e)
 
+@instrument
 def delete_expense(id):
-    logger.info(f"Deleting Expense ID: {id}")
+    logger.info("Deleting Expense ID: %s", id)
     try:
         with get_connection() as cursor:
+            old = _lock_expense(cursor, id)
+            version = _bump_data_version(cursor)
             query = "DELETE FROM expense WHERE id=%s"
             cursor.execute(query, (id,))
-            logger.info(f"✅ Expense ID {id} deleted successfully")
+            if old:
+                _rollup_apply(cursor, [_rollup_delta(old, -1)])
+                _add_tombstones(cursor, [id], version)
+            logger.info("✅ Expense ID %s deleted successfully", id)
+        _data_changed(version)
     except Exception as e:
-        logger.error(f"❌ Failed to delete expense {id}: {e}")
\ No newline at end of file
+        logger.error("❌ Failed to delete expense %s: %s", id, e)
+
+# --- BULK UPDATE & DELETE ---
+# Rows are chosen by an id list or by filters (see build_expense_filter), locked,
+# and changed with one UPDATE / DELETE per chunk of ids, all in one transaction
+# with a single data version, so a large correction is atomic.
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def _in_list(ids):
+    return f"({', '.join(['%s'] * len(ids))})"
+
+def _check_selection(ids, filters):
+    if (ids is None) == (filters is None):
+        raise ValueError("Pass either ids or filters")
+    if filters is not None and not build_expense_filter(**filters)[0]:
+        raise ValueError("Refusing to change every expense: the filters are empty")
+
+def _lock_expenses(cursor, ids=None, filters=None, chunk_size=1000):
+    backend = get_backend()
+    backend.begin_write(cursor)
+    if filters is not None:
+        where, params = build_expense_filter(**filters)
+        cursor.execute(f"SELECT {EXPENSE_FIELDS} FROM expense {where}{backend.for_update}", params)
+        return cursor.fetchall()
+    rows = []
+    for chunk in _chunks(list(dict.fromkeys(ids)), chunk_size):
+        cursor.execute(f"SELECT {EXPENSE_FIELDS} FROM expense WHERE id IN {_in_list(chunk)}{backend.for_update}",
+                       chunk)
+        rows += cursor.fetchall()
+    return rows
+
+@instrument
+def update_expenses(changes, ids=None, filters=None, chunk_size=1000):
+    """Set the ``changes`` (column -> value, columns from EXPENSE_COLUMNS) on many expenses.
+
+    Returns ``{"matched", "updated"}``. Raises ValueError for a bad request and
+    re-raises database errors after the transaction is rolled back.
+    """
+    if not changes or set(changes) - set(EXPENSE_COLUMNS):
+        raise ValueError(f"Changes must set some of {', '.join(EXPENSE_COLUMNS)}")
+    _check_selection(ids, filters)
+    logger.info("Bulk updating expenses: %s | ids=%s, filters=%s", sorted(changes),
+                len(ids) if ids is not None else None, filters)
+    updated, version = 0, None
+    try:
+        with get_connection() as cursor:
+            rows = _lock_expenses(cursor, ids, filters, chunk_size)
+            if rows:
+                version = _bump_data_version(cursor)
+                assignments = ", ".join(f"{column}=%s" for column in changes)
+                values = (*changes.values(), _now(), version)
+                for chunk in _chunks([row["id"] for row in rows], chunk_size):
+                    cursor.execute(f"""UPDATE expense SET {assignments}, updated_at=%s, change_version=%s
+                                       WHERE id IN {_in_list(chunk)}""", (*values, *chunk))
+                    updated += cursor.rowcount
+                _rollup_apply(cursor, _merge_deltas(
+                    [_rollup_delta(row, -1) for row in rows] + [_rollup_delta({**row, **changes}) for row in rows]))
+    except Exception as e:
+        logger.error("❌ Bulk update failed, nothing was changed: %s", e)
+        raise
+    if version is not None:
+        _data_changed(version)
+    logger.info("✅ Bulk update finished: %s of %s matched rows updated", updated, len(rows))
+    return {"matched": len(rows), "updated": updated}
+
+@instrument
+def delete_expenses(ids=None, filters=None, chunk_size=1000):
+    """Delete many expenses; returns ``{"matched", "deleted"}``. Errors as update_expenses."""
+    _check_selection(ids, filters)
+    logger.info("Bulk deleting expenses | ids=%s, filters=%s", len(ids) if ids is not None else None, filters)
+    deleted, version = 0, None
+    try:
+        with get_connection() as cursor:
+            rows = _lock_expenses(cursor, ids, filters, chunk_size)
+            if rows:
+                version = _bump_data_version(cursor)
+                for chunk in _chunks([row["id"] for row in rows], chunk_size):
+                    cursor.execute(f"DELETE FROM expense WHERE id IN {_in_list(chunk)}", chunk)
+                    deleted += cursor.rowcount
+                    _add_tombstones(cursor, chunk, version)
+                _rollup_apply(cursor, _merge_deltas(_rollup_delta(row, -1) for row in rows))
+    except Exception as e:
+        logger.error("❌ Bulk delete failed, nothing was deleted: %s", e)
+        raise
+    if version is not None:
+        _data_changed(version)
+    logger.info("✅ Bulk delete finished: %s rows deleted", deleted)
+    return {"matched": len(rows), "deleted": deleted}
+
+# --- ARCHIVE ---
+# Years older than parquet_archive.archive_config["keep_years"] move to Parquet files.
+# They leave the expense table with tombstones, so the change feed, the in-memory
+# indexes and delta-sync clients drop them; their rollup rows stay, so the totals
+# keep counting them. Reads that cover archived years merge in the files they span:
+#   show_all_expenses, list_expenses, stream_expenses (so every GET /expenses mode
+#   and the exports), filter_by_date_range, query_expenses, expense_totals,
+#   category_share, expense_trend, and the rollup totals.
+# These read the live table only:
+#   search_by_*, filter_by_amount_range, suggest_sub_categories and expense_changes.
+def merge_archived(rows, archived):
+    """Live rows plus archived rows, newest first."""
+    if not archived:
+        return rows
+    return sorted(rows + archived, key=lambda row: (row["expense_date"], row["id"]), reverse=True)
+
+def archived_expenses(sort="date_desc", **filters):
+    """Iterate over the archived expenses matching ``filters`` (see build_expense_filter), in ``sort`` order.
+
+    Files are opened as the iteration reaches them. For the date orders the years
+    follow one another; for the amount orders they are merged.
+    """
+    if sort not in queries.SORT_ORDERS:
+        raise ValueError(f"Unknown sort order: {sort!r}")
+    years = parquet_archive.years_between(filters.get("start_date"), filters.get("end_date"))
+    if sort.startswith("date"):
+        rows = itertools.chain.from_iterable(
+            parquet_archive.iter_year(year, sort) for year in (years if sort == "date_asc" else reversed(years)))
+    else:
+        rows = queries.merge_sorted(*(parquet_archive.iter_year(year, sort) for year in years), sort=sort)
+    return (row for row in rows if queries.matches(row, **filters))
+
+def archived_rows(sort="date_desc", limit=None, **filters):
+    """The first ``limit`` (default: all) rows of archived_expenses as a list."""
+    return list(itertools.islice(archived_expenses(sort, **filters), limit))
+
+def archived_page(limit, after=None):
+    """Up to ``limit`` archived expenses past the list_expenses cursor ``after``, newest first."""
+    if not after:
+        return archived_rows(limit=limit)
+    cursor = queries.decode_page_cursor(after)
+    rows = itertools.dropwhile(lambda row: (row["expense_date"], row["id"]) >= cursor,
+                               archived_expenses(end_date=cursor[0]))
+    return list(itertools.islice(rows, limit))
+
+def archived_groups(by, bucket="day", **filters):
+    """The archive's share of an analytics query, as queries.group_totals rows."""
+    return queries.group_totals(archived_expenses("date_asc", **filters), by, bucket)
+
+@instrument
+def archive_expenses(keep_years=None, today=None):
+    """Move whole years before the kept window from the expense table to Parquet.
+
+    Returns ``{year: rows_moved}``. Each year is one transaction: its rows are
+    locked, written with the year's earlier rows to a staged file, deleted and
+    tombstoned. The staged file replaces the year's file only once the delete
+    has committed, so no reader sees a row both in the table and the archive;
+    if the transaction fails the staged file is dropped and nothing changes.
+    """
+    keep_years = parquet_archive.archive_config["keep_years"] if keep_years is None else keep_years
+    cutoff = date((today or date.today()).year - keep_years + 1, 1, 1)
+    logger.info("Archiving expenses dated before %s", cutoff)
+    with get_connection() as cursor:
+        cursor.execute("SELECT MIN(expense_date) AS first_day FROM expense")
+        row = cursor.fetchone()
+    first_day = row["first_day"] if row else None
+    if first_day is None or _as_date(first_day) >= cutoff:
+        logger.info("Nothing to archive")
+        return {}
+
+    moved = {}
+    for year in range(_as_date(first_day).year, cutoff.year):
+        start, end = date(year, 1, 1), date(year, 12, 31)
+        previous = parquet_archive.read_year(year)
+        staged = None
+        try:
+            with get_connection() as cursor:
+                backend = get_backend()
+                backend.begin_write(cursor)
+                cursor.execute(f"""SELECT {EXPENSE_FIELDS} FROM expense
+                                   WHERE expense_date BETWEEN %s AND %s{backend.for_update}""", (start, end))
+                rows = cursor.fetchall()
+                if not rows:
+                    continue
+                staged = parquet_archive.stage_year(year, previous + rows)
+                cursor.execute("DELETE FROM expense WHERE expense_date BETWEEN %s AND %s", (start, end))
+                version = _bump_data_version(cursor)
+                _add_tombstones(cursor, [row["id"] for row in rows], version)
+        except Exception as e:
+            logger.error("❌ Archiving %s failed, the database is unchanged: %s", year, e)
+            if staged is not None:
+                parquet_archive.discard_staged(staged)
+            raise
+        try:
+            parquet_archive.commit_staged(year, staged)
+        except OSError as e:
+            logger.error("❌ Archived rows of %s are only in %s, move it to %s: %s",
+                         year, staged, parquet_archive.path_for(year), e)
+            raise
+        finally:
+            _data_changed(version)
+        moved[year] = len(rows)
+        logger.info("✅ Archived %s expenses of %s", len(rows), year)
+    return moved
+
+def _as_date(value):
+    return date.fromisoformat(value) if isinstance(value, str) else value
@@ -0,0 +1,308 @@
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from logging_setup import setup_logger
+
+
+logger = setup_logger('db_pool')
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection could be checked out within the pool timeout."""
+
+
+class _PoolState:
+    """Sizing, idle list, expiry and stats shared by ConnectionPool and AsyncConnectionPool.
+
+    ``_slot``, ``_forget``, ``_checkin`` and ``_take_idle`` change the counters
+    and must be called with the subclass's lock held. The subclasses only add
+    the locking, the waiting and the connection I/O.
+    """
+
+    def __init__(self, connect, pool_size=5, max_overflow=10, timeout=30.0,
+                 recycle=3600, ping=None, reset=None):
+        if pool_size < 1:
+            raise ValueError("pool_size must be at least 1")
+        self._connect = connect
+        self.pool_size = pool_size
+        self.max_overflow = max(0, max_overflow)
+        self.timeout = timeout
+        self.recycle = recycle
+        self._ping = ping
+        self._reset = reset
+
+        self._idle = deque()          # (connection, created_at)
+        self._created = {}            # id(connection) -> created_at
+        self._open = 0
+        self._in_use = 0
+        self._disposed = False
+
+        self._checkouts = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _slot(self, deadline):
+        """``(connection, created_at)`` of an idle connection, ``(None, None)`` for a new one,
+        or None when the caller must wait. Raises PoolTimeout past ``deadline``."""
+        if self._idle:
+            slot = self._idle.pop()
+        elif self._open < self.pool_size + self.max_overflow:
+            self._open += 1
+            slot = (None, None)
+        else:
+            remaining = None if deadline is None else deadline - time.perf_counter()
+            if remaining is not None and remaining <= 0:
+                self._timeouts += 1
+                raise PoolTimeout(
+                    f"No connection available within {self.timeout}s "
+                    f"(size={self.pool_size}, overflow={self.max_overflow})")
+            return None
+        self._in_use += 1
+        return slot
+
+    def _remaining(self, deadline):
+        return None if deadline is None else max(0.0, deadline - time.perf_counter())
+
+    def _forget(self):
+        """A checked-out connection failed to open or prepare and is gone."""
+        self._open -= 1
+        self._in_use -= 1
+
+    def _checkin(self, connection, discard):
+        """Count the connection back in; True if it was parked in the idle list."""
+        self._in_use -= 1
+        keep = not discard and not self._disposed and len(self._idle) < self.pool_size
+        if keep:
+            self._idle.append((connection, self._created.get(id(connection), time.monotonic())))
+        else:
+            self._open -= 1
+        return keep
+
+    def _take_idle(self):
+        """Mark the pool disposed and hand over its idle connections for closing."""
+        self._disposed = True
+        idle = [connection for connection, _ in self._idle]
+        self._idle.clear()
+        self._open -= len(idle)
+        return idle
+
+    def _expired(self, created_at):
+        return self.recycle is not None and time.monotonic() - created_at > self.recycle
+
+    def _created_now(self, connection):
+        self._created[id(connection)] = time.monotonic()
+        return connection
+
+    def _record_wait(self, waited):
+        self._checkouts += 1
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+
+    def _stats(self):
+        return {
+            "pool_size": self.pool_size,
+            "max_overflow": self.max_overflow,
+            "open": self._open,
+            "in_use": self._in_use,
+            "idle": len(self._idle),
+            "checkouts": self._checkouts,
+            "timeouts": self._timeouts,
+            "wait_time_total": round(self._wait_total, 6),
+            "wait_time_max": round(self._wait_max, 6),
+            "wait_time_avg": round(self._wait_total / self._checkouts, 6) if self._checkouts else 0.0,
+        }
+
+
+class ConnectionPool(_PoolState):
+    """Thread-safe pool of reusable database connections.
+
+    ``pool_size`` connections are kept open once created. Up to ``max_overflow``
+    extra connections may be opened under load; they are closed again when
+    returned to a full pool. A checkout that finds the pool exhausted waits at
+    most ``timeout`` seconds before raising ``PoolTimeout``.
+
+    ``ping`` and ``reset`` are optional callables run on every checkout. A
+    connection whose ping fails, or that is older than ``recycle`` seconds, is
+    closed and replaced by a fresh one.
+    """
+
+    def __init__(self, connect, **kwargs):
+        super().__init__(connect, **kwargs)
+        self._cond = threading.Condition()
+        self._local = threading.local()
+
+    # --- CHECKOUT ---
+    def acquire(self):
+        start = time.perf_counter()
+        deadline = None if self.timeout is None else start + self.timeout
+        with self._cond:
+            slot = self._slot(deadline)
+            while slot is None:
+                self._cond.wait(self._remaining(deadline))
+                slot = self._slot(deadline)
+        connection, created_at = slot
+
+        try:
+            if connection is not None:
+                connection = self._prepare(connection, created_at)
+            else:
+                connection = self._created_now(self._connect())
+        except Exception:
+            with self._cond:
+                self._forget()
+                self._cond.notify()
+            raise
+
+        waited = time.perf_counter() - start
+        self._local.last_wait = waited
+        with self._cond:
+            self._record_wait(waited)
+        return connection
+
+    def _prepare(self, connection, created_at):
+        expired = self._expired(created_at)
+        if not expired and self._ping is not None:
+            try:
+                self._ping(connection)
+            except Exception as e:
+                logger.warning("Discarding pooled connection that failed ping: %s", e)
+                expired = True
+        if expired:
+            self._close(connection)
+            return self._created_now(self._connect())
+        if self._reset is not None:
+            try:
+                self._reset(connection)
+            except Exception:
+                self._close(connection)      # acquire() counts it out of _open
+                raise
+        return connection
+
+    # --- CHECKIN ---
+    def release(self, connection, discard=False):
+        with self._cond:
+            keep = self._checkin(connection, discard)
+            self._cond.notify()
+        if not keep:
+            self._close(connection)
+
+    def _close(self, connection):
+        self._created.pop(id(connection), None)
+        try:
+            connection.close()
+        except Exception as e:
+            logger.warning("Error while closing pooled connection: %s", e)
+
+    def dispose(self):
+        """Close every idle connection. Checked-out connections close on release."""
+        with self._cond:
+            idle = self._take_idle()
+        for connection in idle:
+            self._close(connection)
+
+    # --- STATS ---
+    @property
+    def last_wait(self):
+        """Seconds the calling thread waited for its most recent checkout."""
+        return getattr(self._local, 'last_wait', 0.0)
+
+    def stats(self):
+        with self._cond:
+            return self._stats()
+
+
+class AsyncConnectionPool(_PoolState):
+    """asyncio counterpart of ConnectionPool for the async request path.
+
+    Sizing, timeout and recycling follow ConnectionPool; ``connect``, ``ping``,
+    ``reset`` and the connections' ``close`` are coroutines. A pool belongs to
+    the event loop it is first used on.
+    """
+
+    def __init__(self, connect, **kwargs):
+        super().__init__(connect, **kwargs)
+        self._cond = asyncio.Condition()
+        self._last_wait = contextvars.ContextVar("last_wait", default=0.0)
+
+    # --- CHECKOUT ---
+    async def acquire(self):
+        start = time.perf_counter()
+        deadline = None if self.timeout is None else start + self.timeout
+        async with self._cond:
+            slot = self._slot(deadline)
+            while slot is None:
+                try:
+                    await asyncio.wait_for(self._cond.wait(), self._remaining(deadline))
+                except asyncio.TimeoutError:
+                    pass          # try once more: past the deadline _slot raises PoolTimeout
+                slot = self._slot(deadline)
+        connection, created_at = slot
+
+        try:
+            if connection is not None:
+                connection = await self._prepare(connection, created_at)
+            else:
+                connection = self._created_now(await self._connect())
+        except BaseException:
+            async with self._cond:
+                self._forget()
+                self._cond.notify()
+            raise
+
+        waited = time.perf_counter() - start
+        self._last_wait.set(waited)
+        self._record_wait(waited)
+        return connection
+
+    async def _prepare(self, connection, created_at):
+        expired = self._expired(created_at)
+        if not expired and self._ping is not None:
+            try:
+                await self._ping(connection)
+            except Exception as e:
+                logger.warning("Discarding pooled connection that failed ping: %s", e)
+                expired = True
+        if expired:
+            await self._close(connection)
+            return self._created_now(await self._connect())
+        if self._reset is not None:
+            try:
+                await self._reset(connection)
+            except Exception:
+                await self._close(connection)      # acquire() counts it out of _open
+                raise
+        return connection
+
+    # --- CHECKIN ---
+    async def release(self, connection, discard=False):
+        async with self._cond:
+            keep = self._checkin(connection, discard)
+            self._cond.notify()
+        if not keep:
+            await self._close(connection)
+
+    async def _close(self, connection):
+        self._created.pop(id(connection), None)
+        try:
+            await connection.close()
+        except Exception as e:
+            logger.warning("Error while closing pooled connection: %s", e)
+
+    async def dispose(self):
+        """Close every idle connection. Checked-out connections close on release."""
+        async with self._cond:
+            idle = self._take_idle()
+        for connection in idle:
+            await self._close(connection)
+
+    # --- STATS ---
+    @property
+    def last_wait(self):
+        """Seconds the calling task waited for its most recent checkout."""
+        return self._last_wait.get()
+
+    def stats(self):
+        return self._stats()
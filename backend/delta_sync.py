@@ -0,0 +1,114 @@
+"""Keep a local DataFrame of expenses in step with the database.
+
+Instead of downloading every expense on each refresh, a client asks for the
+changes since the data version it last saw (``GET /expenses/changes`` or
+``db_helper.expense_changes``) and applies them::
+
+    mirror = ExpenseMirror(lambda since: requests.get(
+        f"{API}/expenses/changes", params={"since": since}).json())
+    df = mirror.refresh()   # first call loads everything, later calls only the delta
+    recent = select(df, start_date=date(2024, 1, 1))
+
+The DataFrame is indexed by ``id``: changed rows are overwritten and deleted
+ids dropped by label, so a page costs time in proportion to its changes, not
+to the table. Rows are kept in arrival order; ``select`` sorts what it returns.
+"""
+import threading
+import pandas as pd
+
+
+EXPENSE_COLUMNS = ["id", "expense_date", "category", "sub_category", "transaction_type", "amount"]
+COLUMNS = EXPENSE_COLUMNS + ["created_at", "updated_at", "change_version"]
+
+SORT_ORDERS = {
+    "date_desc": (["expense_date", "id"], False),
+    "date_asc": (["expense_date", "id"], True),
+    "amount_desc": (["amount", "id"], False),
+    "amount_asc": (["amount", "id"], True),
+}
+
+
+def _by_id(frame):
+    # Keep "id" as a column too; an unnamed index keeps sorting by the "id" column unambiguous
+    return frame.set_index("id", drop=False).rename_axis(None)
+
+
+def empty_frame():
+    return _by_id(pd.DataFrame(columns=COLUMNS))
+
+
+def apply_changes(df, changes):
+    """Return ``df`` (indexed by id) with one page of ``expense_changes`` applied."""
+    if df is None:
+        df = empty_frame()
+    gone = [row["id"] for row in changes["deletes"]]
+    if gone:
+        df = df.drop(index=gone, errors="ignore")
+    if changes["upserts"]:
+        upserts = _by_id(pd.DataFrame(changes["upserts"], columns=COLUMNS))
+        changed = upserts.index.isin(df.index)
+        if changed.any():
+            df.loc[upserts.index[changed], COLUMNS] = upserts[changed].to_numpy()
+        if not changed.all():
+            added = upserts[~changed]
+            df = added.copy() if df.empty else pd.concat([df, added])
+    return df
+
+
+def select(df, sort="date_desc", start_date=None, end_date=None, min_amount=None, max_amount=None,
+           categories=None, sub_category=None, transaction_types=None):
+    """Rows of ``df`` matching the filters of db_helper.build_expense_filter, in ``sort`` order."""
+    if sort not in SORT_ORDERS:
+        raise ValueError(f"Unknown sort order: {sort!r}")
+    mask = pd.Series(True, index=df.index)
+    if start_date is not None:
+        mask &= df["expense_date"] >= start_date
+    if end_date is not None:
+        mask &= df["expense_date"] <= end_date
+    if min_amount is not None:
+        mask &= df["amount"].astype(float) >= float(min_amount)
+    if max_amount is not None:
+        mask &= df["amount"].astype(float) <= float(max_amount)
+    if categories:
+        mask &= df["category"].isin(categories)
+    if sub_category:
+        mask &= df["sub_category"].str.contains(sub_category, case=False, regex=False, na=False)
+    if transaction_types:
+        wanted = [t.strip().lower() for t in transaction_types]
+        mask &= df["transaction_type"].str.strip().str.lower().isin(wanted)
+    columns, ascending = SORT_ORDERS[sort]
+    return df[mask].sort_values(columns, ascending=ascending).reset_index(drop=True)
+
+
+class ExpenseMirror:
+    """A DataFrame of all expenses plus the data version it reflects.
+
+    ``fetch(since)`` must return one page of changes as produced by
+    ``db_helper.expense_changes``. Changes are applied in place, so threads
+    sharing one mirror (e.g. Streamlit sessions) should read through
+    ``select``, which holds the mirror's lock while it filters.
+    """
+
+    def __init__(self, fetch):
+        self.fetch = fetch
+        self.df = empty_frame()
+        self.since = 0
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Apply every change after ``since`` and return the updated DataFrame."""
+        with self._lock:
+            return self._refresh()
+
+    def select(self, sort="date_desc", **filters):
+        """Refresh, then ``select`` from the mirror, without another thread's refresh in between."""
+        with self._lock:
+            return select(self._refresh(), sort, **filters)
+
+    def _refresh(self):
+        while True:
+            changes = self.fetch(self.since)
+            self.df = apply_changes(self.df, changes)
+            self.since = changes["next_since"]
+            if not changes["has_more"]:
+                return self.df
@@ -0,0 +1,192 @@
+"""Background CSV/PDF report exports.
+
+``start_export`` queues a job on a small worker pool and returns immediately.
+The worker streams rows from the database, writes the report to
+``export_config["export_dir"]`` and records the outcome, which callers poll
+with ``get_export``. Finished files are removed after ``max_age`` seconds.
+"""
+import csv
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Paragraph, Table, TableStyle
+from backend import db_helper
+from logging_setup import setup_logger
+
+
+logger = setup_logger('exports')
+
+export_config = {
+    "workers": 2,
+    "export_dir": os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "exports"),
+    "batch_size": 1000,          # rows fetched from the cursor at a time
+    "pdf_rows_per_page": 35,
+    "max_age": 3600,             # seconds a finished export is kept
+}
+
+FORMATS = {
+    "csv": "text/csv",
+    "pdf": "application/pdf",
+}
+
+STANDARD_COLUMNS = ['id', 'expense_date', 'category', 'sub_category', 'transaction_type', 'amount']
+
+_jobs = {}
+_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=export_config["workers"], thread_name_prefix="export")
+
+
+def start_export(fmt, filters=None, rows=None, name="report"):
+    """Queue an export and return its job record.
+
+    Rows come from ``db_helper.stream_expenses(**filters)`` unless ``rows``
+    (a list of dicts, e.g. a single search result) is given.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt!r}")
+    _purge_expired()
+
+    job_id = uuid.uuid4().hex
+    job = {
+        "id": job_id,
+        "name": name,
+        "format": fmt,
+        "media_type": FORMATS[fmt],
+        "file_name": f"Bilancio_{name}_{date.today()}.{fmt}",
+        "status": "queued",
+        "rows": 0,
+        "created_at": time.time(),
+        "finished_at": None,
+        "error": None,
+        "path": None,
+    }
+    with _lock:
+        _jobs[job_id] = job
+    logger.info("Export %s queued: format=%s, filters=%s", job_id, fmt, filters)
+    _executor.submit(_run, job_id, filters or {}, rows)
+    return get_export(job_id)
+
+
+def get_export(job_id):
+    with _lock:
+        job = _jobs.get(job_id)
+        return dict(job) if job else None
+
+
+def _update(job_id, **changes):
+    with _lock:
+        _jobs[job_id].update(changes)
+
+
+def _run(job_id, filters, rows):
+    job = get_export(job_id)
+    _update(job_id, status="running")
+    os.makedirs(export_config["export_dir"], exist_ok=True)
+    path = os.path.join(export_config["export_dir"], f"{job_id}.{job['format']}")
+    try:
+        source = rows if rows is not None else db_helper.stream_expenses(export_config["batch_size"], **filters)
+        writer = _write_csv if job["format"] == "csv" else _write_pdf
+        count = writer(path, iter(source))
+        _update(job_id, status="done", rows=count, path=path, finished_at=time.time())
+        logger.info("✅ Export %s finished: %s rows", job_id, count)
+    except Exception as e:
+        logger.error("❌ Export %s failed: %s", job_id, e)
+        _update(job_id, status="failed", error=str(e), finished_at=time.time())
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _columns(first_row):
+    columns = [c for c in STANDARD_COLUMNS if c in first_row]
+    return columns or list(first_row)
+
+
+def _write_csv(path, rows):
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        first = next(rows, None)
+        columns = _columns(first) if first else STANDARD_COLUMNS
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        if first is not None:
+            writer.writerow([first.get(c) for c in columns])
+            count = 1
+        for row in rows:
+            writer.writerow([row.get(c) for c in columns])
+            count += 1
+    return count
+
+
+TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.darkgoldenrod),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('FONTSIZE', (0, 0), (-1, -1), 10)
+])
+
+
+def _write_pdf(path, rows):
+    """Draw one table per page straight onto the canvas, so only a page of rows is held at once."""
+    per_page = export_config["pdf_rows_per_page"]
+    width, height = letter
+    margin = 40
+    styles = getSampleStyleSheet()
+    pdf = canvas.Canvas(path, pagesize=letter)
+
+    first = next(rows, None)
+    columns = _columns(first) if first else STANDARD_COLUMNS
+    pending = [first] if first is not None else []
+    count, page = 0, 1
+
+    def draw_page(page_rows, top):
+        data = [columns] + [[str(row.get(c, "")) for c in columns] for row in page_rows]
+        table = Table(data)
+        table.setStyle(TABLE_STYLE)
+        _, table_height = table.wrapOn(pdf, width - 2 * margin, top - margin)
+        table.drawOn(pdf, margin, top - table_height)
+        pdf.setFont("Helvetica", 8)
+        pdf.drawRightString(width - margin, margin / 2, f"Page {page}")
+        pdf.showPage()
+
+    # Title block on the first page only
+    title = Paragraph("Bilancio - Report", styles['Title'])
+    subtitle = Paragraph(f"Generated on: {date.today()}", styles['Normal'])
+    top = height - margin
+    for p in (title, subtitle):
+        _, h = p.wrapOn(pdf, width - 2 * margin, top)
+        p.drawOn(pdf, margin, top - h)
+        top -= h + 6
+    first_page_rows = per_page - 4
+
+    for row in rows:
+        pending.append(row)
+        limit = first_page_rows if page == 1 else per_page
+        if len(pending) >= limit:
+            draw_page(pending, top if page == 1 else height - margin)
+            count += len(pending)
+            pending, page = [], page + 1
+    if pending or count == 0:
+        draw_page(pending, top if page == 1 else height - margin)
+        count += len(pending)
+
+    pdf.save()
+    return count
+
+
+def _purge_expired():
+    cutoff = time.time() - export_config["max_age"]
+    with _lock:
+        expired = [j for j in _jobs.values() if j["finished_at"] and j["finished_at"] < cutoff]
+        for job in expired:
+            del _jobs[job["id"]]
+    for job in expired:
+        if job["path"] and os.path.exists(job["path"]):
+            os.remove(job["path"])
@@ -0,0 +1,247 @@
+"""In-process metrics exposed in the Prometheus text format.
+
+``server.py`` records per-route request metrics through a middleware and
+serves ``/metrics``. ``db_helper`` wraps its public functions with
+``instrument`` and its cursors with ``TimedCursor``, which also writes
+statements slower than ``metrics_config["slow_query_threshold"]`` to
+``logs/slow_query.log`` together with their parameters.
+"""
+import functools
+import inspect
+import os
+import threading
+import time
+from logging_setup import setup_logger
+
+
+slow_query_logger = setup_logger('slow_query', log_file='slow_query.log')
+
+metrics_config = {
+    "slow_query_threshold": float(os.environ.get("BILANCIO_SLOW_QUERY_SECONDS", "0.5")),
+}
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+ROW_BUCKETS = (0, 1, 10, 100, 1_000, 10_000, 100_000)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels):
+    labels = list(labels)
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(zip(self.labelnames, key))} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series = {}   # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                labels = list(zip(self.labelnames, key))
+                cumulative = 0
+                for bound, n in zip(self.buckets, series):
+                    cumulative += n
+                    le = labels + [("le", _format_value(bound))]
+                    lines.append(f"{self.name}_bucket{_format_labels(le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(series[-2])}")
+                lines.append(f"{self.name}_count{_format_labels(labels)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, name, type, help, collect):
+        """Add a metric whose samples are read on every scrape: ``collect()`` returns ``[(labels_dict, value)]``."""
+        self._collectors.append((name, type, help, collect))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines += metric.collect()
+        for name, type, help, collect in self._collectors:
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} {type}"]
+            for labels, value in collect():
+                lines.append(f"{name}{_format_labels(sorted(labels.items()))} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# --- HTTP ---
+HTTP_REQUESTS = registry.register(Counter(
+    "http_requests_total", "HTTP requests handled.", ("method", "route", "status")))
+HTTP_LATENCY = registry.register(Histogram(
+    "http_request_duration_seconds", "Time spent handling HTTP requests.", ("method", "route")))
+HTTP_RESPONSE_SIZE = registry.register(Histogram(
+    "http_response_size_bytes", "Size of HTTP response bodies.", ("method", "route"), SIZE_BUCKETS))
+
+# --- DATABASE ---
+DB_CALL_LATENCY = registry.register(Histogram(
+    "db_call_duration_seconds", "Time spent in db_helper functions.", ("function",)))
+DB_CALL_ROWS = registry.register(Histogram(
+    "db_call_rows", "Rows returned by db_helper functions.", ("function",), ROW_BUCKETS))
+DB_CALL_ERRORS = registry.register(Counter(
+    "db_call_errors_total", "db_helper calls that raised an exception.", ("function",)))
+DB_POOL_WAIT = registry.register(Histogram(
+    "db_pool_wait_seconds", "Time spent waiting to check out a pooled connection."))
+DB_SLOW_QUERIES = registry.register(Counter(
+    "db_slow_queries_total", "Statements slower than the slow-query threshold."))
+
+
+def render():
+    return registry.render()
+
+
+def _row_count(result):
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, dict) and isinstance(result.get("items"), list):
+        return len(result["items"])
+    if result is None:
+        return 0
+    return 1
+
+
+def instrument(func):
+    """Record latency, returned rows and errors of a db_helper (or db_async) function.
+
+    Place it below ``result_cache.cached()`` so that cache hits, which never
+    reach the database, stay out of the latency histograms.
+    """
+    name = func.__name__
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = await func(*args, **kwargs)
+            except Exception:
+                DB_CALL_ERRORS.inc(function=name)
+                raise
+            finally:
+                DB_CALL_LATENCY.observe(time.perf_counter() - start, function=name)
+            DB_CALL_ROWS.observe(_row_count(result), function=name)
+            return result
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            DB_CALL_ERRORS.inc(function=name)
+            raise
+        finally:
+            DB_CALL_LATENCY.observe(time.perf_counter() - start, function=name)
+        DB_CALL_ROWS.observe(_row_count(result), function=name)
+        return result
+
+    return wrapper
+
+
+def _check_slow(query, elapsed, shown_params):
+    if elapsed >= metrics_config["slow_query_threshold"]:
+        DB_SLOW_QUERIES.inc()
+        slow_query_logger.warning("Slow query (%.3fs): %s | params=%s",
+                                  elapsed, " ".join(query.split()), shown_params,
+                                  extra={"duration": elapsed})
+
+
+def _shown_many(seq_params):
+    return seq_params[:3] + ([f"... {len(seq_params) - 3} more"] if len(seq_params) > 3 else [])
+
+
+class TimedCursor:
+    """Cursor proxy that times every statement and logs the slow ones with their parameters."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def _timed(self, method, query, params, shown_params):
+        start = time.perf_counter()
+        try:
+            return method(query, params)
+        finally:
+            _check_slow(query, time.perf_counter() - start, shown_params)
+
+    def execute(self, query, params=None):
+        return self._timed(self._cursor.execute, query, params, params)
+
+    def executemany(self, query, seq_params):
+        seq_params = list(seq_params)
+        return self._timed(self._cursor.executemany, query, seq_params, _shown_many(seq_params))
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+
+class AsyncTimedCursor(TimedCursor):
+    """TimedCursor for async cursors, whose execute methods are coroutines."""
+
+    async def _timed(self, method, query, params, shown_params):
+        start = time.perf_counter()
+        try:
+            return await method(query, params)
+        finally:
+            _check_slow(query, time.perf_counter() - start, shown_params)
@@ -0,0 +1,243 @@
+"""Versioned schema migrations for the expense database.
+
+Run ``python -m backend.migrations`` to bring the database up to date, or
+``python -m backend.migrations --status`` to list what has been applied.
+
+Each migration is applied once and recorded in ``schema_migrations``. MySQL
+commits DDL implicitly, so a migration that fails half-way has to be fixed by
+hand before it is re-run; keep each one small.
+
+A statement is either plain SQL shared by every storage engine or a dict of
+``{engine: sql}`` for the spots where MySQL and SQLite disagree.
+
+On MySQL the expense table is partitioned by year of ``expense_date``;
+``migrate()`` also adds the partitions for the coming year (see
+``ensure_partitions``), so run it at least once a year.
+"""
+import argparse
+from datetime import date
+from backend import db_helper
+from logging_setup import setup_logger
+
+
+logger = setup_logger('migrations')
+
+ROLLUP_BACKFILL = """INSERT INTO expense_daily_rollup (day, category, transaction_type, total, txn_count)
+                     SELECT expense_date, category, transaction_type, COALESCE(SUM(amount), 0), COUNT(*)
+                     FROM expense
+                     GROUP BY expense_date, category, transaction_type"""
+
+# (version, description, statements)
+MIGRATIONS = [
+    (1, "create expense table", [
+        {"mysql": """CREATE TABLE IF NOT EXISTS expense (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            expense_date DATE NOT NULL,
+            category VARCHAR(100) NOT NULL,
+            sub_category VARCHAR(100) NOT NULL,
+            transaction_type VARCHAR(50) NOT NULL,
+            amount DECIMAL(10,2)
+        )""",
+         "sqlite": """CREATE TABLE IF NOT EXISTS expense (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            expense_date DATE NOT NULL,
+            category VARCHAR(100) NOT NULL,
+            sub_category VARCHAR(100) NOT NULL,
+            transaction_type VARCHAR(50) NOT NULL,
+            amount DECIMAL(10,2)
+        )"""},
+    ]),
+    (2, "add indexes for date, category, type and amount queries", [
+        # show_all_expenses / list_expenses / filter_by_date_range (InnoDB appends id)
+        "CREATE INDEX idx_expense_date ON expense (expense_date)",
+        # search_by_category ... ORDER BY expense_date
+        "CREATE INDEX idx_expense_category_date ON expense (category, expense_date)",
+        # total_expense_today / this_month / by_year: covers the SUM(amount) as well
+        "CREATE INDEX idx_expense_type_date_amount ON expense (transaction_type, expense_date, amount)",
+        # filter_by_amount_range ... ORDER BY amount
+        "CREATE INDEX idx_expense_amount ON expense (amount)",
+    ]),
+    (3, "add normalized transaction type column", [
+        {"mysql": """ALTER TABLE expense
+           ADD COLUMN transaction_type_norm VARCHAR(50)
+           AS (LOWER(TRIM(transaction_type))) STORED""",
+         # SQLite can only add VIRTUAL generated columns; the index below stores the values
+         "sqlite": """ALTER TABLE expense
+           ADD COLUMN transaction_type_norm VARCHAR(50)
+           AS (LOWER(TRIM(transaction_type))) VIRTUAL"""},
+        "CREATE INDEX idx_expense_type_norm_date ON expense (transaction_type_norm, expense_date)",
+    ]),
+    (4, "add daily rollup table for summaries", [
+        {"mysql": """CREATE TABLE IF NOT EXISTS expense_daily_rollup (
+            day DATE NOT NULL,
+            category VARCHAR(100) NOT NULL,
+            transaction_type VARCHAR(50) NOT NULL,
+            total DECIMAL(15,2) NOT NULL DEFAULT 0,
+            txn_count INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, category, transaction_type),
+            INDEX idx_rollup_type_day (transaction_type, day, total)
+        )""",
+         "sqlite": """CREATE TABLE IF NOT EXISTS expense_daily_rollup (
+            day DATE NOT NULL,
+            category VARCHAR(100) NOT NULL,
+            transaction_type VARCHAR(50) NOT NULL,
+            total DECIMAL(15,2) NOT NULL DEFAULT 0,
+            txn_count INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, category, transaction_type)
+        )"""},
+        {"sqlite": "CREATE INDEX idx_rollup_type_day ON expense_daily_rollup (transaction_type, day, total)"},
+        ROLLUP_BACKFILL,
+    ]),
+    (5, "add data version counter for conditional GETs", [
+        """CREATE TABLE IF NOT EXISTS data_version (
+            id INT PRIMARY KEY,
+            version BIGINT NOT NULL DEFAULT 0
+        )""",
+        "INSERT INTO data_version (id, version) VALUES (1, 0)",
+    ]),
+    (6, "add change tracking columns and tombstones for delta sync", [
+        "ALTER TABLE expense ADD COLUMN created_at DATETIME NULL",
+        "ALTER TABLE expense ADD COLUMN updated_at DATETIME NULL",
+        "ALTER TABLE expense ADD COLUMN change_version BIGINT NOT NULL DEFAULT 0",
+        # Existing rows join the feed as one change, so a client syncing from 0 gets them all
+        "UPDATE data_version SET version = version + 1 WHERE id = 1",
+        "UPDATE expense SET change_version = (SELECT version FROM data_version WHERE id = 1)",
+        "CREATE INDEX idx_expense_change_version ON expense (change_version)",
+        """CREATE TABLE IF NOT EXISTS expense_tombstone (
+            id INT NOT NULL,
+            deleted_at DATETIME NOT NULL,
+            change_version BIGINT NOT NULL,
+            PRIMARY KEY (id, change_version)
+        )""",
+        "CREATE INDEX idx_tombstone_change_version ON expense_tombstone (change_version)",
+    ]),
+    (7, "partition expense by year", [
+        # Every unique key of a partitioned table must contain the partitioning column.
+        # Yearly partitions are split off the catch-all one by ensure_partitions().
+        # SQLite has no partitioning; its expense_date index already limits range scans.
+        {"mysql": "ALTER TABLE expense DROP PRIMARY KEY, ADD PRIMARY KEY (id, expense_date)"},
+        {"mysql": """ALTER TABLE expense PARTITION BY RANGE COLUMNS (expense_date) (
+            PARTITION pmax VALUES LESS THAN (MAXVALUE)
+        )"""},
+    ]),
+]
+
+
+def statements_for(engine, statements):
+    """The SQL of ``statements`` for one engine, skipping dict entries without it."""
+    for statement in statements:
+        if isinstance(statement, dict):
+            statement = statement.get(engine)
+        if statement:
+            yield statement
+
+
+def _ensure_version_table(cursor):
+    cursor.execute("""CREATE TABLE IF NOT EXISTS schema_migrations (
+                          version INT PRIMARY KEY,
+                          description VARCHAR(255) NOT NULL,
+                          applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+                      )""")
+
+
+def applied_versions():
+    with db_helper.get_connection() as cursor:
+        _ensure_version_table(cursor)
+        cursor.execute("SELECT version FROM schema_migrations")
+        return {row["version"] for row in cursor.fetchall()}
+
+
+def pending_migrations(target=None):
+    done = applied_versions()
+    return [m for m in MIGRATIONS
+            if m[0] not in done and (target is None or m[0] <= target)]
+
+
+def migrate(target=None):
+    """Apply every pending migration up to ``target`` (default: latest). Returns the versions applied."""
+    applied = []
+    engine = db_helper.get_backend().name
+    for version, description, statements in pending_migrations(target):
+        logger.info("Applying migration %s: %s", version, description)
+        with db_helper.get_connection() as cursor:
+            for statement in statements_for(engine, statements):
+                cursor.execute(statement)
+            cursor.execute("INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                           (version, description))
+        applied.append(version)
+    if applied:
+        logger.info("✅ Applied migrations: %s", applied)
+    else:
+        logger.info("Schema is up to date")
+    ensure_partitions()
+    return applied
+
+
+# --- PARTITIONS (MySQL) ---
+def _partitions(cursor):
+    cursor.execute("""SELECT PARTITION_NAME AS name FROM information_schema.PARTITIONS
+                      WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'expense'
+                      AND PARTITION_NAME IS NOT NULL""")
+    return {row["name"] for row in cursor.fetchall()}
+
+
+def ensure_partitions(years_ahead=1):
+    """Split yearly partitions (``p<year>``) off ``pmax`` up to ``years_ahead`` years from now.
+
+    Starts after the newest yearly partition, or at the oldest expense on the
+    first run. Returns the years added; a no-op on engines without partitions.
+    """
+    if db_helper.get_backend().name != "mysql":
+        return []
+    with db_helper.get_connection() as cursor:
+        existing = _partitions(cursor)
+        if "pmax" not in existing:
+            return []
+        years = [int(name[1:]) for name in existing if name[1:].isdigit()]
+        if years:
+            first = max(years) + 1
+        else:
+            cursor.execute("SELECT MIN(expense_date) AS first_day FROM expense")
+            row = cursor.fetchone()
+            first = row["first_day"].year if row and row["first_day"] else date.today().year
+        wanted = list(range(first, date.today().year + years_ahead + 1))
+        if not wanted:
+            return []
+        partitions = ", ".join(f"PARTITION p{year} VALUES LESS THAN ('{year + 1}-01-01')" for year in wanted)
+        cursor.execute(f"""ALTER TABLE expense REORGANIZE PARTITION pmax INTO (
+                               {partitions}, PARTITION pmax VALUES LESS THAN (MAXVALUE))""")
+    logger.info("✅ Added expense partitions for %s", wanted)
+    return wanted
+
+
+def drop_partition(year):
+    """Drop the (archived, now empty) partition of ``year``. Returns True if it existed."""
+    if db_helper.get_backend().name != "mysql":
+        return False
+    with db_helper.get_connection() as cursor:
+        if f"p{year}" not in _partitions(cursor):
+            return False
+        cursor.execute(f"SELECT COUNT(*) AS n FROM expense PARTITION (p{year})")
+        if cursor.fetchone()["n"]:
+            raise ValueError(f"Partition p{year} still holds expenses; archive them first")
+        cursor.execute(f"ALTER TABLE expense DROP PARTITION p{year}")
+    logger.info("✅ Dropped partition p%s", year)
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply Bilancio database migrations.")
+    parser.add_argument("--target", type=int, help="stop after this version")
+    parser.add_argument("--status", action="store_true", help="show applied and pending migrations")
+    args = parser.parse_args(argv)
+
+    if args.status:
+        done = applied_versions()
+        for version, description, _ in MIGRATIONS:
+            print(f"{'[x]' if version in done else '[ ]'} {version:04d} {description}")
+        return
+    migrate(args.target)
+
+
+if __name__ == "__main__":
+    main()
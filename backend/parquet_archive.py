@@ -0,0 +1,158 @@
+"""Cold history: expenses moved out of the live table into yearly Parquet files.
+
+``db_helper.archive_expenses`` (``python -m backend.archive``) moves every
+year older than ``archive_config["keep_years"]`` into
+``<dir>/expense_<year>.parquet`` (zstd-compressed, typed like
+``columnar.expense_schema``). The daily rollup keeps the totals of archived
+days, so the summaries are unchanged; the date-filtered reads and the
+analytics of db_helper add the archived rows of the years they cover (see
+ARCHIVE there for the list).
+
+Archived rows are read-only: updates and deletes only reach the live table.
+pyarrow is imported only when an archive file is read or written.
+"""
+import os
+import re
+from datetime import date
+from backend import columnar
+
+
+archive_config = {
+    "dir": os.environ.get(
+        "BILANCIO_ARCHIVE_DIR",
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "archive")),
+    "keep_years": 2,           # the current year and the one before stay in the database
+    "row_group_size": 10000,   # rows per row group: what iter_year holds in memory at a time
+}
+
+_FILE = re.compile(r"^expense_(\d{4})\.parquet$")
+
+
+def path_for(year):
+    return os.path.join(archive_config["dir"], f"expense_{year}.parquet")
+
+
+def archived_years():
+    try:
+        names = os.listdir(archive_config["dir"])
+    except FileNotFoundError:
+        return []
+    return sorted(int(m.group(1)) for m in map(_FILE.match, names) if m)
+
+
+def years_between(start_date=None, end_date=None):
+    years = archived_years()
+    if start_date is not None:
+        years = [y for y in years if y >= _as_date(start_date).year]
+    if end_date is not None:
+        years = [y for y in years if y <= _as_date(end_date).year]
+    return years
+
+
+def _as_date(value):
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def overlaps(start_date=None, end_date=None):
+    """True if an archived year falls inside the date range (no file is opened)."""
+    return bool(years_between(start_date, end_date))
+
+
+def read_year(year):
+    if not os.path.exists(path_for(year)):
+        return []
+    import pyarrow.parquet as pq
+    return pq.read_table(path_for(year), schema=columnar.expense_schema()).to_pylist()
+
+
+def write_year(year, rows):
+    """Replace the file of ``year`` with ``rows``; an empty list removes it."""
+    path = path_for(year)
+    if not rows:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    commit_staged(year, stage_year(year, rows))
+
+
+def stage_year(year, rows):
+    """Write ``rows`` beside the file of ``year`` and return the staged path.
+
+    Rows are stored sorted by (expense_date, id), which iter_year relies on.
+    Readers keep seeing the current file until ``commit_staged`` renames the
+    staged one over it; ``discard_staged`` drops it instead.
+    """
+    import pyarrow.parquet as pq
+    os.makedirs(archive_config["dir"], exist_ok=True)
+    staged = f"{path_for(year)}.tmp"
+    rows = sorted(rows, key=lambda row: (_as_date(row["expense_date"]), row["id"]))
+    pq.write_table(columnar.to_table(rows), staged, compression="zstd",
+                   row_group_size=archive_config["row_group_size"])
+    return staged
+
+
+def commit_staged(year, staged):
+    os.replace(staged, path_for(year))
+
+
+def discard_staged(staged):
+    if os.path.exists(staged):
+        os.remove(staged)
+
+
+def read(start_date=None, end_date=None):
+    """Archived expense rows with ``start_date <= expense_date <= end_date``."""
+    years = years_between(start_date, end_date)
+    if not years:
+        return []
+    import pyarrow.parquet as pq
+    filters = []
+    if start_date is not None:
+        filters.append(("expense_date", ">=", _as_date(start_date)))
+    if end_date is not None:
+        filters.append(("expense_date", "<=", _as_date(end_date)))
+    rows = []
+    for year in years:
+        rows += pq.read_table(path_for(year), schema=columnar.expense_schema(),
+                              filters=filters or None).to_pylist()
+    return rows
+
+
+def iter_year(year, sort="date_desc"):
+    """Yield the rows of ``year``'s file in ``sort`` order (see queries.SORT_ORDERS).
+
+    The file is sorted by date, so the date orders read one row group at a
+    time. The amount orders sort the year's table in Arrow first, which holds
+    the year in memory in columnar form, but not as row dicts.
+    """
+    import pyarrow.parquet as pq
+    descending = sort.endswith("_desc")
+    file = pq.ParquetFile(path_for(year))
+    if sort.startswith("date"):
+        groups = range(file.num_row_groups)
+        for group in (reversed(groups) if descending else groups):
+            rows = file.read_row_group(group).cast(columnar.expense_schema()).to_pylist()
+            yield from (reversed(rows) if descending else rows)
+        return
+    # NULL amounts sort first ascending and last descending, as in SQL
+    order, nulls = ("descending", "at_end") if descending else ("ascending", "at_start")
+    table = file.read().cast(columnar.expense_schema()).sort_by([("amount", order, nulls), ("id", order, nulls)])
+    for batch in table.to_batches(archive_config["row_group_size"]):
+        yield from batch.to_pylist()
+
+
+def daily_totals():
+    """``(day, category, transaction_type, total, count)`` per archived day, as the rollup stores them."""
+    years = archived_years()
+    if not years:
+        return []
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    table = pa.concat_tables(pq.read_table(path_for(year), schema=columnar.expense_schema())
+                             for year in years)
+    grouped = table.group_by(["expense_date", "category", "transaction_type"]).aggregate(
+        [("amount", "sum"), ("amount", "count", pc.CountOptions(mode="all"))])
+    return [(row["expense_date"], row["category"], row["transaction_type"], row["amount_sum"] or 0,
+             row["amount_count"])
+            for row in grouped.to_pylist()]
@@ -0,0 +1,323 @@
+"""SQL of the expense read functions, shared by db_helper and db_async.
+
+Every builder returns ``(query, params)``; db_helper runs it on a pooled
+connection and db_async on an asyncio one, so the two read paths cannot drift
+apart. Builders whose SQL depends on the dialect take the storage backend.
+ARCHIVED ROWS holds the same filters, orders and groups in Python, for the
+rows of the Parquet archive that are merged into the results.
+"""
+import heapq
+import re
+from datetime import date, timedelta
+from decimal import Decimal
+from itertools import islice
+
+
+EXPENSE_FIELDS = "id, expense_date, category, sub_category, transaction_type, amount"
+
+SORT_ORDERS = {
+    "date_desc": "expense_date DESC, id DESC",
+    "date_asc": "expense_date ASC, id ASC",
+    "amount_desc": "amount DESC, id DESC",
+    "amount_asc": "amount ASC, id ASC",
+}
+
+# Periods start on the day itself, on Monday, or on the 1st of the month.
+TREND_BUCKETS = ("day", "week", "month")
+
+
+# --- COMPOSABLE FILTER ---
+def build_expense_filter(start_date=None, end_date=None, min_amount=None, max_amount=None,
+                         categories=None, sub_category=None, transaction_types=None):
+    """Compile the optional filters into a parameterized WHERE clause.
+
+    Returns ``(where_sql, params)``; ``where_sql`` is empty when no filter is set.
+    Transaction types are matched case- and space-insensitively on the indexed
+    transaction_type_norm column.
+    """
+    clauses, params = [], []
+    if start_date is not None:
+        clauses.append("expense_date >= %s")
+        params.append(start_date)
+    if end_date is not None:
+        clauses.append("expense_date <= %s")
+        params.append(end_date)
+    if min_amount is not None:
+        clauses.append("amount >= %s")
+        params.append(min_amount)
+    if max_amount is not None:
+        clauses.append("amount <= %s")
+        params.append(max_amount)
+    if categories:
+        clauses.append(f"category IN ({', '.join(['%s'] * len(categories))})")
+        params.extend(categories)
+    if sub_category:
+        clauses.append("sub_category LIKE %s")
+        params.append(f"%{sub_category}%")
+    if transaction_types:
+        clauses.append(f"transaction_type_norm IN ({', '.join(['%s'] * len(transaction_types))})")
+        params.extend(t.strip().lower() for t in transaction_types)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    return where, params
+
+
+def expense_query(sort="date_desc", limit=None, offset=0, **filters):
+    """Expenses matching every given filter, in one statement."""
+    if sort not in SORT_ORDERS:
+        raise ValueError(f"Unknown sort order: {sort!r}")
+    where, params = build_expense_filter(**filters)
+    query = f"SELECT {EXPENSE_FIELDS} FROM expense {where} ORDER BY {SORT_ORDERS[sort]}"
+    if limit is not None:
+        query += " LIMIT %s OFFSET %s"
+        params += [limit, offset]
+    return query, params
+
+
+# --- FETCH ---
+def all_expenses():
+    return f"SELECT {EXPENSE_FIELDS} FROM expense ORDER BY expense_date DESC, id DESC", ()
+
+
+def expense_by_id(expense_id):
+    return f"SELECT {EXPENSE_FIELDS} FROM expense WHERE id=%s", (expense_id,)
+
+
+def expenses_by_category(category):
+    return f"SELECT {EXPENSE_FIELDS} FROM expense WHERE category=%s ORDER BY expense_date DESC", (category,)
+
+
+def expenses_by_sub_category(sub_category, ids):
+    """By primary key when the sub-category index resolved ``ids``, else by LIKE."""
+    if ids is None:
+        return (f"SELECT {EXPENSE_FIELDS} FROM expense WHERE sub_category LIKE %s ORDER BY expense_date DESC",
+                (f"%{sub_category}%",))
+    placeholders = ", ".join(["%s"] * len(ids))
+    return (f"SELECT {EXPENSE_FIELDS} FROM expense WHERE id IN ({placeholders}) ORDER BY expense_date DESC",
+            tuple(ids))
+
+
+def expenses_by_transaction_type(transaction_type):
+    # transaction_type_norm = LOWER(TRIM(transaction_type)), a stored and indexed column
+    # (migration 3), so case/space-insensitive matching does not scan the table
+    return (f"""SELECT {EXPENSE_FIELDS} FROM expense
+                WHERE transaction_type_norm = LOWER(TRIM(%s)) ORDER BY expense_date DESC""",
+            (transaction_type,))
+
+
+def expenses_by_date_range(start_date, end_date):
+    return (f"""SELECT {EXPENSE_FIELDS} FROM expense
+                WHERE expense_date BETWEEN %s AND %s
+                ORDER BY expense_date DESC""", (start_date, end_date))
+
+
+def expenses_by_amount_range(min_amount, max_amount):
+    return (f"""SELECT {EXPENSE_FIELDS} FROM expense
+                WHERE amount BETWEEN %s AND %s
+                ORDER BY amount DESC""", (min_amount, max_amount))
+
+
+# --- KEYSET PAGINATION ---
+def encode_page_cursor(row):
+    return f"{row['expense_date'].isoformat()}_{row['id']}"
+
+
+def decode_page_cursor(after):
+    try:
+        day, expense_id = after.rsplit("_", 1)
+        return date.fromisoformat(day), int(expense_id)
+    except (AttributeError, ValueError):
+        raise ValueError(f"Invalid page cursor: {after!r}")
+
+
+def expense_page(limit, after=None):
+    """One row more than ``limit``, so page_result can tell whether another page follows."""
+    params = []
+    where = ""
+    if after:
+        after_date, after_id = decode_page_cursor(after)
+        where = "WHERE expense_date <= %s AND (expense_date < %s OR id < %s)"
+        params += [after_date, after_date, after_id]
+    return (f"""SELECT {EXPENSE_FIELDS} FROM expense {where}
+                ORDER BY expense_date DESC, id DESC LIMIT %s""", (*params, limit + 1))
+
+
+def page_result(rows, limit):
+    items = rows[:limit]
+    next_after = encode_page_cursor(items[-1]) if len(rows) > limit else None
+    return {"items": items, "next_after": next_after}
+
+
+# --- ANALYTICS ---
+def totals_by_type(backend, **filters):
+    where, params = build_expense_filter(**filters)
+    return (f"""SELECT transaction_type_norm AS transaction_type,
+                       {backend.money_sum("amount")} AS total, COUNT(*) AS count
+                FROM expense {where}
+                GROUP BY transaction_type_norm
+                ORDER BY total DESC""", params)
+
+
+def totals_summary(by_type):
+    """expense_totals' result from the rows of totals_by_type."""
+    totals = {row["transaction_type"]: float(row["total"] or 0) for row in by_type}
+    return {
+        "total_income": totals.get("income", 0.0),
+        "total_expense": totals.get("expense", 0.0),
+        "count": sum(row["count"] for row in by_type),
+        "by_type": by_type,
+    }
+
+
+def category_totals(backend, **filters):
+    where, params = build_expense_filter(**filters)
+    return (f"""SELECT category, {backend.money_sum("amount")} AS total, COUNT(*) AS count
+                FROM expense {where}
+                GROUP BY category
+                ORDER BY total DESC""", params)
+
+
+def trend(backend, bucket, **filters):
+    if bucket not in TREND_BUCKETS:
+        raise ValueError(f"Unknown trend bucket: {bucket!r}")
+    where, params = build_expense_filter(**filters)
+    return (f"""SELECT {backend.date_bucket(bucket, "expense_date")} AS period,
+                       {backend.money_sum("amount")} AS total, COUNT(*) AS count
+                FROM expense {where}
+                GROUP BY period
+                ORDER BY period""", params)
+
+
+# --- ROLLUP TOTALS ---
+# Totals read the daily rollup, so their cost grows with the number of days
+# in range rather than the number of transactions.
+def expense_total(backend, first_day, last_day):
+    return (f"""SELECT {backend.money_sum("total")} AS total FROM expense_daily_rollup
+                WHERE day BETWEEN %s AND %s
+                AND transaction_type = 'Expense'""", (first_day, last_day))
+
+
+def total_value(row):
+    return float(row["total"]) if row and row["total"] else 0.0
+
+
+def expense_totals_by_year(backend):
+    year = backend.year("day")
+    return (f"""SELECT {year} AS year, {backend.money_sum("total")} AS total
+                FROM expense_daily_rollup
+                WHERE transaction_type = 'Expense'
+                GROUP BY {year}
+                ORDER BY year DESC""", ())
+
+
+# --- ARCHIVED ROWS ---
+# Rows of the Parquet archive never pass through SQL: they are filtered, sorted
+# and grouped here with the meaning of build_expense_filter, SORT_ORDERS and the
+# analytics above, then merged with the live rows.
+CENT = Decimal("0.01")
+
+
+def _as_date(value):
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _like(term):
+    """``LIKE '%term%'`` as a regex: case-insensitive, ``%`` and ``_`` as wildcards."""
+    pattern = "".join(".*" if c == "%" else "." if c == "_" else re.escape(c) for c in term)
+    return re.compile(pattern, re.IGNORECASE | re.DOTALL)
+
+
+def matches(row, start_date=None, end_date=None, min_amount=None, max_amount=None,
+            categories=None, sub_category=None, transaction_types=None):
+    """True if ``row`` passes the WHERE clause build_expense_filter would write."""
+    day, amount = _as_date(row["expense_date"]), row["amount"]
+    if start_date is not None and day < _as_date(start_date):
+        return False
+    if end_date is not None and day > _as_date(end_date):
+        return False
+    if min_amount is not None and (amount is None or amount < Decimal(str(min_amount))):
+        return False
+    if max_amount is not None and (amount is None or amount > Decimal(str(max_amount))):
+        return False
+    if categories and row["category"] not in categories:
+        return False
+    if sub_category and not _like(sub_category).search(row["sub_category"] or ""):
+        return False
+    if transaction_types and (row["transaction_type"] or "").strip().lower() not in {
+            t.strip().lower() for t in transaction_types}:
+        return False
+    return True
+
+
+def _sort_key(sort):
+    """``(key, reverse)`` putting rows in the order of SORT_ORDERS[sort] (NULL amounts sort low)."""
+    if sort not in SORT_ORDERS:
+        raise ValueError(f"Unknown sort order: {sort!r}")
+    column, direction = sort.split("_")
+    if column == "date":
+        key = lambda row: (_as_date(row["expense_date"]), row["id"])
+    else:
+        key = lambda row: (row["amount"] is not None, row["amount"] or 0, row["id"])
+    return key, direction == "desc"
+
+
+def merge_sorted(*streams, sort="date_desc"):
+    """Iterate lazily over row streams that are each already in ``sort`` order, as one."""
+    key, reverse = _sort_key(sort)
+    return heapq.merge(*streams, key=key, reverse=reverse)
+
+
+def merge_page(rows, archived, sort="date_desc", limit=None, offset=0):
+    """Rows ``offset`` to ``offset + limit`` of live ``rows`` and ``archived`` rows together.
+
+    ``rows`` must run from the start of the order to the end of the page, as
+    ``expense_query(sort, offset + limit, 0, ...)`` fetches them.
+    """
+    return list(islice(merge_sorted(rows, archived, sort=sort), offset, None if limit is None else offset + limit))
+
+
+def period_start(day, bucket):
+    """The first day of ``day``'s ``bucket``, as backend.date_bucket computes it."""
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+
+def group_totals(rows, by, bucket="day"):
+    """``[{by, "total", "count"}]`` of ``rows``, grouped like totals_by_type, category_totals or trend.
+
+    ``by`` is "transaction_type" (normalized), "category" or "period" (of ``bucket``).
+    """
+    groups = {}
+    for row in rows:
+        if by == "period":
+            key = period_start(_as_date(row["expense_date"]), bucket)
+        elif by == "transaction_type":
+            key = (row["transaction_type"] or "").strip().lower()
+        else:
+            key = row[by]
+        total, count = groups.get(key, (Decimal(0), 0))
+        groups[key] = (total + (row["amount"] or 0), count + 1)
+    return [{by: key, "total": total.quantize(CENT), "count": count} for key, (total, count) in groups.items()]
+
+
+def merge_groups(rows, archived, by):
+    """Analytics rows of the live table plus group_totals of the archive, added up per ``by``.
+
+    Ordered like the SQL: by period for a trend, else by total, largest first.
+    """
+    if not archived:
+        return rows
+    groups = {}
+    for row in list(rows) + archived:
+        key = _as_date(row[by]) if by == "period" else row[by]
+        total = Decimal(str(row["total"] or 0)).quantize(CENT)
+        if key in groups:
+            groups[key]["total"] += total
+            groups[key]["count"] += row["count"]
+        else:
+            groups[key] = {by: key, "total": total, "count": row["count"]}
+    if by == "period":
+        return sorted(groups.values(), key=lambda row: row["period"])
+    return sorted(groups.values(), key=lambda row: row["total"], reverse=True)
@@ -0,0 +1,87 @@
+import itertools
+import threading
+import time
+from logging_setup import setup_logger
+
+
+logger = setup_logger('replicas')
+
+
+class Replica:
+    """One read replica: its storage backend, connection pool and last known health."""
+
+    def __init__(self, name, backend, pool):
+        self.name = name
+        self.backend = backend
+        self.pool = pool
+        self.healthy = True        # optimistic until the first check says otherwise
+        self.version = None        # data version the replica had at its last check
+        self.checked_at = None
+        self.error = None
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "healthy": self.healthy,
+            "data_version": self.version,
+            "checked_at": self.checked_at,
+            "error": self.error,
+            "pool": self.pool.stats(),
+        }
+
+
+class ReplicaSet:
+    """Round-robin choice among healthy replicas, re-checked by a background thread.
+
+    ``check(replica)`` returns the replica's data version or raises; it runs for
+    every replica each ``interval`` seconds. Choosing a replica never touches
+    the network, so it is safe from async code.
+    """
+
+    def __init__(self, replicas, check, interval=5.0):
+        self.replicas = replicas
+        self.interval = interval
+        self._check = check
+        self._turn = itertools.count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="replica-health", daemon=True)
+        self._thread.start()
+
+    def choose(self, min_version=None):
+        """A healthy replica that has caught up to ``min_version``, or None."""
+        candidates = [r for r in self.replicas
+                      if r.healthy and (min_version is None or (r.version or 0) >= min_version)]
+        if not candidates:
+            return None
+        return candidates[next(self._turn) % len(candidates)]
+
+    def mark_down(self, replica, error):
+        if replica.healthy:
+            logger.warning("⚠️ Replica %s is down, its reads go to the primary: %s", replica.name, error)
+        replica.healthy = False
+        replica.error = str(error)
+
+    def check_all(self):
+        for replica in self.replicas:
+            try:
+                version = self._check(replica)
+            except Exception as e:
+                self.mark_down(replica, e)
+                continue
+            if not replica.healthy:
+                logger.info("✅ Replica %s is back", replica.name)
+            replica.version, replica.error, replica.checked_at = version, None, time.time()
+            replica.healthy = True
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.check_all()
+            self._stop.wait(self.interval)
+
+    def close(self):
+        self._stop.set()
+        for replica in self.replicas:
+            replica.pool.dispose()
+
+    def stats(self):
+        return [replica.stats() for replica in self.replicas]
@@ -0,0 +1,121 @@
+"""Fast JSON responses with optional compact shape and compression.
+
+FastAPI runs ``jsonable_encoder`` over whatever a route returns, which walks
+every row, Decimal and date in Python. Routes with large results instead
+return ``json_response(...)``: the content is rendered straight to bytes with
+orjson and, above ``response_config["compress_min_size"]``, compressed with
+brotli or gzip according to the request's ``Accept-Encoding``.
+
+``shape="columns"`` sends a list of rows as ``{"columns": [...], "rows": [[...], ...]}``
+so column names are not repeated in every row.
+
+orjson and brotli are optional: without them the stdlib ``json`` module and
+gzip are used.
+"""
+import gzip
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from operator import itemgetter
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+response_config = {
+    "compress_min_size": 1024,   # bytes; smaller bodies are sent as they are
+    "gzip_level": 6,
+    "brotli_quality": 4,         # 0-11; higher is smaller but slower
+}
+
+
+def _default(value):
+    # Same numbers jsonable_encoder produces: whole Decimals as int, others as float
+    if isinstance(value, Decimal):
+        return int(value) if value.as_tuple().exponent >= 0 else float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def render_json(content):
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, separators=(",", ":")).encode("utf-8")
+
+
+def to_columns(rows):
+    """``[{col: value}, ...]`` -> ``{"columns": [...], "rows": [[...], ...]}``."""
+    columns = list(rows[0]) if rows else []
+    if len(columns) <= 1:
+        return {"columns": columns, "rows": [[row[c] for c in columns] for row in rows]}
+    pick = itemgetter(*columns)
+    return {"columns": columns, "rows": [list(pick(row)) for row in rows]}
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson; Decimal and date are handled natively."""
+
+    def render(self, content):
+        return render_json(content)
+
+
+def _accepted_encodings(accept_encoding):
+    accepted = {}
+    for item in (accept_encoding or "").split(","):
+        coding, *params = [part.strip() for part in item.split(";")]
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if coding:
+            accepted[coding.lower()] = q
+    return accepted
+
+
+def compress(request, body, min_size=None):
+    """Return ``(body, headers)``, compressed if the client accepts it and the body is large enough."""
+    headers = {"Vary": "Accept-Encoding"}
+    min_size = response_config["compress_min_size"] if min_size is None else min_size
+    if len(body) < min_size:
+        return body, headers
+    accepted = _accepted_encodings(request.headers.get("accept-encoding"))
+    if brotli is not None and accepted.get("br", 0) > 0:
+        headers["Content-Encoding"] = "br"
+        return brotli.compress(body, quality=response_config["brotli_quality"]), headers
+    if accepted.get("gzip", 0) > 0:
+        headers["Content-Encoding"] = "gzip"
+        return gzip.compress(body, compresslevel=response_config["gzip_level"]), headers
+    return body, headers
+
+
+def json_response(request, content, shape="records", compress_body=True, min_size=None,
+                  status_code=200, headers=None):
+    """Render ``content`` to a ready Response, bypassing FastAPI's jsonable_encoder.
+
+    ``shape="columns"`` converts a list of rows, or the ``items`` of a page dict,
+    to the compact columns/rows form. ``compress_body`` and ``min_size``
+    set the compression behaviour for this route.
+    """
+    if shape == "columns":
+        if isinstance(content, list):
+            content = to_columns(content)
+        elif isinstance(content, dict) and isinstance(content.get("items"), list):
+            content = {**{k: v for k, v in content.items() if k != "items"}, **to_columns(content["items"])}
+    body = render_json(content)
+    extra = {}
+    if compress_body:
+        body, extra = compress(request, body, min_size)
+    return Response(body, status_code=status_code, media_type="application/json",
+                    headers={**extra, **(headers or {})})
@@ -0,0 +1,95 @@
+"""Verify or rebuild the expense_daily_rollup table from the expense table.
+
+Days moved to the Parquet archive (backend.parquet_archive) count as well:
+their rollup rows are kept when the detail rows leave the table.
+
+    python -m backend.rollup verify    # report days whose rollup differs from the base table
+    python -m backend.rollup rebuild   # recompute the whole rollup in one transaction
+"""
+import argparse
+import sys
+from decimal import Decimal
+from backend import db_helper, parquet_archive
+from backend.migrations import ROLLUP_BACKFILL
+from logging_setup import setup_logger
+
+
+logger = setup_logger('rollup')
+
+
+CENT = Decimal("0.01")
+
+
+def _totals(cursor, query):
+    # str() first: SQLite hands back sums as floats
+    cursor.execute(query)
+    return {(str(row["day"]), row["category"], row["transaction_type"]):
+            (Decimal(str(row["total"] or 0)).quantize(CENT), int(row["txn_count"]))
+            for row in cursor.fetchall()}
+
+
+def _with_archive(totals):
+    for day, category, transaction_type, total, count in parquet_archive.daily_totals():
+        key = (str(day), category, transaction_type)
+        live_total, live_count = totals.get(key, (Decimal(0), 0))
+        totals[key] = ((live_total + total).quantize(CENT), live_count + count)
+    return totals
+
+
+def verify():
+    """Return a list of mismatches between the rollup and a fresh aggregation of the base table."""
+    logger.info("Verifying expense_daily_rollup against expense")
+    with db_helper.get_connection() as cursor:
+        expected = _totals(cursor, """SELECT expense_date AS day, category, transaction_type,
+                                             COALESCE(SUM(amount), 0) AS total, COUNT(*) AS txn_count
+                                      FROM expense
+                                      GROUP BY expense_date, category, transaction_type""")
+        expected = _with_archive(expected)
+        actual = _totals(cursor, """SELECT day, category, transaction_type, total, txn_count
+                                    FROM expense_daily_rollup WHERE txn_count > 0""")
+
+    mismatches = []
+    for key in sorted(expected.keys() | actual.keys(), key=str):
+        if expected.get(key) != actual.get(key):
+            day, category, transaction_type = key
+            mismatches.append({
+                "day": day, "category": category, "transaction_type": transaction_type,
+                "expected": expected.get(key), "actual": actual.get(key),
+            })
+    if mismatches:
+        logger.warning("⚠️ Rollup has %s mismatched keys", len(mismatches))
+    else:
+        logger.info("✅ Rollup matches the expense table")
+    return mismatches
+
+
+def rebuild():
+    """Recompute the rollup from scratch. Returns the number of rollup rows written."""
+    logger.info("Rebuilding expense_daily_rollup")
+    with db_helper.get_connection() as cursor:
+        cursor.execute("DELETE FROM expense_daily_rollup")
+        cursor.execute(ROLLUP_BACKFILL)
+        db_helper._rollup_apply(cursor, parquet_archive.daily_totals())
+        cursor.execute("SELECT COUNT(*) AS n FROM expense_daily_rollup")
+        rows = cursor.fetchone()["n"]
+    logger.info("✅ Rollup rebuilt with %s rows", rows)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verify or rebuild the daily expense rollup.")
+    parser.add_argument("command", choices=["verify", "rebuild"])
+    args = parser.parse_args(argv)
+
+    if args.command == "rebuild":
+        rebuild()
+        return 0
+    mismatches = verify()
+    for m in mismatches:
+        print(f"{m['day']} {m['category']} {m['transaction_type']}: "
+              f"expected {m['expected']}, found {m['actual']}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
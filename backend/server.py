@@ -1,14 +1,107 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from datetime import date
-from backend import db_helper
-from logging_setup import setup_logger
+import codecs
+import csv
+import io
+import json
+import time
+from contextlib import asynccontextmanager
+from email.utils import formatdate, parsedate_to_datetime
+from typing import List, Literal, Optional
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, PlainTextResponse, Response, StreamingResponse
+from fastapi.routing import APIRoute
+from pydantic import BaseModel, ValidationError
+from datetime import date, datetime
+from backend import columnar, db_async, db_helper, exports, metrics, responses, write_queue
+from backend.responses import FastJSONResponse
+from logging_setup import sampled, setup_logger
 
 # 1. Logger Setup
 logger = setup_logger("fastapi_app")
 
 # 2. App Start
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app):
+    try:
+        await run_in_threadpool(db_helper.sync_sub_category_index)
+    except Exception as e:
+        logger.error("❌ Could not load the sub-category index (loaded on first search instead): %s", e)
+    if db_helper.analytics_config["engine"]:
+        try:
+            await run_in_threadpool(db_helper.sync_analytics_engine)
+        except Exception as e:
+            logger.error("❌ Could not load the analytics engine (loaded on first query instead): %s", e)
+    yield
+    await write_queue.drain()
+    await db_async.dispose_pool()
+
+# --- CONDITIONAL GET ---
+# GET routes under these prefixes carry an ETag and Last-Modified derived from
+# db_helper.data_version(), and answer a matching If-None-Match / If-Modified-Since
+# with 304 before the handler (and the database) is reached.
+CONDITIONAL_PREFIXES = ("/expenses", "/summary", "/analytics", "/suggest")
+
+async def _validators():
+    if db_helper.data_version_is_stale():
+        version, modified_at = await run_in_threadpool(db_helper.data_version)
+    else:
+        version, modified_at = db_helper.data_version()
+    # /summary/today and /summary/month change with the date as well as the data
+    today = date.today()
+    etag = f'W/"{version}-{today:%Y%m%d}"'
+    modified_at = max(modified_at, datetime.combine(today, datetime.min.time()).timestamp())
+    return etag, formatdate(modified_at, usegmt=True), modified_at
+
+def _not_modified(request, etag, modified_at):
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [t.strip() for t in if_none_match.split(",")]
+        # weak comparison: W/"x" matches "x"
+        return "*" in tags or any(t.removeprefix("W/") == etag.removeprefix("W/") for t in tags)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            return int(modified_at) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+class ConditionalRoute(APIRoute):
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        if "GET" not in self.methods or not self.path.startswith(CONDITIONAL_PREFIXES):
+            return handler
+
+        async def conditional_handler(request):
+            etag, last_modified, modified_at = await _validators()
+            headers = {"ETag": etag, "Last-Modified": last_modified, "Cache-Control": "no-cache"}
+            if _not_modified(request, etag, modified_at):
+                return Response(status_code=304, headers=headers)
+            response = await handler(request)
+            if response.status_code == 200:
+                response.headers.update(headers)
+            return response
+
+        return conditional_handler
+
+# Read routes are async and use db_async; writes run db_helper in the threadpool.
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
+app.router.route_class = ConditionalRoute
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    # Label by route template (/expenses/id/{expense_id}), not the raw path, to keep cardinality bounded
+    route = request.scope.get("route")
+    path = route.path if route is not None else "unmatched"
+    elapsed = time.perf_counter() - start
+    metrics.HTTP_REQUESTS.inc(method=request.method, route=path, status=response.status_code)
+    metrics.HTTP_LATENCY.observe(elapsed, method=request.method, route=path)
+    size = response.headers.get("content-length")
+    if size is not None:
+        metrics.HTTP_RESPONSE_SIZE.observe(int(size), method=request.method, route=path)
+    return response
 
 # 3. Data Models
 class ExpenseCreate(BaseModel):
@@ -25,90 +118,421 @@ class ExpenseUpdate(BaseModel):
     transaction_type: str
     amount: float
 
+class ExpenseChanges(BaseModel):
+    expense_date: Optional[date] = None
+    category: Optional[str] = None
+    sub_category: Optional[str] = None
+    transaction_type: Optional[str] = None
+    amount: Optional[float] = None
+
+class BulkSelection(BaseModel):
+    """Either ``ids`` or any of the filters selects the expenses to change."""
+    ids: Optional[List[int]] = None
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    categories: Optional[List[str]] = None
+    transaction_types: Optional[List[str]] = None
+
+    def selection(self):
+        if self.ids is not None:
+            return {"ids": self.ids}
+        return {"filters": self.model_dump(exclude={"ids", "changes"}, exclude_none=True)}
+
+class BulkUpdate(BulkSelection):
+    changes: ExpenseChanges
+
+class ExportRequest(BaseModel):
+    format: Literal["csv", "pdf"]
+    name: str = "report"
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    min_amount: Optional[float] = None
+    max_amount: Optional[float] = None
+    categories: Optional[List[str]] = None
+    sub_category: Optional[str] = None
+    transaction_types: Optional[List[str]] = None
+    sort: Literal["date_desc", "date_asc", "amount_desc", "amount_asc"] = "date_desc"
+
 # --- ADD EXPENSE (POST) ---
 @app.post("/expenses")
-def add_expense(expense: ExpenseCreate):
-    logger.info(f"POST /expenses called | Data: {expense.dict()}")
+async def add_expense(expense: ExpenseCreate):
+    """Insert one expense. With group commit enabled (see backend.write_queue) the row
+    shares a transaction with other concurrent inserts; the response still follows its commit."""
+    logger.info("POST /expenses called")
+    logger.debug("POST /expenses data: %s", expense)
     try:
-        db_helper.add_expense(
-            expense.expense_date,
-            expense.category,
-            expense.sub_category,
-            expense.transaction_type,
-            expense.amount
-        )
+        if write_queue.write_queue_config["enabled"]:
+            expense_id = await write_queue.submit(expense.model_dump())
+        else:
+            expense_id = await run_in_threadpool(
+                db_helper.add_expense,
+                expense.expense_date,
+                expense.category,
+                expense.sub_category,
+                expense.transaction_type,
+                expense.amount
+            )
         logger.info("Expense added successfully")
-        return {"message": "Expense added successfully"}
+        return {"message": "Expense added successfully", "id": expense_id}
+    except write_queue.QueueFull as e:
+        logger.warning("⚠️ Write queue full, rejecting POST /expenses: %s", e)
+        raise HTTPException(status_code=503, detail="Too many pending writes, retry shortly",
+                            headers={"Retry-After": "1"})
     except Exception as e:
-        logger.error(f"Error adding expense: {e}")
+        logger.error("Error adding expense: %s", e)
         raise HTTPException(status_code=500, detail="Failed to add expense")
 
+# --- BULK INSERT (POST) ---
+def _bulk_summary(results, errors=None):
+    summary = {
+        "inserted": sum(r["inserted"] for r in results),
+        "failed_batches": sum(1 for r in results if not r["ok"]),
+        "batches": results,
+    }
+    if errors is not None:
+        summary["invalid_rows"] = errors
+    return summary
+
+@app.post("/expenses/bulk")
+def add_expenses_bulk(expenses: List[ExpenseCreate], batch_size: int = Query(1000, ge=1, le=10000)):
+    logger.info("POST /expenses/bulk called | %s rows, batch_size=%s", len(expenses), batch_size)
+    results = db_helper.add_expenses((e.model_dump() for e in expenses), batch_size)
+    return _bulk_summary(results)
+
+# --- BULK UPDATE / DELETE (PATCH, DELETE) ---
+# Declared before /expenses/{expense_id} so "bulk" is not taken for an id.
+@app.patch("/expenses/bulk")
+def update_expenses_bulk(request: BulkUpdate, chunk_size: int = Query(1000, ge=1, le=10000)):
+    logger.info("PATCH /expenses/bulk called")
+    try:
+        return db_helper.update_expenses(request.changes.model_dump(exclude_none=True),
+                                         chunk_size=chunk_size, **request.selection())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("Error in bulk update: %s", e)
+        raise HTTPException(status_code=500, detail="Bulk update failed")
+
+@app.delete("/expenses/bulk")
+def delete_expenses_bulk(request: BulkSelection, chunk_size: int = Query(1000, ge=1, le=10000)):
+    logger.info("DELETE /expenses/bulk called")
+    try:
+        return db_helper.delete_expenses(chunk_size=chunk_size, **request.selection())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("Error in bulk delete: %s", e)
+        raise HTTPException(status_code=500, detail="Bulk delete failed")
+
+async def _request_lines(request):
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    async for chunk in request.stream():
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending.strip():
+        yield pending
+
+MAX_REPORTED_ERRORS = 100
+
+@app.post("/expenses/upload")
+async def upload_expenses(request: Request, format: str = Query("csv", pattern="^(csv|ndjson)$"),
+                          batch_size: int = Query(1000, ge=1, le=10000)):
+    """Stream a CSV (with header row) or NDJSON body into the expense table.
+
+    The body is parsed record by record and inserted batch by batch, so only one batch
+    is held in memory. A quoted CSV field may span lines. Invalid records are skipped
+    and reported with the number of their first line.
+    """
+    logger.info("POST /expenses/upload called | format=%s, batch_size=%s", format, batch_size)
+    results, errors, batch, header = [], [], [], None
+    line_no, text, first_line = 0, None, 0
+
+    async for line in _request_lines(request):
+        line_no += 1
+        if text is None:
+            text, first_line = line, line_no
+        else:
+            text += "\n" + line
+        if format == "csv" and text.count('"') % 2:
+            continue          # a quoted field runs on to the next line
+        record_text, text = text, None
+        if not record_text.strip():
+            continue
+        try:
+            if format == "csv":
+                values = next(csv.reader(io.StringIO(record_text)))
+                if header is None:
+                    header = [h.strip() for h in values]
+                    continue
+                record = dict(zip(header, values))
+            else:
+                record = json.loads(record_text)
+            batch.append(ExpenseCreate.model_validate(record).model_dump())
+        except (ValidationError, ValueError) as e:
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({"line": first_line, "error": str(e)})
+            continue
+
+        if len(batch) >= batch_size:
+            results += await run_in_threadpool(db_helper.add_expenses, batch, batch_size, len(results) + 1)
+            batch = []
+
+    if text is not None and len(errors) < MAX_REPORTED_ERRORS:
+        errors.append({"line": first_line, "error": "Unterminated quoted field"})
+    if batch:
+        results += await run_in_threadpool(db_helper.add_expenses, batch, batch_size, len(results) + 1)
+
+    logger.info("Upload finished: %s lines, %s invalid", line_no, len(errors))
+    return _bulk_summary(results, errors)
+
+# --- RESPONSE FORMATS ---
+# Large results skip jsonable_encoder: they are rendered by responses.json_response
+# (orjson, optional columns/rows shape, gzip/brotli above a size threshold) or,
+# when the Accept header prefers it, encoded as Arrow IPC / Parquet.
+Shape = Literal["records", "columns"]
+
+async def _rows_response(request, content, shape="records", headers=None):
+    """``content`` is a list of rows or a page dict with ``items`` and ``next_after``."""
+    media_type = columnar.negotiate(request.headers.get("accept"))
+    if media_type is None:
+        return await run_in_threadpool(responses.json_response, request, content, shape, headers=headers)
+    if isinstance(content, dict):
+        if content["next_after"]:
+            headers = {**(headers or {}), "X-Next-After": content["next_after"]}
+        content = content["items"]
+    body = await run_in_threadpool(columnar.serialize, content, media_type)
+    extra = {}
+    if media_type == columnar.ARROW_STREAM:        # Parquet is compressed already
+        body, extra = responses.compress(request, body)
+    return Response(body, media_type=media_type,
+                    headers={"Vary": "Accept", **extra, **(headers or {})})
+
 # --- FETCH ALL (GET) ---
+def _ndjson_lines(rows):
+    for row in rows:
+        yield responses.render_json(row) + b"\n"
+
 @app.get("/expenses")
-def get_all_expenses():
-    logger.info("GET /expenses called")
-    data = db_helper.show_all_expenses()
-    logger.info(f"Returning {len(data)} expenses")
-    return data
+async def get_all_expenses(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    after: Optional[str] = None,
+    stream: bool = False,
+    shape: Shape = "records",
+):
+    """All expenses, newest first.
+
+    - ``stream=true`` streams every row as NDJSON (or Arrow record batches) with constant memory.
+    - ``limit``/``after`` return one keyset-paginated page plus ``next_after``; columnar
+      pages carry the cursor in the ``X-Next-After`` header instead.
+    - With no parameters the full list is returned as before.
+    - ``shape=columns`` returns JSON as ``{"columns": [...], "rows": [[...]]}``.
+
+    Send ``Accept: application/vnd.apache.arrow.stream`` or ``application/vnd.apache.parquet``
+    for a typed columnar body instead of JSON.
+    """
+    media_type = columnar.negotiate(request.headers.get("accept"))
+    if stream:
+        if media_type == columnar.ARROW_STREAM:
+            logger.info("GET /expenses called | streaming Arrow IPC")
+            return StreamingResponse(columnar.ipc_chunks(db_helper.stream_expenses()),
+                                     media_type=media_type, headers={"Vary": "Accept"})
+        logger.info("GET /expenses called | streaming NDJSON")
+        return StreamingResponse(_ndjson_lines(db_helper.stream_expenses()),
+                                 media_type="application/x-ndjson")
+
+    if limit is not None or after is not None:
+        logger.info("GET /expenses called | limit=%s, after=%s", limit, after, extra=sampled(100))
+        try:
+            page = await db_async.list_expenses(limit or 100, after)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return await _rows_response(request, page, shape)
+
+    logger.info("GET /expenses called", extra=sampled(100))
+    data = await db_async.show_all_expenses()
+    logger.debug("Returning %s expenses", len(data))
+    return await _rows_response(request, data, shape)
+
+@app.get("/expenses/changes")
+def get_expense_changes(request: Request, since: int = Query(0, ge=0),
+                        limit: int = Query(1000, ge=1, le=10000)):
+    """Rows added or updated and ids deleted after data version ``since``.
+
+    Start from ``since=0`` and pass ``next_since`` back until ``has_more`` is
+    false; backend.delta_sync applies the pages to a local DataFrame.
+    """
+    logger.info("GET /expenses/changes called | since=%s, limit=%s", since, limit, extra=sampled(100))
+    return responses.json_response(request, db_helper.expense_changes(since, limit))
 
 # --- SEARCH ENDPOINTS ---
 @app.get("/expenses/id/{expense_id}")
-def get_by_id(expense_id: int):
-    logger.info(f"GET /expenses/id/{expense_id} called")
-    data = db_helper.search_by_id(expense_id)
+async def get_by_id(expense_id: int):
+    logger.info("GET /expenses/id/%s called", expense_id)
+    data = await db_async.search_by_id(expense_id)
     if not data:
-        logger.warning(f"Expense ID {expense_id} not found")
+        logger.warning("Expense ID %s not found", expense_id)
         raise HTTPException(status_code=404, detail="Expense not found")
     return data
 
 @app.get("/expenses/category/{category}")
-def get_by_category(category: str):
-    logger.info(f"GET /expenses/category/{category} called")
-    return db_helper.search_by_category(category)
+async def get_by_category(category: str, request: Request, shape: Shape = "records"):
+    logger.info("GET /expenses/category/%s called", category)
+    return await _rows_response(request, await db_async.search_by_category(category), shape)
 
 @app.get("/expenses/subcategory/{sub_category}")
-def get_by_subcategory(sub_category: str):
-    logger.info(f"GET /expenses/subcategory/{sub_category} called")
-    return db_helper.search_by_sub_category(sub_category)
+async def get_by_subcategory(sub_category: str, request: Request, shape: Shape = "records"):
+    logger.info("GET /expenses/subcategory/%s called", sub_category)
+    return await _rows_response(request, await db_async.search_by_sub_category(sub_category), shape)
 
 @app.get("/expenses/type/{transaction_type}")
-def get_by_type(transaction_type: str):
-    logger.info(f"GET /expenses/type/{transaction_type} called")
-    return db_helper.search_by_transaction_type(transaction_type)
+async def get_by_type(transaction_type: str, request: Request, shape: Shape = "records"):
+    logger.info("GET /expenses/type/%s called", transaction_type)
+    return await _rows_response(request, await db_async.search_by_transaction_type(transaction_type), shape)
 
 # --- FILTER ENDPOINTS ---
 @app.get("/expenses/filter/date_range")
-def filter_date(start_date: date, end_date: date):
-    logger.info(f"GET /expenses/filter/date_range called | {start_date} to {end_date}")
-    return db_helper.filter_by_date_range(start_date, end_date)
+async def filter_date(start_date: date, end_date: date, request: Request, shape: Shape = "records"):
+    logger.info("GET /expenses/filter/date_range called | %s to %s", start_date, end_date)
+    return await _rows_response(request, await db_async.filter_by_date_range(start_date, end_date), shape)
 
 @app.get("/expenses/filter/amount_range")
-def filter_amount(min_amount: float, max_amount: float):
-    logger.info(f"GET /expenses/filter/amount_range called | {min_amount} to {max_amount}")
-    return db_helper.filter_by_amount_range(min_amount, max_amount)
+async def filter_amount(min_amount: float, max_amount: float, request: Request, shape: Shape = "records"):
+    logger.info("GET /expenses/filter/amount_range called | %s to %s", min_amount, max_amount)
+    return await _rows_response(request, await db_async.filter_by_amount_range(min_amount, max_amount), shape)
+
+def expense_filters(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    category: Optional[List[str]] = Query(None),
+    sub_category: Optional[str] = None,
+    transaction_type: Optional[List[str]] = Query(None),
+):
+    """Filter parameters shared by /expenses/query and /analytics/*."""
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "min_amount": min_amount,
+        "max_amount": max_amount,
+        "categories": category,
+        "sub_category": sub_category,
+        "transaction_types": transaction_type,
+    }
+
+@app.get("/expenses/query")
+async def query_expenses(
+    request: Request,
+    filters: dict = Depends(expense_filters),
+    sort: str = Query("date_desc", pattern="^(date|amount)_(asc|desc)$"),
+    limit: Optional[int] = Query(None, ge=1, le=10000),
+    offset: int = Query(0, ge=0),
+    shape: Shape = "records",
+):
+    """Combine any of the filters; everything is evaluated by a single SQL query."""
+    logger.info("GET /expenses/query called")
+    rows = await db_async.query_expenses(**filters, sort=sort, limit=limit, offset=offset)
+    return await _rows_response(request, rows, shape)
+
+# --- TYPEAHEAD ---
+@app.get("/suggest/sub_category")
+async def suggest_sub_category(q: str = "", limit: int = Query(10, ge=1, le=100)):
+    """Sub-categories containing ``q``, prefix matches first, from the in-memory index."""
+    logger.debug("GET /suggest/sub_category called | q=%s", q)
+    return await db_async.suggest_sub_categories(q, limit)
 
 # --- TOTALS / ANALYTICS ---
 @app.get("/summary/today")
-def total_today():
+async def total_today():
     logger.info("GET /summary/today called")
-    total = db_helper.total_expense_today()
+    total = await db_async.total_expense_today()
     return {"total_expense_today": total}
 
 @app.get("/summary/month")
-def total_month():
+async def total_month():
     logger.info("GET /summary/month called")
-    total = db_helper.total_expense_this_month()
+    total = await db_async.total_expense_this_month()
     return {"total_expense_this_month": total}
 
+@app.get("/summary")
+async def summary():
+    """Everything the dashboard header needs; the three totals are queried concurrently."""
+    logger.info("GET /summary called")
+    return await db_async.dashboard_summary()
+
 @app.get("/summary/year-wise")
-def total_by_year():
+async def total_by_year():
     logger.info("GET /summary/year-wise called")
-    return db_helper.total_expense_by_year()
+    return await db_async.total_expense_by_year()
+
+@app.get("/analytics/totals")
+async def analytics_totals(filters: dict = Depends(expense_filters)):
+    logger.info("GET /analytics/totals called")
+    return await db_async.expense_totals(**filters)
+
+@app.get("/analytics/category-share")
+async def analytics_category_share(filters: dict = Depends(expense_filters)):
+    logger.info("GET /analytics/category-share called")
+    return await db_async.category_share(**filters)
+
+@app.get("/analytics/trend")
+async def analytics_trend(bucket: str = Query("day", pattern="^(day|week|month)$"),
+                    filters: dict = Depends(expense_filters)):
+    logger.info("GET /analytics/trend called | bucket=%s", bucket)
+    return await db_async.expense_trend(bucket, **filters)
+
+# --- REPORT EXPORTS ---
+@app.post("/exports", status_code=202)
+def create_export(request: ExportRequest):
+    logger.info("POST /exports called | format=%s", request.format)
+    filters = request.model_dump(exclude={"format", "name"}, exclude_none=True)
+    return exports.start_export(request.format, filters=filters, name=request.name)
+
+def _get_export_or_404(export_id):
+    job = exports.get_export(export_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Export not found")
+    return job
+
+@app.get("/exports/{export_id}")
+def get_export(export_id: str):
+    logger.info("GET /exports/%s called", export_id)
+    return _get_export_or_404(export_id)
+
+@app.get("/exports/{export_id}/download")
+def download_export(export_id: str):
+    logger.info("GET /exports/%s/download called", export_id)
+    job = _get_export_or_404(export_id)
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"Export is {job['status']}")
+    return FileResponse(job["path"], media_type=job["media_type"], filename=job["file_name"])
+
+# --- DIAGNOSTICS ---
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/stats/pool")
+def get_pool_stats():
+    logger.info("GET /stats/pool called")
+    return {**db_helper.pool_stats(), "async": db_async.pool_stats(), "replicas": db_helper.replica_stats(),
+            "write_queue": write_queue.stats()}
+
+@app.get("/stats/cache")
+def get_cache_stats():
+    logger.info("GET /stats/cache called")
+    return db_helper.cache_stats()
 
 # --- UPDATE (PUT) ---
 @app.put("/expenses/{expense_id}")
 def update_expense(expense_id: int, expense: ExpenseUpdate):
-    logger.info(f"PUT /expenses/{expense_id} called | New Data: {expense.dict()}")
+    logger.info("PUT /expenses/%s called", expense_id)
+    logger.debug("PUT /expenses/%s data: %s", expense_id, expense)
     try:
         db_helper.update_expense(
             expense_id,
@@ -118,20 +542,20 @@ def update_expense(expense_id: int, expense: ExpenseUpdate):
             expense.transaction_type,
             expense.amount
         )
-        logger.info(f"Expense ID {expense_id} updated successfully")
+        logger.info("Expense ID %s updated successfully", expense_id)
         return {"message": "Expense updated successfully"}
     except Exception as e:
-        logger.error(f"Error updating expense {expense_id}: {e}")
+        logger.error("Error updating expense %s: %s", expense_id, e)
         raise HTTPException(status_code=500, detail="Update failed")
 
 # --- DELETE (DELETE) ---
 @app.delete("/expenses/{expense_id}")
 def delete_expense(expense_id: int):
-    logger.info(f"DELETE /expenses/{expense_id} called")
+    logger.info("DELETE /expenses/%s called", expense_id)
     try:
         db_helper.delete_expense(expense_id)
-        logger.info(f"Expense ID {expense_id} deleted successfully")
+        logger.info("Expense ID %s deleted successfully", expense_id)
         return {"message": "Expense deleted successfully"}
     except Exception as e:
-        logger.error(f"Error deleting expense {expense_id}: {e}")
+        logger.error("Error deleting expense %s: %s", expense_id, e)
         raise HTTPException(status_code=500, detail="Delete failed")
\ No newline at end of file
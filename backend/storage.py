@@ -0,0 +1,317 @@
+"""Storage backends behind db_helper.
+
+db_helper writes its SQL once, with ``%s`` placeholders, and asks the active
+backend for connections, dict cursors and the few fragments that differ
+between engines (date bucketing, upserts, row locks). Two engines exist:
+
+- ``mysql``: the MySQL server from ``db_config`` (the default).
+- ``sqlite``: an embedded database file in WAL mode, for single-user installs,
+  CI and in-process benchmarks.
+
+``create_backend(storage_config, db_config)`` picks one. Each backend also has
+an async side (``async_connect``/``async_cursor``) for ``backend.db_async``.
+"""
+import asyncio
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
+
+
+class StorageBackend:
+    """What db_helper needs from a database engine."""
+
+    name = None
+    Error = Exception          # base class of the driver's errors
+
+    def connect(self):
+        raise NotImplementedError
+
+    def cursor(self, connection):
+        """A cursor returning rows as dicts."""
+        raise NotImplementedError
+
+    # Optional pool hooks (see ConnectionPool)
+    ping = None
+    reset = None
+
+    # --- ASYNC ---
+    async def async_connect(self):
+        raise NotImplementedError
+
+    async def async_cursor(self, connection):
+        """An async cursor returning rows as dicts; every method is a coroutine."""
+        raise NotImplementedError
+
+    # Optional async pool hooks (see AsyncConnectionPool)
+    async_ping = None
+    async_reset = None
+
+    def begin_write(self, cursor):
+        """Start a transaction that will write, before its first locking read."""
+
+    def begin_snapshot(self, cursor):
+        """Make the reads that follow see one snapshot, until the connection commits.
+
+        Nothing to do on MySQL: connections do not autocommit, so InnoDB's
+        REPEATABLE READ fixes the snapshot at the first read.
+        """
+
+    async def async_begin_snapshot(self, cursor):
+        """begin_snapshot for an async cursor."""
+
+    # --- SQL DIALECT ---
+    for_update = ""            # suffix of a SELECT that locks the rows it reads
+
+    def money_sum(self, column):
+        return f"SUM({column})"
+
+    def year(self, column):
+        raise NotImplementedError
+
+    def date_bucket(self, bucket, column):
+        """Expression truncating ``column`` to the first day of its ``day``/``week``/``month``."""
+        raise NotImplementedError
+
+    def upsert_add(self, table, key_columns, add_columns):
+        """INSERT that adds ``add_columns`` onto an existing row with the same key."""
+        raise NotImplementedError
+
+
+# --- MYSQL ---
+class MySQLBackend(StorageBackend):
+    name = "mysql"
+    for_update = " FOR UPDATE"
+
+    def __init__(self, db_config):
+        import mysql.connector
+        self._connector = mysql.connector
+        self.Error = mysql.connector.Error
+        self.db_config = db_config
+
+    def connect(self):
+        return self._connector.connect(**self.db_config)
+
+    def cursor(self, connection):
+        # Unbuffered: fetchmany() reads from the server as it goes
+        return connection.cursor(dictionary=True)
+
+    @staticmethod
+    def ping(connection):
+        connection.ping(reconnect=False)
+
+    @staticmethod
+    def reset(connection):
+        connection.reset_session()
+
+    async def async_connect(self):
+        import mysql.connector.aio
+        return await mysql.connector.aio.connect(**self.db_config)
+
+    async def async_cursor(self, connection):
+        return await connection.cursor(dictionary=True)
+
+    @staticmethod
+    async def async_ping(connection):
+        await connection.ping(reconnect=False)
+
+    @staticmethod
+    async def async_reset(connection):
+        await connection.cmd_reset_connection()
+
+    def year(self, column):
+        return f"YEAR({column})"
+
+    def date_bucket(self, bucket, column):
+        return {
+            "day": column,
+            "week": f"DATE_SUB({column}, INTERVAL WEEKDAY({column}) DAY)",               # Monday
+            "month": f"DATE_SUB({column}, INTERVAL DAYOFMONTH({column}) - 1 DAY)",       # 1st of month
+        }[bucket]
+
+    def upsert_add(self, table, key_columns, add_columns):
+        columns = key_columns + add_columns
+        updates = ", ".join(f"{c} = {c} + VALUES({c})" for c in add_columns)
+        return (f"INSERT INTO {table} ({', '.join(columns)}) "
+                f"VALUES ({', '.join(['%s'] * len(columns))}) "
+                f"ON DUPLICATE KEY UPDATE {updates}")
+
+
+# --- SQLITE ---
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_converter("DATE", lambda value: date.fromisoformat(value.decode()))
+sqlite3.register_converter("DECIMAL", lambda value: Decimal(value.decode()))
+sqlite3.register_converter("DATETIME", lambda value: datetime.fromisoformat(value.decode()))
+
+
+def _dict_row(cursor, row):
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+class SQLiteCursor:
+    """sqlite3 cursor that accepts the ``%s`` placeholders db_helper uses."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, query, params=None):
+        return self._cursor.execute(query.replace("%s", "?"), params or ())
+
+    def executemany(self, query, seq_params):
+        return self._cursor.executemany(query.replace("%s", "?"), seq_params)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+
+class AsyncSQLiteConnection:
+    """Runs a sqlite3 connection on its own worker thread behind coroutine methods.
+
+    SQLite has no non-blocking I/O, so this is the closest thing to an async
+    driver: the event loop awaits the worker instead of blocking on the file.
+    """
+
+    def __init__(self, connection, executor):
+        self._connection = connection
+        self._executor = executor
+
+    async def run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    # Only calls that touch the database file go to the worker; the connection is
+    # checked out by one task at a time, so the rest can run on the loop thread.
+    async def cursor(self):
+        return AsyncSQLiteCursor(self, SQLiteCursor(self._connection.cursor()))
+
+    @property
+    def in_transaction(self):
+        return self._connection.in_transaction
+
+    async def commit(self):
+        if self._connection.in_transaction:
+            await self.run(self._connection.commit)
+
+    async def rollback(self):
+        if self._connection.in_transaction:
+            await self.run(self._connection.rollback)
+
+    async def close(self):
+        try:
+            await self.run(self._connection.close)
+        finally:
+            self._executor.shutdown(wait=False)
+
+
+class AsyncSQLiteCursor:
+    def __init__(self, connection, cursor):
+        self._connection = connection
+        self._cursor = cursor
+
+    async def execute(self, query, params=None):
+        await self._connection.run(self._cursor.execute, query, params)
+
+    async def executemany(self, query, seq_params):
+        await self._connection.run(self._cursor.executemany, query, seq_params)
+
+    async def fetchone(self):
+        return await self._connection.run(self._cursor.fetchone)
+
+    async def fetchmany(self, size):
+        return await self._connection.run(self._cursor.fetchmany, size)
+
+    async def fetchall(self):
+        return await self._connection.run(self._cursor.fetchall)
+
+    async def close(self):
+        self._cursor.close()
+
+    @property
+    def connection(self):
+        return self._connection
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+
+class SQLiteBackend(StorageBackend):
+    name = "sqlite"
+    Error = sqlite3.Error
+
+    def __init__(self, path, busy_timeout=30.0, cached_statements=256):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.cached_statements = cached_statements
+
+    def connect(self):
+        # check_same_thread=False: the pool hands a connection to one thread at a time
+        connection = sqlite3.connect(self.path, timeout=self.busy_timeout,
+                                     detect_types=sqlite3.PARSE_DECLTYPES,
+                                     cached_statements=self.cached_statements,
+                                     check_same_thread=False)
+        connection.row_factory = _dict_row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def cursor(self, connection):
+        return SQLiteCursor(connection.cursor())
+
+    async def async_connect(self):
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        connection = await asyncio.get_running_loop().run_in_executor(executor, self.connect)
+        return AsyncSQLiteConnection(connection, executor)
+
+    async def async_cursor(self, connection):
+        return await connection.cursor()
+
+    def begin_snapshot(self, cursor):
+        # Outside a transaction every SELECT sees the latest commit. In WAL mode a
+        # deferred transaction keeps the snapshot of its first read until it ends.
+        if not cursor.connection.in_transaction:
+            cursor.execute("BEGIN")
+
+    async def async_begin_snapshot(self, cursor):
+        if not cursor.connection.in_transaction:
+            await cursor.execute("BEGIN")
+
+    def begin_write(self, cursor):
+        # SQLite has no row locks; take the database write lock up front instead
+        # of at the first UPDATE, so a read-then-write sequence cannot interleave.
+        if not cursor.connection.in_transaction:
+            cursor.execute("BEGIN IMMEDIATE")
+
+    def money_sum(self, column):
+        # DECIMAL columns have NUMERIC affinity and are summed as floats; round back to cents
+        return f"ROUND(SUM({column}), 2)"
+
+    def year(self, column):
+        return f"CAST(strftime('%Y', {column}) AS INTEGER)"
+
+    def date_bucket(self, bucket, column):
+        return {
+            "day": column,
+            "week": f"date({column}, '-' || ((CAST(strftime('%w', {column}) AS INTEGER) + 6) % 7) || ' days')",
+            "month": f"date({column}, 'start of month')",
+        }[bucket]
+
+    def upsert_add(self, table, key_columns, add_columns):
+        columns = key_columns + add_columns
+        updates = ", ".join(f"{c} = {c} + excluded.{c}" for c in add_columns)
+        return (f"INSERT INTO {table} ({', '.join(columns)}) "
+                f"VALUES ({', '.join(['%s'] * len(columns))}) "
+                f"ON CONFLICT ({', '.join(key_columns)}) DO UPDATE SET {updates}")
+
+
+def create_backend(storage_config, db_config):
+    engine = storage_config["engine"]
+    if engine == "mysql":
+        return MySQLBackend(db_config)
+    if engine == "sqlite":
+        return SQLiteBackend(storage_config["sqlite_path"])
+    raise ValueError(f"Unknown storage engine: {engine!r} (expected 'mysql' or 'sqlite')")
@@ -0,0 +1,106 @@
+import threading
+from collections import defaultdict
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class SubCategoryIndex:
+    """In-memory trigram index of expense sub-categories.
+
+    Holds every distinct sub-category (compared lower-case, like ``LIKE`` on a
+    case-insensitive collation) with the ids of the expenses that use it.
+    Substring lookups intersect the postings of the term's trigrams, so they
+    touch only the few distinct values that can match; terms shorter than
+    three characters scan the distinct values, which are few.
+
+    ``load()`` fills it from ``(id, sub_category)`` rows and ``apply()`` keeps
+    it current from pages of ``db_helper.expense_changes``. Lookups and
+    ``apply()`` hold the index's lock, so a lookup never sees a change half
+    applied; ``load()`` builds the new index first and swaps it in under the
+    lock, so lookups keep answering from the old one meanwhile.
+    """
+
+    def __init__(self):
+        self.version = None      # data version the index reflects
+        self.source = None       # storage backend it was loaded from
+        self._lock = threading.Lock()
+        self._ids = {}           # value -> set of expense ids
+        self._labels = {}        # value -> sub-category as first written
+        self._by_id = {}         # expense id -> value
+        self._trigrams = defaultdict(set)   # trigram -> values containing it
+
+    def __len__(self):
+        return len(self._ids)
+
+    def load(self, rows, version, source=None):
+        fresh = SubCategoryIndex()
+        for row in rows:
+            fresh._add(row["id"], row["sub_category"])
+        with self._lock:
+            self._ids, self._labels, self._by_id, self._trigrams = (
+                fresh._ids, fresh._labels, fresh._by_id, fresh._trigrams)
+            self.version = version
+            self.source = source
+
+    def apply(self, changes):
+        with self._lock:
+            for row in changes["deletes"]:
+                self._remove(row["id"])
+            for row in changes["upserts"]:
+                self._add(row["id"], row["sub_category"])
+            self.version = changes["next_since"]
+
+    def _add(self, id, sub_category):
+        value = (sub_category or "").lower()
+        if self._by_id.get(id) == value:
+            return
+        self._remove(id)
+        self._by_id[id] = value
+        if value not in self._ids:
+            self._ids[value] = set()
+            self._labels[value] = sub_category
+            for trigram in _trigrams(value):
+                self._trigrams[trigram].add(value)
+        self._ids[value].add(id)
+
+    def _remove(self, id):
+        value = self._by_id.pop(id, None)
+        if value is None:
+            return
+        ids = self._ids[value]
+        ids.discard(id)
+        if not ids:
+            del self._ids[value], self._labels[value]
+            for trigram in _trigrams(value):
+                values = self._trigrams[trigram]
+                values.discard(value)
+                if not values:
+                    del self._trigrams[trigram]
+
+    def _values_containing(self, term):
+        if len(term) < 3:
+            return [value for value in self._ids if term in value]
+        postings = sorted((self._trigrams.get(t, ()) for t in _trigrams(term)), key=len)
+        if not postings[0]:
+            return []
+        candidates = set(postings[0]).intersection(*postings[1:])
+        return [value for value in candidates if term in value]
+
+    def matching_ids(self, term):
+        """Ids of the expenses whose sub-category contains ``term``, ignoring case."""
+        ids = set()
+        with self._lock:
+            for value in self._values_containing(term.lower()):
+                ids |= self._ids[value]
+        return ids
+
+    def suggest(self, prefix, limit=10):
+        """Sub-categories containing ``prefix``: those starting with it first, then by use count."""
+        term = prefix.lower()
+        with self._lock:
+            ranked = sorted(self._values_containing(term),
+                            key=lambda value: (not value.startswith(term), -len(self._ids[value]), value))
+            return [{"sub_category": self._labels[value], "count": len(self._ids[value])}
+                    for value in ranked[:limit]]
@@ -0,0 +1,152 @@
+"""Group commit for single-row inserts.
+
+With ``write_queue_config["enabled"]`` (or ``BILANCIO_GROUP_COMMIT=1``) the
+server does not run one transaction per ``POST /expenses``. Each row is put
+on a bounded queue and a flusher task inserts whatever has accumulated, up to
+``max_batch`` rows or ``max_delay`` seconds after the first one, as one
+multi-row INSERT and one commit. Every caller waits until its batch has
+committed and then gets its own id, so acknowledgements stay durable.
+
+When the queue is full, ``submit`` waits up to ``put_timeout`` seconds and
+then raises ``QueueFull``; the server answers 503 so clients back off.
+"""
+import asyncio
+import os
+import weakref
+from backend import db_helper, metrics
+from logging_setup import setup_logger
+
+
+logger = setup_logger('write_queue')
+
+write_queue_config = {
+    "enabled": os.environ.get("BILANCIO_GROUP_COMMIT", "0") == "1",
+    "max_batch": 500,          # rows per INSERT / commit
+    "max_delay": 0.005,        # seconds a batch may wait for more rows
+    "max_queue": 10_000,       # rows waiting for a flush before callers are pushed back
+    "put_timeout": 1.0,        # seconds a caller waits for room in a full queue
+}
+
+WRITE_BATCH_ROWS = metrics.registry.register(metrics.Histogram(
+    "write_queue_batch_rows", "Rows committed per group-commit batch.", buckets=metrics.ROW_BUCKETS))
+
+
+class QueueFull(Exception):
+    pass
+
+
+class GroupCommitQueue:
+    """Coalesces ``submit(row)`` calls into ``insert(rows) -> ids`` calls run in a worker thread."""
+
+    def __init__(self, insert, max_batch=500, max_delay=0.005, max_queue=10_000, put_timeout=1.0):
+        self._insert = insert
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.put_timeout = put_timeout
+        self._queue = asyncio.Queue(max_queue)
+        self._flusher = None
+        self._batches = 0
+        self._rows = 0
+        self._rejected = 0
+
+    async def submit(self, row):
+        """Queue ``row`` and return its id once the batch holding it has committed."""
+        future = asyncio.get_running_loop().create_future()
+        try:
+            await asyncio.wait_for(self._queue.put((row, future)), self.put_timeout)
+        except asyncio.TimeoutError:
+            self._rejected += 1
+            raise QueueFull(f"{self._queue.qsize()} writes already pending") from None
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.get_running_loop().create_task(self._run())
+        return await future
+
+    async def join(self):
+        """Wait until every queued row has been flushed."""
+        await self._queue.join()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._flush(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _flush(self, batch):
+        try:
+            ids = await asyncio.to_thread(self._insert, [row for row, _ in batch])
+        except Exception as e:
+            if len(batch) > 1:
+                # One bad row must not fail its neighbours: retry them one by one
+                logger.warning("⚠️ Batch of %s rows failed (%s); retrying rows individually", len(batch), e)
+                for item in batch:
+                    await self._flush([item])
+                return
+            _, future = batch[0]
+            if not future.done():
+                future.set_exception(e)
+            return
+        self._batches += 1
+        self._rows += len(batch)
+        WRITE_BATCH_ROWS.observe(len(batch))
+        for (_, future), expense_id in zip(batch, ids):
+            if not future.done():      # the caller may have gone away; the row is committed anyway
+                future.set_result(expense_id)
+
+    def stats(self):
+        return {
+            "pending": self._queue.qsize(),
+            "batches": self._batches,
+            "rows": self._rows,
+            "avg_batch": round(self._rows / self._batches, 2) if self._batches else 0.0,
+            "rejected": self._rejected,
+        }
+
+
+_queues = weakref.WeakKeyDictionary()   # event loop -> GroupCommitQueue
+
+
+def get_queue():
+    """The queue of the running event loop."""
+    loop = asyncio.get_running_loop()
+    queue = _queues.get(loop)
+    if queue is None:
+        queue = _queues[loop] = GroupCommitQueue(
+            db_helper.insert_expenses,
+            max_batch=write_queue_config["max_batch"],
+            max_delay=write_queue_config["max_delay"],
+            max_queue=write_queue_config["max_queue"],
+            put_timeout=write_queue_config["put_timeout"],
+        )
+        logger.info("Group-commit write queue created: %s", write_queue_config)
+    return queue
+
+
+async def submit(row):
+    return await get_queue().submit(row)
+
+
+async def drain():
+    """Flush what is queued on the running loop (e.g. on server shutdown)."""
+    queue = _queues.get(asyncio.get_running_loop())
+    if queue is not None:
+        await queue.join()
+
+
+def stats():
+    return [queue.stats() for queue in list(_queues.values())]
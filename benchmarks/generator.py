@@ -0,0 +1,66 @@
+"""Seeded generator for realistic, reproducible expense histories.
+
+    from benchmarks.generator import generate_expenses
+    rows = list(generate_expenses(10_000, seed=7))
+
+The same ``seed`` and parameters always produce the same rows, so benchmark
+runs are comparable.
+"""
+import math
+import random
+from datetime import date, timedelta
+
+# category -> (sub categories, typical amount); Salary/Business are income
+EXPENSE_CATEGORIES = {
+    "Food": (["Groceries", "Restaurant", "Pizza", "Coffee", "Snacks", "Lunch"], 350),
+    "Travel": (["Uber", "Metro", "Fuel", "Flight", "Train", "Parking"], 900),
+    "Bills": (["Rent", "Electricity", "Internet", "Mobile", "Water"], 2500),
+    "Shopping": (["Clothes", "Electronics", "Amazon", "Shoes", "Gifts"], 1800),
+    "Entertainment": (["Movies", "Netflix", "Concert", "Games", "Books"], 600),
+    "Others": (["Medical", "Donation", "Repairs", "Pet Care", "Misc"], 700),
+}
+INCOME_CATEGORIES = {
+    "Salary": (["Monthly Salary", "Bonus"], 60000),
+    "Business": (["Freelance", "Consulting", "Dividend", "Interest"], 12000),
+}
+
+
+def _zipf_weights(n, skew):
+    return [1 / (rank ** skew) for rank in range(1, n + 1)]
+
+
+def generate_expenses(n_rows, seed=42, start=date(2018, 1, 1), end=None,
+                      category_skew=1.1, recency_skew=1.5, income_ratio=0.08):
+    """Yield ``n_rows`` tuples of (expense_date, category, sub_category, transaction_type, amount).
+
+    - ``category_skew``: Zipf exponent over categories and sub categories (0 = uniform).
+    - ``recency_skew``: >1 puts more transactions in recent years, 1 = uniform over the range.
+    - ``income_ratio``: share of rows that are income instead of expenses.
+    """
+    rng = random.Random(seed)
+    end = end or date.today()
+    span = (end - start).days
+
+    expense_names = list(EXPENSE_CATEGORIES)
+    expense_weights = _zipf_weights(len(expense_names), category_skew)
+    sub_weights = {name: _zipf_weights(len(subs), category_skew)
+                   for name, (subs, _) in {**EXPENSE_CATEGORIES, **INCOME_CATEGORIES}.items()}
+    income_names = list(INCOME_CATEGORIES)
+
+    for _ in range(n_rows):
+        # u ** (1 / skew) leans towards 1, i.e. towards ``end``
+        offset = int(span * rng.random() ** (1 / recency_skew))
+        expense_date = start + timedelta(days=offset)
+
+        if rng.random() < income_ratio:
+            category = rng.choice(income_names)
+            subs, typical = INCOME_CATEGORIES[category]
+            transaction_type = "Income"
+        else:
+            category = rng.choices(expense_names, expense_weights)[0]
+            subs, typical = EXPENSE_CATEGORIES[category]
+            transaction_type = "Expense"
+        sub_category = rng.choices(subs, sub_weights[category])[0]
+        # log-normal around the typical amount, at least 1
+        amount = round(max(1.0, rng.lognormvariate(math.log(typical), 0.6)), 2)
+        yield expense_date, category, sub_category, transaction_type, amount
@@ -0,0 +1,361 @@
+"""Benchmark every db_helper function and API route at several data sizes.
+
+    python -m benchmarks.harness run --sizes 10000 100000 --repeat 30
+    python -m benchmarks.harness compare benchmarks/results/old.json benchmarks/results/new.json
+    python -m benchmarks.harness concurrency --size 100000 --clients 1 8 32 128
+
+``run`` works in its own database (``--database``, default ``expense_bench``),
+which it creates, migrates and refills for every size, so the real expense
+data is never touched. ``--engine sqlite`` benchmarks the embedded engine with
+a database file in ``benchmarks/results/``. API routes are called in-process through FastAPI's
+TestClient; nothing outside the machine is contacted. Results are written as
+JSON to ``benchmarks/results/`` for later comparison.
+
+``concurrency`` compares the sync read path (db_helper in Starlette's
+threadpool, as a plain ``def`` route runs it) with the async one (db_async on
+the event loop) at several numbers of requests in flight.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta
+from backend import db_async, db_helper, migrations
+from benchmarks.generator import generate_expenses
+
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+# --- DATABASE SETUP ---
+def prepare_database(name, engine="mysql"):
+    if engine == "sqlite":
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        db_helper.configure(engine="sqlite", sqlite_path=os.path.join(RESULTS_DIR, f"{name}.db"))
+        migrations.migrate()
+        return
+    if name == db_helper.db_config["database"]:
+        raise SystemExit(f"Refusing to benchmark in the live database {name!r}; pass another --database.")
+    import mysql.connector
+    server_config = {k: v for k, v in db_helper.db_config.items() if k != "database"}
+    connection = mysql.connector.connect(**server_config)
+    try:
+        connection.cursor().execute(f"CREATE DATABASE IF NOT EXISTS `{name}`")
+    finally:
+        connection.close()
+    db_helper.configure(engine="mysql", database=name)
+    migrations.migrate()
+
+
+def load_rows(size, seed, batch_size):
+    with db_helper.get_connection() as cursor:
+        cursor.execute("DELETE FROM expense_daily_rollup")
+        cursor.execute("DELETE FROM expense")
+    start = time.perf_counter()
+    results = db_helper.add_expenses(generate_expenses(size, seed=seed), batch_size)
+    elapsed = time.perf_counter() - start
+    failed = [r for r in results if not r["ok"]]
+    if failed:
+        raise RuntimeError(f"Loading failed: {failed[0]['error']}")
+    return {"rows": size, "seconds": round(elapsed, 3), "rows_per_second": round(size / elapsed, 1)}
+
+
+# --- CASES ---
+def db_cases():
+    today = date.today()
+    month_ago = today - timedelta(days=30)
+    some_id = db_helper.list_expenses(1)["items"][0]["id"]
+    return {
+        "show_all_expenses": lambda: db_helper.show_all_expenses(),
+        "list_expenses": lambda: db_helper.list_expenses(100),
+        "search_by_id": lambda: db_helper.search_by_id(some_id),
+        "search_by_category": lambda: db_helper.search_by_category("Food"),
+        "search_by_sub_category": lambda: db_helper.search_by_sub_category("izz"),
+        "search_by_transaction_type": lambda: db_helper.search_by_transaction_type("Income"),
+        "filter_by_date_range": lambda: db_helper.filter_by_date_range(month_ago, today),
+        "filter_by_amount_range": lambda: db_helper.filter_by_amount_range(5000, 6000),
+        "query_expenses": lambda: db_helper.query_expenses(start_date=month_ago, end_date=today,
+                                                           min_amount=100, transaction_types=["expense"]),
+        "expense_totals": lambda: db_helper.expense_totals(start_date=month_ago, end_date=today),
+        "category_share": lambda: db_helper.category_share(start_date=month_ago, end_date=today),
+        "expense_trend": lambda: db_helper.expense_trend("month"),
+        "total_expense_today": db_helper.total_expense_today,
+        "total_expense_this_month": db_helper.total_expense_this_month,
+        "total_expense_by_year": db_helper.total_expense_by_year,
+        "add_expense": lambda: db_helper.add_expense(today, "Food", "Benchmark", "Expense", 10.0),
+    }
+
+
+def api_cases(client):
+    today = date.today()
+    month_ago = today - timedelta(days=30)
+    some_id = db_helper.list_expenses(1)["items"][0]["id"]
+    routes = {
+        "GET /expenses": "/expenses",
+        "GET /expenses?limit=100": "/expenses?limit=100",
+        "GET /expenses/id/{id}": f"/expenses/id/{some_id}",
+        "GET /expenses/category/{category}": "/expenses/category/Food",
+        "GET /expenses/subcategory/{sub_category}": "/expenses/subcategory/izz",
+        "GET /expenses/type/{transaction_type}": "/expenses/type/Income",
+        "GET /expenses/filter/date_range": f"/expenses/filter/date_range?start_date={month_ago}&end_date={today}",
+        "GET /expenses/filter/amount_range": "/expenses/filter/amount_range?min_amount=5000&max_amount=6000",
+        "GET /expenses/query": f"/expenses/query?start_date={month_ago}&end_date={today}&transaction_type=expense",
+        "GET /summary/today": "/summary/today",
+        "GET /summary/month": "/summary/month",
+        "GET /summary/year-wise": "/summary/year-wise",
+        "GET /analytics/totals": f"/analytics/totals?start_date={month_ago}&end_date={today}",
+        "GET /analytics/category-share": f"/analytics/category-share?start_date={month_ago}&end_date={today}",
+        "GET /analytics/trend": "/analytics/trend?bucket=month",
+    }
+
+    def call(url):
+        response = client.get(url)
+        response.raise_for_status()
+        return response
+
+    return {name: (lambda url=url: call(url)) for name, url in routes.items()}
+
+
+def concurrency_cases():
+    """(sync call, async call) pairs doing the same work."""
+    today = date.today()
+    month_ago = today - timedelta(days=30)
+    filters = {"start_date": month_ago, "end_date": today}
+
+    def summary_sync():
+        return (db_helper.total_expense_today(), db_helper.total_expense_this_month(),
+                db_helper.total_expense_by_year())
+
+    return {
+        "list_expenses": (lambda: db_helper.list_expenses(100), lambda: db_async.list_expenses(100)),
+        "search_by_category": (lambda: db_helper.search_by_category("Food"),
+                               lambda: db_async.search_by_category("Food")),
+        "query_expenses": (lambda: db_helper.query_expenses(**filters, transaction_types=["expense"]),
+                           lambda: db_async.query_expenses(**filters, transaction_types=["expense"])),
+        "expense_totals": (lambda: db_helper.expense_totals(**filters), lambda: db_async.expense_totals(**filters)),
+        "dashboard_summary": (summary_sync, db_async.dashboard_summary),
+    }
+
+
+# --- MEASUREMENT ---
+def measure(func, repeat, warmup):
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return summarize(timings)
+
+
+def summarize(timings):
+    ordered = sorted(timings)
+    cuts = statistics.quantiles(ordered, n=100, method="inclusive") if len(ordered) > 1 else ordered * 99
+    total = sum(ordered)
+    return {
+        "calls": len(ordered),
+        "min_ms": round(ordered[0] * 1000, 3),
+        "p50_ms": round(cuts[49] * 1000, 3),
+        "p95_ms": round(cuts[94] * 1000, 3),
+        "p99_ms": round(cuts[98] * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+        "mean_ms": round(total / len(ordered) * 1000, 3),
+        "throughput_per_s": round(len(ordered) / total, 1) if total else None,
+    }
+
+
+async def measure_concurrent(call, clients, requests):
+    """Issue ``requests`` awaitable calls with ``clients`` of them in flight at a time."""
+    remaining = iter(range(requests))
+    timings = []
+
+    async def client():
+        for _ in remaining:
+            start = time.perf_counter()
+            await call()
+            timings.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+    return {**summarize(timings), "throughput_per_s": round(requests / elapsed, 1)}
+
+
+async def _concurrency(args):
+    from starlette.concurrency import run_in_threadpool
+
+    results = []
+    for name, (sync_call, async_call) in concurrency_cases().items():
+        if args.only and not any(o in name for o in args.only):
+            continue
+        paths = {"sync": lambda f=sync_call: run_in_threadpool(f), "async": async_call}
+        for clients in args.clients:
+            for path, call in paths.items():
+                await measure_concurrent(call, clients, args.warmup * clients)
+                stats = await measure_concurrent(call, clients, args.requests)
+                results.append({"size": args.size, "target": path, "name": name, "clients": clients, **stats})
+                print(f"{path:5} {name:20} clients {clients:>4}   p50 {stats['p50_ms']:>10.3f} ms   "
+                      f"p99 {stats['p99_ms']:>10.3f} ms   {stats['throughput_per_s']:>10} /s")
+    await db_async.dispose_pool()
+    return results
+
+
+def concurrency(args):
+    prepare_database(args.database, args.engine)
+    db_helper.result_cache.enabled = args.with_cache
+    load = load_rows(args.size, args.seed, args.batch_size)
+    print(f"loaded {args.size:,} rows in {load['seconds']}s")
+    report = {
+        "meta": {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "engine": args.engine,
+            "database": args.database,
+            "requests": args.requests,
+            "pool": dict(db_helper.pool_config),
+            "with_cache": args.with_cache,
+        },
+        "loads": [load],
+        "results": asyncio.run(_concurrency(args)),
+    }
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+    return report
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    from fastapi.testclient import TestClient
+    from backend.server import app
+
+    prepare_database(args.database, args.engine)
+    db_helper.result_cache.enabled = args.with_cache
+    client = TestClient(app)
+
+    report = {
+        "meta": {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "engine": args.engine,
+            "database": args.database,
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "warmup": args.warmup,
+            "with_cache": args.with_cache,
+        },
+        "loads": [],
+        "results": [],
+    }
+
+    for size in args.sizes:
+        print(f"\n=== {size:,} rows ===")
+        load = load_rows(size, args.seed, args.batch_size)
+        report["loads"].append(load)
+        print(f"loaded in {load['seconds']}s ({load['rows_per_second']:,} rows/s)")
+
+        targets = []
+        if not args.api_only:
+            targets += [("db", name, func) for name, func in db_cases().items()]
+        if not args.db_only:
+            targets += [("api", name, func) for name, func in api_cases(client).items()]
+
+        for target, name, func in targets:
+            if args.only and not any(o in name for o in args.only):
+                continue
+            stats = measure(func, args.repeat, args.warmup)
+            report["results"].append({"size": size, "target": target, "name": name, **stats})
+            print(f"{target:4} {name:45} p50 {stats['p50_ms']:>10.3f} ms   "
+                  f"p95 {stats['p95_ms']:>10.3f} ms   p99 {stats['p99_ms']:>10.3f} ms   "
+                  f"{stats['throughput_per_s']:>10} /s")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+    return report
+
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    key = lambda r: (r["size"], r["target"], r["name"])
+    before = {key(r): r for r in baseline["results"]}
+    print(f"{'size':>10} {'target':6} {'name':45} {'p50 before':>12} {'p50 after':>12} {'change':>8}")
+    for result in candidate["results"]:
+        old = before.get(key(result))
+        if not old:
+            continue
+        change = (result["p50_ms"] - old["p50_ms"]) / old["p50_ms"] * 100 if old["p50_ms"] else 0.0
+        print(f"{result['size']:>10} {result['target']:6} {result['name']:45} "
+              f"{old['p50_ms']:>12.3f} {result['p50_ms']:>12.3f} {change:>+7.1f}%")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bilancio benchmark harness")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="load synthetic data and time every function and route")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    run_parser.add_argument("--repeat", type=int, default=30)
+    run_parser.add_argument("--warmup", type=int, default=3)
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("--batch-size", type=int, default=5000)
+    run_parser.add_argument("--database", default="expense_bench")
+    run_parser.add_argument("--engine", choices=["mysql", "sqlite"], default="mysql")
+    run_parser.add_argument("--only", nargs="+", help="only cases whose name contains one of these")
+    run_parser.add_argument("--db-only", action="store_true")
+    run_parser.add_argument("--api-only", action="store_true")
+    run_parser.add_argument("--with-cache", action="store_true", help="keep the result cache enabled")
+    run_parser.add_argument("--output", default=os.path.join(
+        RESULTS_DIR, f"bench-{datetime.now():%Y%m%d-%H%M%S}.json"))
+
+    conc_parser = sub.add_parser("concurrency", help="throughput of the sync vs the async read path")
+    conc_parser.add_argument("--size", type=int, default=100_000)
+    conc_parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32, 128])
+    conc_parser.add_argument("--requests", type=int, default=500, help="calls per case and client count")
+    conc_parser.add_argument("--warmup", type=int, default=1, help="warm-up calls per client")
+    conc_parser.add_argument("--seed", type=int, default=42)
+    conc_parser.add_argument("--batch-size", type=int, default=5000)
+    conc_parser.add_argument("--database", default="expense_bench")
+    conc_parser.add_argument("--engine", choices=["mysql", "sqlite"], default="mysql")
+    conc_parser.add_argument("--only", nargs="+", help="only cases whose name contains one of these")
+    conc_parser.add_argument("--with-cache", action="store_true", help="keep the result cache enabled")
+    conc_parser.add_argument("--output", default=os.path.join(
+        RESULTS_DIR, f"concurrency-{datetime.now():%Y%m%d-%H%M%S}.json"))
+
+    compare_parser = sub.add_parser("compare", help="compare the p50 of two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        run(args)
+    elif args.command == "concurrency":
+        concurrency(args)
+    else:
+        compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
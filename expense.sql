@@ -1,13 +1,13 @@
-
 CREATE DATABASE IF NOT EXISTS expense;
 USE expense;
 
-
-CREATE TABLE IF NOT EXISTS expenses (
+-- Base table. Indexes and later schema changes are applied by the migration
+-- runner: python -m backend.migrations
+CREATE TABLE IF NOT EXISTS expense (
     id INT AUTO_INCREMENT PRIMARY KEY,
     expense_date DATE NOT NULL,
     category VARCHAR(100) NOT NULL,
     sub_category VARCHAR(100) NOT NULL,
     transaction_type VARCHAR(50) NOT NULL,
     amount DECIMAL(10,2)
-);
\ No newline at end of file
+);
@@ -1,13 +1,8 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from io import BytesIO
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
 from datetime import date
-from backend import db_helper
+from backend import db_helper, delta_sync, exports
 import sys
 import os
 
@@ -45,8 +40,28 @@ with st.sidebar:
     st.markdown("Developed with ❤️ by Ankit")
 
 
+# Transaction types that each "Show:" option selects (matched case-insensitively in SQL).
+TYPE_FILTERS = {
+    "All": None,
+    "Income": ["income", "credit"],
+    "Expense": ["expense", "debit"],
+}
+
 # --- 4. UNIVERSAL DOWNLOAD FUNCTION ---
-def show_data_with_downloads(df, key_prefix=""):
+# Reports are rendered by backend.exports in a worker thread, only when asked for.
+# Jobs are listed in the sidebar, which stays visible across reruns.
+def cb_start_export(fmt, key_prefix, filters, records):
+    job = exports.start_export(fmt, filters=filters, rows=records, name=key_prefix)
+    st.session_state.setdefault('export_jobs', []).insert(0, job['id'])
+
+
+def show_data_with_downloads(df, key_prefix="", filters=None):
+    """Show ``df`` and offer CSV/PDF exports.
+
+    With ``filters`` (keyword filters for db_helper.query_expenses) the export
+    re-reads the matching rows with a streaming cursor; otherwise the rows of
+    ``df`` are exported.
+    """
     if df.empty:
         st.warning("⚠️ No Data Found.")
         return
@@ -57,80 +72,109 @@ def show_data_with_downloads(df, key_prefix=""):
     st.markdown("---")
     st.markdown("##### 📥 Download Report")
 
+    records = None if filters is not None else df.to_dict('records')
     c1, c2, c3 = st.columns([1, 1, 2])
+    c1.button("📄 Prepare CSV", key=f"csv_{key_prefix}", on_click=cb_start_export,
+              args=("csv", key_prefix, filters, records))
+    c2.button("📄 Prepare PDF", key=f"pdf_{key_prefix}", on_click=cb_start_export,
+              args=("pdf", key_prefix, filters, records))
+    c3.caption("Reports are prepared in the background and appear in the sidebar.")
 
-    csv = df.to_csv(index=False).encode('utf-8')
-    c1.download_button(
-        label="📄 Download CSV",
-        data=csv,
-        file_name=f"Bilancio_Data_{key_prefix}.csv",
-        mime="text/csv",
-        key=f"csv_{key_prefix}"
-    )
 
-    pdf_buffer = BytesIO()
-    doc = SimpleDocTemplate(pdf_buffer, pagesize=letter)
-    elements = []
-    styles = getSampleStyleSheet()
-    elements.append(Paragraph("Bilancio - Report", styles['Title']))
-    elements.append(Paragraph(f"Generated on: {date.today()}", styles['Normal']))
-    elements.append(Paragraph(" ", styles['Normal']))
-
-    standard_cols = ['id', 'expense_date', 'category', 'sub_category', 'transaction_type', 'amount']
-    cols_to_print = [c for c in df.columns if c in standard_cols]
-
-    if not cols_to_print:
-        cols_to_print = df.columns.tolist()
-
-    data_list = [cols_to_print] + df[cols_to_print].astype(str).values.tolist()
-
-    t = Table(data_list)
-    t.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.darkgoldenrod),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('FONTSIZE', (0, 0), (-1, -1), 10)
-    ]))
-    elements.append(t)
-    doc.build(elements)
-
-    c2.download_button(
-        label="📄 Download PDF",
-        data=pdf_buffer.getvalue(),
-        file_name=f"Bilancio_Report_{key_prefix}.pdf",
-        mime="application/pdf",
-        key=f"pdf_{key_prefix}"
-    )
-# --- CHART GENERATOR HELPER ---
-def generate_charts(df):
+def show_export_jobs():
+    job_ids = st.session_state.get('export_jobs', [])[:5]
+    jobs = [job for job in map(exports.get_export, job_ids) if job]
+    if not jobs:
+        return
+
     st.markdown("---")
+    st.markdown("##### 📥 Reports")
+    for job in jobs:
+        label = f"{job['format'].upper()} · {job['name']}"
+        if job['status'] == 'done':
+            with open(job['path'], 'rb') as f:
+                st.download_button(f"⬇️ {label} ({job['rows']} rows)", data=f, file_name=job['file_name'],
+                                   mime=job['media_type'], key=f"dl_{job['id']}", use_container_width=True)
+        elif job['status'] == 'failed':
+            st.error(f"{label}: {job['error']}")
+        else:
+            st.info(f"⏳ {label}: {job['status']}...")
+    if any(job['status'] in ('queued', 'running') for job in jobs):
+        st.button("🔄 Refresh", key="refresh_exports", use_container_width=True)
 
-    df['type_calc'] = df['transaction_type'].astype(str).str.strip().str.lower()
+# --- CACHED READS ---
+# Every widget interaction reruns this script. Reads go through st.cache_data keyed
+# on their arguments and db_helper.data_version(), so a rerun with filters that were
+# already fetched costs no query, while any write (from this app or another process)
+# moves the version on and the next read misses the cache.
+READ_CACHE = {"ttl": 300, "max_entries": 128}
 
-    total_expense = df.query("type_calc == 'expense'")['amount'].sum()
-    total_income = df.query("type_calc == 'income'")['amount'].sum()
 
-    m1, m2 = st.columns(2)
-    has_income = not df.query("type_calc == 'income'").empty
-    has_expense = not df.query("type_calc == 'expense'").empty
+@st.cache_data(show_spinner=False, **READ_CACHE)
+def _cached_read(name, version, args, kwargs):
+    return getattr(db_helper, name)(*args, **kwargs)
 
-    if has_income:
-        m1.metric("Total Income", f"₹ {total_income:,.2f}")
-    else:
-        m1.metric("Total Income", "₹ 0.00")
 
-    if has_expense:
-        m2.metric("Total Expense", f"₹ {total_expense:,.2f}")
-    else:
-        m2.metric("Total Expense", "₹ 0.00")
+def read(name, *args, **kwargs):
+    """``db_helper.<name>(*args, **kwargs)``, served from the frontend cache when possible."""
+    version, _ = db_helper.data_version()
+    return _cached_read(name, version, args, kwargs)
+
+
+def invalidate_reads():
+    # The version already moved on; clearing also frees the memory right away
+    _cached_read.clear()
+
+
+# The dashboards filter a local mirror of the expense table instead of querying for
+# every chart: the mirror is loaded once per process, then each visit only applies
+# the rows changed since the last one (backend.delta_sync). Archived years are not
+# in the change feed; their rows in range are read from the archive and added.
+@st.cache_resource(show_spinner=False)
+def expense_mirror():
+    return delta_sync.ExpenseMirror(lambda since: db_helper.expense_changes(since, limit=5000))
+
+
+def mirror_rows(sort="date_desc", **filters):
+    """The expenses matching ``filters`` (see db_helper.build_expense_filter) as a DataFrame."""
+    df = expense_mirror().select(sort, **filters)[delta_sync.EXPENSE_COLUMNS]
+    archived = read("archived_rows", sort, **filters)
+    if archived:
+        df = delta_sync.select(pd.concat([df, pd.DataFrame(archived, columns=delta_sync.EXPENSE_COLUMNS)],
+                                         ignore_index=True), sort)
+    return df
+
+
+# --- CHART GENERATOR HELPER ---
+def trend_bucket(filters):
+    # Keep the bar chart readable: daily bars for short ranges, coarser buckets for long ones.
+    start, end = filters.get('start_date'), filters.get('end_date')
+    if not start or not end:
+        return "month"
+    days = (end - start).days
+    if days <= 92:
+        return "day"
+    return "week" if days <= 730 else "month"
+
+
+def generate_charts(filters):
+    """Render totals and charts from series aggregated by the database."""
+    st.markdown("---")
+
+    totals = read("expense_totals", **filters)
+
+    m1, m2 = st.columns(2)
+    m1.metric("Total Income", f"₹ {totals['total_income']:,.2f}")
+    m2.metric("Total Expense", f"₹ {totals['total_expense']:,.2f}")
 
     c1, c2 = st.columns(2)
 
     with c1:
         st.subheader("Category Share")
-        if not df.empty:
-            fig_pie = px.pie(df, names='category', values='amount', hole=0.5,
+        share = pd.DataFrame(read("category_share", **filters))
+        if not share.empty:
+            share['total'] = pd.to_numeric(share['total'])
+            fig_pie = px.pie(share, names='category', values='total', hole=0.5,
                              color_discrete_sequence=px.colors.qualitative.Prism)
             fig_pie.update_traces(textposition='inside', textinfo='percent+label')
             st.plotly_chart(fig_pie, use_container_width=True)
@@ -139,14 +183,19 @@ def generate_charts(df):
 
     with c2:
         st.subheader("Transaction Trend")
-        if not df.empty:
-            daily = df.groupby('expense_date')['amount'].sum().reset_index()
-            fig_bar = px.bar(daily, x='expense_date', y='amount', color='amount',
-                             color_continuous_scale='Plasma')
+        trend = pd.DataFrame(read("expense_trend", trend_bucket(filters), **filters))
+        if not trend.empty:
+            trend['total'] = pd.to_numeric(trend['total'])
+            fig_bar = px.bar(trend, x='period', y='total', color='total',
+                             color_continuous_scale='Plasma',
+                             labels={'period': 'expense_date', 'total': 'amount'})
             st.plotly_chart(fig_bar, use_container_width=True)
         else:
             st.info("No data for charts.")
 
+with st.sidebar:
+    show_export_jobs()
+
 # ================= MAIN APP HEADER =================
 if menu == "➕ Add Transaction":
     st.title("➕ Bilancio: Add Transaction")
@@ -193,6 +242,7 @@ if menu == "➕ Add Transaction":
             return
 
         db_helper.add_expense(d, cat, sub, ttype, amt)
+        invalidate_reads()
         st.toast("✅ Transaction Added Successfully!", icon="🎉")
 
         st.session_state['add_cat'] = None
@@ -235,6 +285,7 @@ elif menu == "✏️ Update Transaction":
         ua = st.session_state.get('u_amt')
 
         db_helper.update_expense(uid, ud, uc, us, ut, ua)
+        invalidate_reads()
         st.toast(f"✅ Transaction {uid} Updated!", icon="🔄")
 
         st.session_state['update_found_data'] = None
@@ -256,7 +307,7 @@ elif menu == "✏️ Update Transaction":
     # --- 3. FETCH BUTTON LOGIC ---
     if st.button("🔍 Fetch Details"):
         if search_id:  # चेक करना कि ID खाली तो नहीं है
-            record = db_helper.search_by_id(search_id)
+            record = read("search_by_id", search_id)
             if record:
                 st.session_state['update_found_data'] = record
                 st.success("Transaction Found!")
@@ -302,9 +353,10 @@ elif menu == "🗑️ Delete Transaction":
     def cb_delete_expense():
         did = st.session_state.get('del_id_input')
         if did:
-            rec = db_helper.search_by_id(did)
+            rec = read("search_by_id", did)
             if rec:
                 db_helper.delete_expense(did)
+                invalidate_reads()
                 st.toast(f"✅ Transaction {did} Deleted!", icon="🗑️")
                 st.session_state['del_id_input'] = None
             else:
@@ -320,14 +372,37 @@ elif menu == "🗑️ Delete Transaction":
 
 # ================= 4. VIEW ALL =================
 elif menu == "📋 View All Transactions":
-    data = db_helper.show_all_expenses()
-    show_data_with_downloads(pd.DataFrame(data), "all")
+    # Keyset pagination: keep a stack of page cursors instead of loading every row.
+    def cb_reset_pages():
+        st.session_state['view_cursors'] = [None]
+
+    def cb_next_page(cursor):
+        st.session_state['view_cursors'].append(cursor)
+
+    def cb_prev_page():
+        st.session_state['view_cursors'].pop()
+
+    if 'view_cursors' not in st.session_state:
+        cb_reset_pages()
+
+    page_size = st.selectbox("Rows per page", [50, 100, 500, 1000], index=1,
+                             key='view_page_size', on_change=cb_reset_pages)
+    cursors = st.session_state['view_cursors']
+    page = read("list_expenses", page_size, cursors[-1])
+
+    p1, p2, p3 = st.columns([1, 1, 4])
+    p1.button("⬅️ Previous", on_click=cb_prev_page, disabled=len(cursors) == 1)
+    p2.button("Next ➡️", on_click=cb_next_page, args=(page['next_after'],),
+              disabled=page['next_after'] is None)
+    p3.markdown(f"Page {len(cursors)}")
+
+    show_data_with_downloads(pd.DataFrame(page['items']), "all", filters={})
 
 # ================= 6. SEARCH OPTIONS =================
 elif menu == "🔍 Search by ID":
     sid = st.number_input("Enter Transaction ID", min_value=1,value =None,placeholder ='Enter Id To Search', step=1)
     if st.button("Search"):
-        data = db_helper.search_by_id(sid)
+        data = read("search_by_id", sid)
         if data:
             show_data_with_downloads(pd.DataFrame([data]), "id")
         else:
@@ -337,19 +412,23 @@ elif menu == "🏷️ Search by Category":
     cat = st.selectbox("Category",
                        ["Food", "Travel", "Bills", "Shopping", "Entertainment", "Salary", "Business", "Others"])
     if st.button("Search"):
-        data = db_helper.search_by_category(cat)
-        show_data_with_downloads(pd.DataFrame(data), "cat")
+        data = read("search_by_category", cat)
+        show_data_with_downloads(pd.DataFrame(data), "cat", filters={"categories": [cat]})
 
 elif menu == "📝 Search by Sub Category":
     st.markdown("Search for specific items like 'Pizza', 'Uber', 'Rent', etc.")
     sub_cat_input = st.text_input("Enter Sub Category")
+    if sub_cat_input:
+        suggestions = db_helper.suggest_sub_categories(sub_cat_input)
+        if suggestions:
+            st.caption("Suggestions: " + ", ".join(f"{s['sub_category']} ({s['count']})" for s in suggestions))
     if st.button("Search Sub Category"):
         if sub_cat_input:
-            data = db_helper.search_by_sub_category(sub_cat_input)
+            data = read("search_by_sub_category", sub_cat_input)
             df = pd.DataFrame(data)
             if not df.empty:
                 st.success(f"Found {len(df)} records matching '{sub_cat_input}'")
-                show_data_with_downloads(df, "sub_cat")
+                show_data_with_downloads(df, "sub_cat", filters={"sub_category": sub_cat_input})
             else:
                 st.warning(f"No records found for '{sub_cat_input}'")
         else:
@@ -360,10 +439,10 @@ elif menu == "💳 Search by Transaction Type":
 
     if st.button("Search"):
 
-        data = db_helper.search_by_transaction_type(tt)
+        data = read("search_by_transaction_type", tt)
 
         if data:
-            show_data_with_downloads(pd.DataFrame(data), "type")
+            show_data_with_downloads(pd.DataFrame(data), "type", filters={"transaction_types": [tt]})
         else:
             st.error(f"No records found for '{tt}'.")
 
@@ -383,22 +462,14 @@ elif menu == "🛠️ Custom Data Filter":
         st.markdown("---")
 
         if st.button("🔎 Apply Filter", key="btn_date_filter"):
-            raw = db_helper.filter_by_date_range(start_d, end_d)
-            df = pd.DataFrame(raw)
+            filters = dict(start_date=start_d, end_date=end_d,
+                           transaction_types=TYPE_FILTERS[filter_type])
+            df = pd.DataFrame(read("query_expenses", **filters))
             if not df.empty:
-                df['type_clean'] = df['transaction_type'].astype(str).str.strip().str.lower()
-
-                if filter_type == "Income":
-                    df = df[df['type_clean'].isin(['income', 'credit'])]
-                elif filter_type == "Expense":
-                    df = df[df['type_clean'].isin(['expense', 'debit'])]
-
-                if not df.empty:
-                    df = df.drop(columns=['type_clean'])
-                    st.success(f"Found {len(df)} records ({filter_type}).")
-                    show_data_with_downloads(df, "date_filtered")
-                else:
-                    st.warning(f"No {filter_type} records found.")
+                st.success(f"Found {len(df)} records ({filter_type}).")
+                show_data_with_downloads(df, "date_filtered", filters)
+            elif filter_type != "All":
+                st.warning(f"No {filter_type} records found.")
             else:
                 st.warning("No records found.")
 
@@ -412,22 +483,14 @@ elif menu == "🛠️ Custom Data Filter":
         st.markdown("---")
 
         if st.button("🔎 Apply Filter", key="btn_amt_filter"):
-            raw = db_helper.filter_by_amount_range(min_a, max_a)
-            df = pd.DataFrame(raw)
+            filters = dict(min_amount=min_a, max_amount=max_a,
+                           transaction_types=TYPE_FILTERS[filter_type_amt], sort="amount_desc")
+            df = pd.DataFrame(read("query_expenses", **filters))
             if not df.empty:
-                df['type_clean'] = df['transaction_type'].astype(str).str.strip().str.lower()
-
-                if filter_type_amt == "Income":
-                    df = df[df['type_clean'].isin(['income', 'credit'])]
-                elif filter_type_amt == "Expense":
-                    df = df[df['type_clean'].isin(['expense', 'debit'])]
-
-                if not df.empty:
-                    df = df.drop(columns=['type_clean'])
-                    st.success(f"Found {len(df)} records ({filter_type_amt}).")
-                    show_data_with_downloads(df, "amount_filtered")
-                else:
-                    st.warning(f"No {filter_type_amt} records found.")
+                st.success(f"Found {len(df)} records ({filter_type_amt}).")
+                show_data_with_downloads(df, "amount_filtered", filters)
+            elif filter_type_amt != "All":
+                st.warning(f"No {filter_type_amt} records found.")
             else:
                 st.warning("No records found.")
 
@@ -447,21 +510,14 @@ elif menu == "📊 Dashboard & Charts":
         dash_type_d = st.radio("Show:", ["All", "Expense", "Income"], horizontal=True, key="dash_type_d")
 
         if st.button("🚀 Generate Charts", key="btn_dash_d"):
-            raw = db_helper.filter_by_date_range(d_start, d_end)
-            df = pd.DataFrame(raw)
+            filters = dict(start_date=d_start, end_date=d_end,
+                           transaction_types=TYPE_FILTERS[dash_type_d])
+            df = mirror_rows(**filters)
             if not df.empty:
-                df['type_clean'] = df['transaction_type'].astype(str).str.strip().str.lower()
-
-                if dash_type_d == "Income":
-                    df = df[df['type_clean'].isin(['income', 'credit'])]
-                elif dash_type_d == "Expense":
-                    df = df[df['type_clean'].isin(['expense', 'debit'])]
-
-                if not df.empty:
-                    generate_charts(df)
-                    show_data_with_downloads(df, "dash_date")
-                else:
-                    st.warning(f"No {dash_type_d} data found in this range.")
+                generate_charts(filters)
+                show_data_with_downloads(df, "dash_date", filters)
+            elif dash_type_d != "All":
+                st.warning(f"No {dash_type_d} data found in this range.")
             else:
                 st.error("No data found.")
 
@@ -475,21 +531,14 @@ elif menu == "📊 Dashboard & Charts":
         dash_type_a = st.radio("Show:", ["All", "Expense", "Income"], horizontal=True, key="dash_type_a")
 
         if st.button("🚀 Generate Charts", key="btn_dash_a"):
-            raw = db_helper.filter_by_amount_range(a_min, a_max)
-            df = pd.DataFrame(raw)
+            filters = dict(min_amount=a_min, max_amount=a_max,
+                           transaction_types=TYPE_FILTERS[dash_type_a])
+            df = mirror_rows("amount_desc", **filters)
             if not df.empty:
-                df['type_clean'] = df['transaction_type'].astype(str).str.strip().str.lower()
-
-                if dash_type_a == "Income":
-                    df = df[df['type_clean'].isin(['income', 'credit'])]
-                elif dash_type_a == "Expense":
-                    df = df[df['type_clean'].isin(['expense', 'debit'])]
-
-                if not df.empty:
-                    generate_charts(df)
-                    show_data_with_downloads(df, "dash_amount")
-                else:
-                    st.warning(f"No {dash_type_a} data found in this range.")
+                generate_charts(filters)
+                show_data_with_downloads(df, "dash_amount", dict(filters, sort="amount_desc"))
+            elif dash_type_a != "All":
+                st.warning(f"No {dash_type_a} data found in this range.")
             else:
                 st.error("No data found.")
 
@@ -505,23 +554,12 @@ elif menu == "📊 Dashboard & Charts":
         dash_type_c = st.radio("Show:", ["All", "Expense", "Income"], horizontal=True, key="dash_type_c")
 
         if st.button("🚀 Generate Combined Charts", key="btn_dash_c"):
-            raw = db_helper.filter_by_date_range(cd_start, cd_end)
-            df = pd.DataFrame(raw)
+            filters = dict(start_date=cd_start, end_date=cd_end,
+                           min_amount=ca_min, max_amount=ca_max,
+                           transaction_types=TYPE_FILTERS[dash_type_c])
+            df = mirror_rows(**filters)
             if not df.empty:
-                df['amount'] = pd.to_numeric(df['amount'])
-                df = df[(df['amount'] >= ca_min) & (df['amount'] <= ca_max)]
-
-                df['type_clean'] = df['transaction_type'].astype(str).str.strip().str.lower()
-
-                if dash_type_c == "Income":
-                    df = df[df['type_clean'].isin(['income', 'credit'])]
-                elif dash_type_c == "Expense":
-                    df = df[df['type_clean'].isin(['expense', 'debit'])]
-
-                if not df.empty:
-                    generate_charts(df)
-                    show_data_with_downloads(df, "dash_combined")
-                else:
-                    st.warning(f"No {dash_type_c} data found matching criteria.")
+                generate_charts(filters)
+                show_data_with_downloads(df, "dash_combined", filters)
             else:
-                st.warning("No data found in date range.")
\ No newline at end of file
+                st.warning("No data found matching criteria.")
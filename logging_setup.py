@@ -1,33 +1,196 @@
+import atexit
+import itertools
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import threading
 
-def setup_logger(name, log_file='expense_app.log'):
+base_dir = os.path.dirname(os.path.abspath(__file__))
 
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    log_dir = os.path.join(base_dir, "logs")
+# Logging Configuration (environment variables override the defaults)
+#   BILANCIO_LOG_LEVEL=INFO                          default level for every logger
+#   BILANCIO_LOG_LEVELS=db_helper=WARNING,exports=DEBUG   per-logger levels
+#   BILANCIO_LOG_JSON=1                              one JSON object per line instead of text
+#   BILANCIO_LOG_ROTATE=0                            never rotate in-process (leave it to logrotate)
+log_config = {
+    "level": os.environ.get("BILANCIO_LOG_LEVEL", "INFO"),
+    "levels": dict(
+        item.split("=", 1) for item in os.environ.get("BILANCIO_LOG_LEVELS", "").split(",") if "=" in item
+    ),
+    "json": os.environ.get("BILANCIO_LOG_JSON", "0") == "1",
+    "console": os.environ.get("BILANCIO_LOG_CONSOLE", "1") == "1",
+    "log_dir": os.path.join(base_dir, "logs"),
+    # A rotating file must have a single writer, or one process's rollover clobbers the
+    # others' output. The first process to start claims logs/<log_file>; any other one
+    # running at the same time (an API worker next to the Streamlit app) writes
+    # logs/<name>.<n>.<ext>, the lowest slot no live process holds (see _claim_slot).
+    # Without "rotate" all processes share the file, reopened when logrotate moves it.
+    "rotate": os.environ.get("BILANCIO_LOG_ROTATE", "1") == "1",
+    "max_bytes": 10 * 1024 * 1024,   # with "rotate": rotate the file at this size...
+    "backup_count": 5,               # ...keeping this many old files
+    "when": None,                    # or rotate by time instead, e.g. "midnight"
+}
 
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 
-    if not os.path.exists(log_dir):
-        os.makedirs(log_dir)
+# Attributes every LogRecord has; anything else was passed through ``extra``.
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
 
-    log_path = os.path.join(log_dir, log_file)
 
-    logger = logging.getLogger(name)
-    logger.setLevel(logging.INFO)
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, including any fields passed through ``extra``."""
+
+    def format(self, record):
+        payload = {
+            "time": self.formatTime(record),
+            "logger": record.name,
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and key != "sample_every":
+                payload[key] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+def sampled(every):
+    """``extra`` for high-volume messages: only 1 in ``every`` of them is logged."""
+    return {"sample_every": every}
+
+
+class SamplingFilter(logging.Filter):
+    """Drops all but 1 in N records that carry ``sample_every=N`` (see ``sampled``)."""
+
+    def __init__(self):
+        super().__init__()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        every = getattr(record, "sample_every", None)
+        if not every or every <= 1:
+            return True
+        key = (record.name, record.msg)
+        with self._lock:
+            counter = self._counters.setdefault(key, itertools.count())
+            return next(counter) % every == 0
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """Puts the record on the queue as-is, so formatting happens on the listener thread."""
+
+    def prepare(self, record):
+        return record
+
+
+_listeners = {}
+_listeners_lock = threading.Lock()
+_sampling_filter = SamplingFilter()
+_slots = {}     # (log_dir, log_file) -> (file this process writes, its open lock file)
+
 
+def _try_lock(handle):
+    """Take an exclusive lock on ``handle`` without waiting; released when the process exits."""
+    try:
+        if os.name == "nt":
+            import msvcrt
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
 
-    if logger.hasHandlers():
-        logger.handlers.clear()
 
+def _claim_slot(log_file):
+    """The file this process may rotate: ``log_file``, or ``<name>.<n><ext>`` if another process holds it.
 
-    file_handler = logging.FileHandler(log_path)
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    Each slot is guarded by a ``.lock`` file held for the life of the process,
+    so slots are reused by later runs and never have two writers.
+    """
+    key = (log_config["log_dir"], log_file)
+    if key not in _slots:
+        root, ext = os.path.splitext(log_file)
+        for slot in itertools.count():
+            name = log_file if slot == 0 else f"{root}.{slot}{ext}"
+            lock = open(os.path.join(log_config["log_dir"], f"{name}.lock"), "a+b")
+            if _try_lock(lock):
+                _slots[key] = (name, lock)
+                break
+            lock.close()
+    return _slots[key][0]
+
+
+def _build_handlers(log_file):
+    os.makedirs(log_config["log_dir"], exist_ok=True)
+    if log_config["rotate"]:
+        log_file = _claim_slot(log_file)
+    log_path = os.path.join(log_config["log_dir"], log_file)
+
+    if not log_config["rotate"]:
+        file_handler = logging.handlers.WatchedFileHandler(log_path, encoding="utf-8")
+    elif log_config["when"]:
+        file_handler = logging.handlers.TimedRotatingFileHandler(
+            log_path, when=log_config["when"], backupCount=log_config["backup_count"], encoding="utf-8")
+    else:
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_path, maxBytes=log_config["max_bytes"], backupCount=log_config["backup_count"], encoding="utf-8")
+
+    formatter = JsonFormatter() if log_config["json"] else logging.Formatter(TEXT_FORMAT)
     file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
+    handlers = [file_handler]
+
+    if log_config["console"]:
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(formatter)
+        handlers.append(stream_handler)
+    return handlers
+
+
+def _get_queue(log_file):
+    """One queue and background listener thread per log file, shared by all loggers."""
+    with _listeners_lock:
+        if log_file not in _listeners:
+            log_queue = queue.SimpleQueue()
+            listener = logging.handlers.QueueListener(log_queue, *_build_handlers(log_file),
+                                                      respect_handler_level=True)
+            listener.start()
+            _listeners[log_file] = (log_queue, listener)
+        return _listeners[log_file][0]
+
 
+def shutdown_logging():
+    """Flush and stop every listener thread (also run at interpreter exit)."""
+    with _listeners_lock:
+        listeners = list(_listeners.values())
+        _listeners.clear()
+    for _, listener in listeners:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+atexit.register(shutdown_logging)
+
+
+def setup_logger(name, log_file='expense_app.log'):
+    """Return ``name``'s logger, writing to ``logs/<log_file>`` through a background thread.
+
+    Calling it again for the same logger is harmless: the queue handler is only
+    attached once.
+    """
+    logger = logging.getLogger(name)
+    logger.setLevel(log_config["levels"].get(name, log_config["level"]).upper())
 
-    stream_handler = logging.StreamHandler()
-    stream_handler.setFormatter(formatter)
-    logger.addHandler(stream_handler)
+    if not any(isinstance(h, LazyQueueHandler) for h in logger.handlers):
+        logger.addHandler(LazyQueueHandler(_get_queue(log_file)))
+    if _sampling_filter not in logger.filters:
+        logger.addFilter(_sampling_filter)
 
-    return logger
\ No newline at end of file
+    return logger
@@ -0,0 +1,78 @@
+import asyncio
+from datetime import date
+import pytest
+from backend import db_async, db_helper
+from backend.analytics_engine import ColumnarStore
+
+
+ROWS = [
+    (date(2024, 2, 5), "TEST_ENGINE", "Pizza", "Expense", 30.10),
+    (date(2024, 2, 11), "TEST_ENGINE", "pizza hut", " expense", 12.25),
+    (date(2024, 2, 12), "TEST_ENGINE_B", "Salary", "Income", 1000.0),
+    (date(2024, 3, 1), "TEST_ENGINE_B", "Bonus", "income", 99.99),
+]
+
+
+def _plain(result):
+    """Engine and SQL results with numbers and dates in one comparable form."""
+    if isinstance(result, dict):
+        return {key: _plain(value) for key, value in result.items()}
+    if isinstance(result, list):
+        return [_plain(value) for value in result]
+    if isinstance(result, date):
+        return result.isoformat()
+    if isinstance(result, (int, float)) or hasattr(result, "quantize"):
+        return round(float(result), 2)
+    return result
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    monkeypatch.setattr(db_helper.result_cache, "enabled", False)
+    monkeypatch.setattr(db_helper.analytics_engine, "source", None)
+    db_helper.add_expenses(ROWS)
+    yield
+    for category in ("TEST_ENGINE", "TEST_ENGINE_B"):
+        for row in db_helper.search_by_category(category):
+            db_helper.delete_expense(row["id"])
+
+
+@pytest.mark.parametrize("filters", [
+    {"categories": ["TEST_ENGINE", "TEST_ENGINE_B"]},
+    {"categories": ["TEST_ENGINE", "TEST_ENGINE_B"], "start_date": date(2024, 2, 11), "end_date": "2024-02-29"},
+    {"categories": ["TEST_ENGINE", "TEST_ENGINE_B"], "sub_category": "PIZZA", "min_amount": 12.25},
+    {"categories": ["TEST_ENGINE_B"], "transaction_types": ["INCOME "], "max_amount": 100},
+])
+def test_engine_answers_like_the_database(engine, monkeypatch, filters):
+    queries = [("expense_totals", ()), ("category_share", ()),
+               ("expense_trend", ("day",)), ("expense_trend", ("week",)), ("expense_trend", ("month",))]
+    expected = [_plain(getattr(db_helper, name)(*args, **filters)) for name, args in queries]
+    monkeypatch.setitem(db_helper.analytics_config, "engine", True)
+    assert [_plain(getattr(db_helper, name)(*args, **filters)) for name, args in queries] == expected
+    assert [_plain(asyncio.run(getattr(db_async, name)(*args, **filters))) for name, args in queries] == expected
+
+
+def test_engine_follows_writes(engine, monkeypatch):
+    monkeypatch.setitem(db_helper.analytics_config, "engine", True)
+    filters = {"categories": ["TEST_ENGINE"]}
+    assert db_helper.expense_totals(**filters)["count"] == 2
+    first = db_helper.search_by_category("TEST_ENGINE")[-1]
+
+    db_helper.add_expense(date(2024, 1, 31), "TEST_ENGINE", "Pizza", "Expense", 5.0)
+    db_helper.update_expense(first["id"], date(2024, 4, 1), "TEST_ENGINE", "Pizza", "Expense", 1.0)
+    assert not db_helper.analytics_engine_is_current()
+    trend = db_helper.expense_trend("month", **filters)
+    assert [(str(r["period"]), float(r["total"])) for r in trend] == [
+        ("2024-01-01", 5.0), ("2024-02-01", 12.25), ("2024-04-01", 1.0)]
+
+    db_helper.delete_expense(first["id"])
+    assert db_helper.category_share(**filters)[0]["count"] == 2
+
+
+def test_date_range_is_a_slice_of_the_sorted_columns():
+    store = ColumnarStore()
+    store.load([{"id": n, "expense_date": date(2024, 1, 1 + n % 28), "category": "C", "sub_category": "S",
+                 "transaction_type": "Expense", "amount": 1} for n in range(100)], version=1)
+    assert list(store.columns["day"]) == sorted(store.columns["day"])
+    assert store.expense_totals(start_date=date(2024, 1, 2), end_date=date(2024, 1, 3))["count"] == 8
+    assert store.expense_totals(start_date=date(2024, 2, 1))["count"] == 0
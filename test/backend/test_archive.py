@@ -0,0 +1,137 @@
+import asyncio
+import os
+from datetime import date
+from decimal import Decimal
+import pytest
+from backend import db_async, db_helper, parquet_archive, rollup
+
+
+@pytest.fixture
+def archive_dir(tmp_path, monkeypatch):
+    monkeypatch.setitem(parquet_archive.archive_config, "dir", str(tmp_path / "archive"))
+    yield
+    monkeypatch.undo()
+    rollup.rebuild()      # drop the totals of the test's archived days
+
+
+def test_archived_years_stay_readable(archive_dir):
+    db_helper.add_expenses([(date(2001, 5, 1), "TEST_ARCHIVE", "Old", "Expense", 10.25),
+                            (date(2002, 7, 1), "TEST_ARCHIVE", "Old", "Expense", 4.75),
+                            (date(2003, 1, 2), "TEST_ARCHIVE", "Kept", "Expense", 1.0)])
+    by_year = {row["year"]: row["total"] for row in db_helper.total_expense_by_year()}
+
+    assert db_helper.archive_expenses(keep_years=1, today=date(2003, 6, 1)) == {2001: 1, 2002: 1}
+    assert parquet_archive.archived_years() == [2001, 2002]
+    assert [row["sub_category"] for row in db_helper.search_by_category("TEST_ARCHIVE")] == ["Kept"]
+
+    rows = db_helper.filter_by_date_range(date(2001, 1, 1), date(2003, 12, 31))
+    assert [(row["expense_date"], row["amount"]) for row in rows if row["category"] == "TEST_ARCHIVE"] == [
+        (date(2003, 1, 2), Decimal("1.00")), (date(2002, 7, 1), Decimal("4.75")), (date(2001, 5, 1), Decimal("10.25"))]
+    assert {row["year"]: row["total"] for row in db_helper.total_expense_by_year()} == by_year
+    assert rollup.verify() == []
+
+    for row in db_helper.search_by_category("TEST_ARCHIVE"):
+        db_helper.delete_expense(row["id"])
+
+
+@pytest.mark.parametrize("engine", [False, True])
+def test_archived_rows_leave_the_change_feed_but_not_the_reads(archive_dir, monkeypatch, engine):
+    monkeypatch.setitem(db_helper.analytics_config, "engine", engine)
+    db_helper.add_expenses([(date(2001, 5, 1), "TEST_ARCHIVE", "ArchivedOnly", "Expense", 10.25),
+                            (date(2001, 5, 20), "TEST_ARCHIVE", "ArchivedOnly", " income", 3.0),
+                            (date(2003, 1, 2), "TEST_ARCHIVE", "Kept", "Expense", 1.0)])
+    old_ids = {row["id"] for row in db_helper.search_by_category("TEST_ARCHIVE")
+               if row["expense_date"].year == 2001}
+    assert db_helper.suggest_sub_categories("ArchivedOnly") == [{"sub_category": "ArchivedOnly", "count": 2}]
+    since = db_helper.data_version()[0]
+
+    db_helper.archive_expenses(keep_years=1, today=date(2003, 6, 1))
+    assert {row["id"] for row in db_helper.expense_changes(since)["deletes"]} == old_ids
+    assert db_helper.suggest_sub_categories("ArchivedOnly") == []
+
+    mine = {"categories": ["TEST_ARCHIVE"]}
+    rows = db_helper.query_expenses(**mine)
+    assert [row["amount"] for row in rows] == [Decimal("1.00"), Decimal("3.00"), Decimal("10.25")]
+    assert list(db_helper.stream_expenses(batch_size=1, **mine)) == rows
+    assert [row["amount"] for row in db_helper.query_expenses(sort="amount_desc", limit=1, offset=1, **mine)] == [
+        Decimal("3.00")]
+    assert db_helper.query_expenses(sub_category="archived_nly", **mine) == rows[1:]
+
+    totals = db_helper.expense_totals(**mine)
+    assert (totals["total_expense"], totals["total_income"], totals["count"]) == (11.25, 3.0, 3)
+    assert db_helper.category_share(**mine) == [{"category": "TEST_ARCHIVE", "total": Decimal("14.25"), "count": 3}]
+    trend = db_helper.expense_trend("month", **mine)
+    assert [(row["period"], row["total"]) for row in trend] == [
+        (date(2001, 5, 1), Decimal("13.25")), (date(2003, 1, 1), Decimal("1.00"))]
+
+    async def scenario():
+        result = (await db_async.query_expenses(**mine), await db_async.expense_totals(**mine),
+                  await db_async.expense_trend("month", **mine))
+        await db_async.dispose_pool()
+        return result
+
+    assert asyncio.run(scenario()) == (rows, totals, trend)
+    for row in db_helper.search_by_category("TEST_ARCHIVE"):
+        db_helper.delete_expense(row["id"])
+
+
+def test_failed_archive_leaves_the_year_file_alone(archive_dir, monkeypatch):
+    earlier = [{"id": 10 ** 9, "expense_date": date(2001, 1, 1), "category": "TEST_ARCHIVE",
+                "sub_category": "Earlier", "transaction_type": "Expense", "amount": Decimal("2.00")}]
+    parquet_archive.write_year(2001, earlier)
+    db_helper.add_expense(date(2001, 5, 1), "TEST_ARCHIVE", "Old", "Expense", 10.25)
+    seen = []
+
+    def fail(cursor, ids, version):
+        seen.append(parquet_archive.read_year(2001))     # the rows are written, not yet committed
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(db_helper, "_add_tombstones", fail)
+    with pytest.raises(RuntimeError):
+        db_helper.archive_expenses(keep_years=1, today=date(2003, 6, 1))
+    assert seen == [earlier]
+    assert parquet_archive.read_year(2001) == earlier
+    assert os.listdir(parquet_archive.archive_config["dir"]) == ["expense_2001.parquet"]
+    assert [row["sub_category"] for row in db_helper.search_by_category("TEST_ARCHIVE")] == ["Old"]
+
+    monkeypatch.undo()
+    for row in db_helper.search_by_category("TEST_ARCHIVE"):
+        db_helper.delete_expense(row["id"])
+
+
+def test_every_expense_listing_includes_archived_years(archive_dir, monkeypatch):
+    monkeypatch.setitem(parquet_archive.archive_config, "row_group_size", 2)    # several groups per year
+    db_helper.add_expenses([(date(2001, 3, 1), "TEST_ARCHIVE", "Old", "Expense", 5.0),
+                            (date(2001, 7, 1), "TEST_ARCHIVE", "Old", "Expense", 1.0),
+                            (date(2001, 7, 1), "TEST_ARCHIVE", "Old", "Expense", 9.0),
+                            (date(2002, 1, 5), "TEST_ARCHIVE", "Old", "Expense", 7.0),
+                            (date(2002, 12, 31), "TEST_ARCHIVE", "Old", "Expense", 2.0),
+                            (date(2003, 1, 2), "TEST_ARCHIVE", "Kept", "Expense", 4.0)])
+    db_helper.archive_expenses(keep_years=1, today=date(2003, 6, 1))
+
+    def mine(rows):
+        return [float(row["amount"]) for row in rows if row["category"] == "TEST_ARCHIVE"]
+
+    everything = db_helper.show_all_expenses()
+    assert mine(everything) == [4.0, 2.0, 7.0, 9.0, 1.0, 5.0]
+    assert list(db_helper.stream_expenses(batch_size=2)) == everything
+    assert mine(db_helper.stream_expenses(sort="amount_asc")) == [1.0, 2.0, 4.0, 5.0, 7.0, 9.0]
+
+    pages, after = [], None
+    while True:
+        page = db_helper.list_expenses(limit=2, after=after)
+        pages += page["items"]
+        after = page["next_after"]
+        if after is None:
+            break
+    assert pages == everything
+
+    async def scenario():
+        result = await db_async.show_all_expenses(), await db_async.list_expenses(3)
+        await db_async.dispose_pool()
+        return result
+
+    rows, page = asyncio.run(scenario())
+    assert rows == everything and page["items"] == everything[:3]
+    for row in db_helper.search_by_category("TEST_ARCHIVE"):
+        db_helper.delete_expense(row["id"])
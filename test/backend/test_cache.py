@@ -0,0 +1,67 @@
+from datetime import date
+from backend.cache import ResultCache
+
+
+def make_counter(cache):
+    calls = []
+
+    @cache.cached()
+    def lookup(start, end=None):
+        calls.append((start, end))
+        return [start, end]
+
+    return lookup, calls
+
+
+def test_equivalent_arguments_share_an_entry():
+    cache = ResultCache()
+    lookup, calls = make_counter(cache)
+    lookup(date(2024, 1, 1), 5)
+    lookup("2024-01-01", end=5.0)
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_version_bump_invalidates_everything():
+    cache = ResultCache()
+    lookup, calls = make_counter(cache)
+    lookup(1)
+    cache.bump_version()
+    lookup(1)
+    assert len(calls) == 2
+
+
+def test_result_computed_across_a_write_is_not_stored():
+    cache = ResultCache()
+
+    @cache.cached()
+    def racing_read():
+        cache.bump_version()  # a writer commits while the query is running
+        return "stale"
+
+    racing_read()
+    assert cache.stats()["size"] == 0
+
+
+def test_lru_eviction_and_ttl():
+    cache = ResultCache(maxsize=2, ttl=60)
+    lookup, calls = make_counter(cache)
+    lookup(1)
+    lookup(2)
+    lookup(1)
+    lookup(3)          # evicts 2, the least recently used
+    lookup(1)
+    assert len(calls) == 3
+    assert cache.stats()["evictions"] == 1
+
+    cache.ttl = 0
+    lookup(1)
+    assert len(calls) == 4
+
+
+def test_disabled_cache_always_calls_through():
+    cache = ResultCache(enabled=False)
+    lookup, calls = make_counter(cache)
+    lookup(1)
+    lookup(1)
+    assert len(calls) == 2
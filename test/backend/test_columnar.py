@@ -0,0 +1,39 @@
+from datetime import date
+from decimal import Decimal
+from fastapi.testclient import TestClient
+from backend import columnar, db_helper
+from backend.server import app
+
+ROWS = [
+    {"id": 2, "expense_date": date(2024, 3, 7), "category": "Food", "sub_category": "Pizza",
+     "transaction_type": "Expense", "amount": Decimal("12.50")},
+    {"id": 1, "expense_date": date(2024, 3, 6), "category": "Salary", "sub_category": "March",
+     "transaction_type": "Income", "amount": 1000.0},
+]
+
+
+def test_negotiate_prefers_highest_quality():
+    assert columnar.negotiate(columnar.ARROW_STREAM) == columnar.ARROW_STREAM
+    assert columnar.negotiate(f"application/json, {columnar.PARQUET};q=0.5") is None
+    assert columnar.negotiate(f"application/json;q=0.5, {columnar.PARQUET}") == columnar.PARQUET
+    assert columnar.negotiate("*/*") is None
+    assert columnar.negotiate(None) is None
+
+
+def test_round_trip_keeps_types():
+    for media_type in columnar.MEDIA_TYPES:
+        df = columnar.read_frame(columnar.serialize(ROWS, media_type), media_type)
+        assert list(df.columns) == list(columnar.EXPENSE_COLUMNS)
+        assert df["expense_date"].tolist() == [date(2024, 3, 7), date(2024, 3, 6)]
+        assert df["amount"].tolist() == [Decimal("12.50"), Decimal("1000.00")]
+
+
+def test_query_endpoint_negotiates_arrow():
+    db_helper.add_expense(date(2024, 3, 6), "TEST_ARROW", "Self", "Expense", 7.25)
+    client = TestClient(app)
+    response = client.get("/expenses/query?category=TEST_ARROW", headers={"Accept": columnar.ARROW_STREAM})
+    assert response.headers["content-type"] == columnar.ARROW_STREAM
+    df = columnar.read_frame(response.content)
+    assert df["amount"].tolist() == [Decimal("7.25")]
+    assert client.get("/expenses/query?category=TEST_ARROW").json()[0]["category"] == "TEST_ARROW"
+    db_helper.delete_expense(int(df["id"][0]))
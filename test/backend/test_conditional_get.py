@@ -0,0 +1,34 @@
+from datetime import date
+from fastapi.testclient import TestClient
+from backend import db_helper
+from backend.server import app
+
+
+def test_writes_move_the_data_version():
+    before, _ = db_helper.data_version()
+    db_helper.add_expense(date(2024, 3, 6), "TEST_ETAG", "Self", "Expense", 1.0)
+    after, _ = db_helper.data_version()
+    assert after > before
+    for row in db_helper.search_by_category("TEST_ETAG"):
+        db_helper.delete_expense(row["id"])
+    assert db_helper.data_version()[0] > after
+
+
+def test_unchanged_poll_gets_304_without_querying(monkeypatch):
+    client = TestClient(app)
+    first = client.get("/summary/month")
+    etag = first.headers["etag"]
+    assert first.status_code == 200 and first.headers["last-modified"]
+
+    def fail():
+        raise AssertionError("handler ran for an unchanged resource")
+    monkeypatch.setattr("backend.db_async.total_expense_this_month", fail)
+    again = client.get("/summary/month", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.headers["etag"] == etag
+    monkeypatch.undo()
+
+    db_helper.add_expense(date.today(), "TEST_ETAG", "Self", "Expense", 2.0)
+    changed = client.get("/summary/month", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+    for row in db_helper.search_by_category("TEST_ETAG"):
+        db_helper.delete_expense(row["id"])
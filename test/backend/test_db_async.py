@@ -0,0 +1,21 @@
+import asyncio
+from datetime import date
+from backend import db_async, db_helper
+
+
+def test_async_reads_match_sync_reads(monkeypatch):
+    monkeypatch.setattr(db_helper.result_cache, "enabled", False)
+    db_helper.add_expense(date.today(), "TEST_ASYNC", "Self", "Expense", 42.0)
+
+    async def scenario():
+        rows = await db_async.search_by_category("TEST_ASYNC")
+        summary = await db_async.dashboard_summary()
+        await db_async.dispose_pool()
+        return rows, summary
+
+    rows, summary = asyncio.run(scenario())
+    assert rows == db_helper.search_by_category("TEST_ASYNC")
+    assert summary["total_expense_today"] == db_helper.total_expense_today()
+    assert summary["year_wise"] == db_helper.total_expense_by_year()
+    for row in rows:
+        db_helper.delete_expense(row["id"])
@@ -1,5 +1,7 @@
 import pytest
-from backend import db_helper
+from fastapi.testclient import TestClient
+from backend import db_helper, rollup
+from backend.server import app
 from datetime import date
 
 
@@ -19,4 +21,123 @@ def test_add_expense_visible():
     id_to_delete = expenses[0]['id']
     db_helper.delete_expense(id_to_delete)
 
-    print("✅ डेटा जुड़ गया! अब ऐप में जाकर रिफ्रेश करो।")
\ No newline at end of file
+    print("✅ डेटा जुड़ गया! अब ऐप में जाकर रिफ्रेश करो।")
+
+def test_page_cursor_round_trip():
+    row = {"expense_date": date(2024, 3, 9), "id": 42}
+    cursor = db_helper.encode_page_cursor(row)
+    assert db_helper.decode_page_cursor(cursor) == (date(2024, 3, 9), 42)
+
+    with pytest.raises(ValueError):
+        db_helper.decode_page_cursor("not-a-cursor")
+
+
+def test_list_expenses_pages_do_not_overlap():
+    first = db_helper.list_expenses(limit=2)
+    assert len(first["items"]) <= 2
+    if first["next_after"]:
+        second = db_helper.list_expenses(limit=2, after=first["next_after"])
+        first_ids = {row["id"] for row in first["items"]}
+        assert not first_ids & {row["id"] for row in second["items"]}
+
+
+def test_add_expenses_inserts_in_batches():
+    rows = [
+        {"expense_date": date(2024, 1, d), "category": "TEST_BULK", "sub_category": "Self",
+         "transaction_type": "Expense", "amount": 10.0 * d}
+        for d in range(1, 6)
+    ]
+    results = db_helper.add_expenses(rows, batch_size=2)
+    assert [r["rows"] for r in results] == [2, 2, 1]
+    assert all(r["ok"] for r in results)
+
+    inserted = db_helper.search_by_category("TEST_BULK")
+    assert len(inserted) == 5
+    for row in inserted:
+        db_helper.delete_expense(row["id"])
+
+
+def test_rollup_follows_add_update_delete():
+    today = date.today()
+    before = db_helper.total_expense_today()
+
+    db_helper.add_expense(today, "TEST_ROLLUP", "Self", "Expense", 100.0)
+    assert db_helper.total_expense_today() == pytest.approx(before + 100.0)
+
+    expense_id = db_helper.search_by_category("TEST_ROLLUP")[0]["id"]
+    db_helper.update_expense(expense_id, today, "TEST_ROLLUP", "Self", "Expense", 40.0)
+    assert db_helper.total_expense_today() == pytest.approx(before + 40.0)
+
+    db_helper.delete_expense(expense_id)
+    assert db_helper.total_expense_today() == pytest.approx(before)
+    assert rollup.verify() == []
+
+
+def test_build_expense_filter_combines_clauses():
+    where, params = db_helper.build_expense_filter(
+        start_date=date(2024, 1, 1), max_amount=500,
+        categories=["Food", "Travel"], transaction_types=[" Expense", "DEBIT"])
+    assert where == ("WHERE expense_date >= %s AND amount <= %s "
+                     "AND category IN (%s, %s) AND transaction_type_norm IN (%s, %s)")
+    assert params == [date(2024, 1, 1), 500, "Food", "Travel", "expense", "debit"]
+
+    assert db_helper.build_expense_filter() == ("", [])
+
+
+def test_analytics_aggregate_in_database():
+    db_helper.add_expense(date(2024, 2, 5), "TEST_ANALYTICS", "A", "Expense", 30.0)
+    db_helper.add_expense(date(2024, 2, 20), "TEST_ANALYTICS", "B", "Income", 50.0)
+    filters = {"categories": ["TEST_ANALYTICS"]}
+
+    totals = db_helper.expense_totals(**filters)
+    assert totals["total_expense"] == pytest.approx(30.0)
+    assert totals["total_income"] == pytest.approx(50.0)
+    assert totals["count"] == 2
+
+    share = db_helper.category_share(**filters)
+    assert float(share[0]["total"]) == pytest.approx(80.0)
+
+    trend = db_helper.expense_trend("month", **filters)
+    assert [(str(r["period"]), float(r["total"])) for r in trend] == [("2024-02-01", 80.0)]
+
+    for row in db_helper.search_by_category("TEST_ANALYTICS"):
+        db_helper.delete_expense(row["id"])
+
+
+def test_bulk_update_and_delete_keep_the_rollup_in_step():
+    db_helper.add_expenses([(date(2024, 3, 6), "TEST_BULK", "Self", "Expense", 10.0)] * 3)
+    ids = [row["id"] for row in db_helper.search_by_category("TEST_BULK")]
+
+    result = db_helper.update_expenses({"category": "TEST_BULK2", "amount": 4.5}, ids=ids[:2], chunk_size=1)
+    assert result == {"matched": 2, "updated": 2}
+    assert rollup.verify() == []
+
+    result = db_helper.delete_expenses(filters={"categories": ["TEST_BULK", "TEST_BULK2"]})
+    assert result == {"matched": 3, "deleted": 3}
+    assert rollup.verify() == []
+    with pytest.raises(ValueError):
+        db_helper.delete_expenses(filters={})
+
+
+def test_bulk_routes_are_not_taken_for_an_id():
+    client = TestClient(app)
+    db_helper.add_expenses([(date(2024, 3, 6), "TEST_BULK", "Self", "Expense", 1.0)] * 2)
+    patched = client.patch("/expenses/bulk", json={"categories": ["TEST_BULK"], "changes": {"sub_category": "Fixed"}})
+    assert patched.json() == {"matched": 2, "updated": 2}
+    deleted = client.request("DELETE", "/expenses/bulk", json={"categories": ["TEST_BULK"]})
+    assert deleted.json() == {"matched": 2, "deleted": 2}
+    assert client.request("DELETE", "/expenses/bulk", json={}).status_code == 400
+
+
+def test_csv_upload_keeps_quoted_fields_that_span_lines():
+    body = ('expense_date,category,sub_category,transaction_type,amount\r\n'
+            '2024-03-06,TEST_UPLOAD,"Dinner,\nwith ""friends""",Expense,12.5\r\n'
+            '2024-03-07,TEST_UPLOAD,Lunch,Expense,not-a-number\r\n'
+            '2024-03-08,TEST_UPLOAD,Coffee,Expense,3\r\n')
+    result = TestClient(app).post("/expenses/upload?format=csv", content=body.encode()).json()
+    assert result["inserted"] == 2
+    assert [error["line"] for error in result["invalid_rows"]] == [4]
+    rows = db_helper.search_by_category("TEST_UPLOAD")
+    assert sorted(row["sub_category"] for row in rows) == ["Coffee", 'Dinner,\nwith "friends"']
+    for row in rows:
+        db_helper.delete_expense(row["id"])
@@ -0,0 +1,141 @@
+import asyncio
+import threading
+import pytest
+from backend.db_pool import AsyncConnectionPool, ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.alive = True
+
+    def close(self):
+        self.closed = True
+
+
+def make_pool(**kwargs):
+    created = []
+
+    def connect():
+        conn = FakeConnection()
+        created.append(conn)
+        return conn
+
+    def ping(conn):
+        if not conn.alive:
+            raise RuntimeError("gone away")
+
+    return ConnectionPool(connect, ping=ping, **kwargs), created
+
+
+def test_connection_is_reused():
+    pool, created = make_pool(pool_size=2, max_overflow=0)
+    conn = pool.acquire()
+    pool.release(conn)
+    assert pool.acquire() is conn
+    assert len(created) == 1
+
+
+def test_overflow_connections_are_closed_on_release():
+    pool, created = make_pool(pool_size=1, max_overflow=1)
+    a = pool.acquire()
+    b = pool.acquire()
+    assert pool.stats()["in_use"] == 2
+    pool.release(a)
+    pool.release(b)
+    assert b.closed and not a.closed
+    stats = pool.stats()
+    assert stats["open"] == 1 and stats["idle"] == 1 and stats["in_use"] == 0
+
+
+def test_checkout_times_out_when_exhausted():
+    pool, _ = make_pool(pool_size=1, max_overflow=0, timeout=0.05)
+    pool.acquire()
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    assert pool.stats()["timeouts"] == 1
+
+
+def test_waiter_gets_released_connection():
+    pool, _ = make_pool(pool_size=1, max_overflow=0, timeout=2)
+    conn = pool.acquire()
+    got = []
+    t = threading.Thread(target=lambda: got.append(pool.acquire()))
+    t.start()
+    pool.release(conn)
+    t.join()
+    assert got == [conn]
+    assert pool.stats()["wait_time_max"] > 0
+
+
+def test_dead_and_expired_connections_are_replaced():
+    pool, created = make_pool(pool_size=1, max_overflow=0, recycle=3600)
+    conn = pool.acquire()
+    conn.alive = False
+    pool.release(conn)
+    fresh = pool.acquire()
+    assert fresh is not conn and conn.closed
+    pool.release(fresh)
+
+    pool.recycle = 0
+    assert pool.acquire() is not fresh
+    assert len(created) == 3
+
+
+class FakeAsyncConnection(FakeConnection):
+    async def close(self):
+        self.closed = True
+
+
+async def connect_async():
+    return FakeAsyncConnection()
+
+
+def test_async_pool_waits_for_a_released_connection():
+    async def scenario():
+        pool = AsyncConnectionPool(connect_async, pool_size=1, max_overflow=0, timeout=1)
+        conn = await pool.acquire()
+        waiter = asyncio.create_task(pool.acquire())
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        await pool.release(conn)
+        assert await waiter is conn
+        assert pool.stats()["checkouts"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_async_pool_times_out_when_exhausted():
+    async def scenario():
+        pool = AsyncConnectionPool(connect_async, pool_size=1, max_overflow=0, timeout=0.05)
+        await pool.acquire()
+        with pytest.raises(PoolTimeout):
+            await pool.acquire()
+        assert pool.stats()["timeouts"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_disposed_pool_closes_connections_on_release():
+    pool, _ = make_pool(pool_size=2, max_overflow=0)
+    idle, busy = pool.acquire(), pool.acquire()
+    pool.release(idle)
+    pool.dispose()
+    assert idle.closed and not busy.closed
+    pool.release(busy)
+    assert busy.closed and pool.stats()["open"] == 0
+
+
+def test_failed_reset_closes_the_connection():
+    def reset(conn):
+        raise RuntimeError("reset failed")
+
+    pool, created = make_pool(pool_size=1, max_overflow=0, reset=reset)
+    pool._reset = None
+    conn = pool.acquire()
+    pool.release(conn)
+    pool._reset = reset
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+    assert conn.closed
+    assert pool.stats()["open"] == 0 and pool.stats()["in_use"] == 0
@@ -0,0 +1,45 @@
+from datetime import date
+from backend import db_helper, delta_sync
+
+
+def test_mirror_follows_inserts_updates_and_deletes():
+    mirror = delta_sync.ExpenseMirror(lambda since: db_helper.expense_changes(since, limit=2))
+    mirror.refresh()
+    db_helper.add_expenses([(date(2024, 3, 6), "TEST_DELTA", "Self", "Expense", 1.0 + n) for n in range(3)])
+    ids = [row["id"] for row in db_helper.search_by_category("TEST_DELTA")]
+    db_helper.update_expense(ids[0], date(2024, 3, 7), "TEST_DELTA", "Moved", "Expense", 9.5)
+    db_helper.delete_expense(ids[1])
+
+    df = mirror.refresh()
+    assert mirror.since == db_helper.data_version()[0]
+    mine = df[df["category"] == "TEST_DELTA"].set_index("id")
+    assert set(mine.index) == {ids[0], ids[2]}
+    assert mine.loc[ids[0], "sub_category"] == "Moved"
+    assert mine.loc[ids[0], "updated_at"] is not None
+    assert len(df) == len(db_helper.show_all_expenses())
+
+    db_helper.delete_expense(ids[0])
+    db_helper.delete_expense(ids[2])
+    assert not (mirror.refresh()["category"] == "TEST_DELTA").any()
+
+
+def test_change_pages_do_not_split_a_version():
+    db_helper.add_expenses([(date(2024, 3, 6), "TEST_DELTA", "Self", "Expense", 1.0)] * 3)
+    version = db_helper.data_version()[0]
+    page = db_helper.expense_changes(version - 1, limit=1)
+    assert len(page["upserts"]) == 3 and page["next_since"] == version
+    for row in db_helper.search_by_category("TEST_DELTA"):
+        db_helper.delete_expense(row["id"])
+
+
+def test_pages_touch_only_the_changed_rows():
+    row = {"expense_date": date(2024, 3, 6), "category": "C", "sub_category": "Pizza", "transaction_type": "Expense",
+           "amount": 5.0, "created_at": None, "updated_at": None, "change_version": 1}
+    df = delta_sync.apply_changes(None, {"upserts": [dict(row, id=n) for n in range(1, 4)], "deletes": []})
+    df = delta_sync.apply_changes(df, {"upserts": [dict(row, id=2, amount=7.0), dict(row, id=4)],
+                                       "deletes": [{"id": 3}]})
+    assert sorted(df.index) == [1, 2, 4] and df.loc[2, "amount"] == 7.0
+
+    picked = delta_sync.select(df, sort="amount_desc", sub_category="pizz", transaction_types=[" expense"])
+    assert list(picked["id"]) == [2, 4, 1]
+    assert delta_sync.select(df, min_amount=6)["id"].tolist() == [2]
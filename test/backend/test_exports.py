@@ -0,0 +1,49 @@
+import csv
+import time
+from datetime import date
+import pytest
+from backend import exports
+
+
+@pytest.fixture(autouse=True)
+def export_dir(tmp_path, monkeypatch):
+    monkeypatch.setitem(exports.export_config, "export_dir", str(tmp_path))
+    return tmp_path
+
+
+def wait_for(job_id, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = exports.get_export(job_id)
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.02)
+    raise AssertionError("export did not finish")
+
+
+ROWS = [
+    {"id": i, "expense_date": date(2024, 1, 1), "category": "Food", "sub_category": "Lunch",
+     "transaction_type": "Expense", "amount": 10 + i}
+    for i in range(80)
+]
+
+
+def test_csv_export_writes_every_row():
+    job = wait_for(exports.start_export("csv", rows=ROWS, name="test")["id"])
+    assert job["status"] == "done" and job["rows"] == 80
+    with open(job["path"], newline="") as f:
+        lines = list(csv.reader(f))
+    assert lines[0] == exports.STANDARD_COLUMNS
+    assert len(lines) == 81
+
+
+def test_pdf_export_spans_several_pages():
+    job = wait_for(exports.start_export("pdf", rows=ROWS, name="test")["id"])
+    assert job["status"] == "done" and job["rows"] == 80
+    with open(job["path"], "rb") as f:
+        assert f.read().count(b"/Type /Page\n") >= 3
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        exports.start_export("xlsx", rows=ROWS)
@@ -0,0 +1,57 @@
+from fastapi.testclient import TestClient
+from backend import db_helper, metrics
+from backend.server import app
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = metrics.Histogram("test_seconds", "Test.", ("route",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, route="/a")
+    histogram.observe(0.5, route="/a")
+    histogram.observe(5, route="/a")
+    lines = histogram.collect()
+    assert 'test_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{route="/a",le="1.0"} 2' in lines
+    assert 'test_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'test_seconds_count{route="/a"} 3' in lines
+
+
+def test_label_values_are_escaped():
+    counter = metrics.Counter("test_total", "Test.", ("name",))
+    counter.inc(name='say "hi"\n')
+    assert counter.collect()[-1] == 'test_total{name="say \\"hi\\"\\n"} 1'
+
+
+class FakeCursor:
+    def execute(self, query, params=None):
+        self.last = (query, params)
+
+
+def test_slow_statements_are_counted(monkeypatch):
+    monkeypatch.setitem(metrics.metrics_config, "slow_query_threshold", 0)
+    before = metrics.DB_SLOW_QUERIES.collect()
+    cursor = metrics.TimedCursor(FakeCursor())
+    cursor.execute("SELECT 1 FROM expense WHERE id=%s", (7,))
+    assert cursor.last == ("SELECT 1 FROM expense WHERE id=%s", (7,))
+    assert metrics.DB_SLOW_QUERIES.collect() != before
+
+
+def test_metrics_endpoint_reports_routes_by_template():
+    client = TestClient(app)
+    client.get("/stats/cache")
+    body = client.get("/metrics").text
+    assert 'http_requests_total{method="GET",route="/stats/cache",status="200"}' in body
+    assert "# TYPE http_request_duration_seconds histogram" in body
+
+
+def test_cache_hits_are_not_timed_as_database_calls(monkeypatch):
+    monkeypatch.setattr(db_helper.result_cache, "enabled", True)
+    db_helper.result_cache.clear()
+
+    def calls():
+        series = metrics.DB_CALL_LATENCY._series.get(("search_by_category",))
+        return series[-1] if series else 0
+
+    before = calls()
+    db_helper.search_by_category("TEST_METRICS")
+    db_helper.search_by_category("TEST_METRICS")
+    assert calls() == before + 1
@@ -0,0 +1,73 @@
+import re
+from contextlib import contextmanager
+from datetime import date
+import pytest
+from backend import db_helper, migrations
+
+
+EXPLAIN = {"mysql": "EXPLAIN ", "sqlite": "EXPLAIN QUERY PLAN "}
+
+
+def uses_index(row, index):
+    """True if the plan row reads through ``index`` ("PRIMARY" for the primary key)."""
+    if "detail" in row:   # SQLite: "SEARCH expense USING [COVERING] INDEX <name> (...)"
+        if index == "PRIMARY":
+            return "USING INTEGER PRIMARY KEY" in row["detail"] or "USING PRIMARY KEY" in row["detail"]
+        return re.search(rf"USING (COVERING )?INDEX {index}\b", row["detail"]) is not None
+    return row["key"] == index
+
+
+class ExplainingCursor:
+    """Runs EXPLAIN for every query before executing it on the real cursor."""
+
+    def __init__(self, cursor, plans):
+        self._cursor = cursor
+        self._plans = plans
+
+    def execute(self, query, params=None):
+        self._cursor.execute(EXPLAIN[db_helper.get_backend().name] + query, params)
+        self._plans.append((query, self._cursor.fetchall()))
+        return self._cursor.execute(query, params)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+@pytest.fixture
+def explain(monkeypatch):
+    migrations.migrate()
+    monkeypatch.setattr(db_helper.result_cache, "enabled", False)
+    plans = []
+    real_get_connection = db_helper.get_connection
+
+    @contextmanager
+    def explaining_connection(read_only=False):
+        with real_get_connection(read_only) as cursor:
+            yield ExplainingCursor(cursor, plans)
+
+    monkeypatch.setattr(db_helper, "get_connection", explaining_connection)
+    return plans
+
+
+def test_migrations_are_recorded():
+    migrations.migrate()
+    assert {m[0] for m in migrations.MIGRATIONS} <= migrations.applied_versions()
+    assert migrations.pending_migrations() == []
+
+
+@pytest.mark.parametrize("call, index", [
+    (lambda: db_helper.search_by_id(1), "PRIMARY"),
+    (lambda: db_helper.search_by_category("Food"), "idx_expense_category_date"),
+    (lambda: db_helper.search_by_transaction_type(" expense "), "idx_expense_type_norm_date"),
+    (lambda: db_helper.filter_by_date_range(date(2024, 1, 1), date(2024, 1, 31)), "idx_expense_date"),
+    (lambda: db_helper.filter_by_amount_range(100, 200), "idx_expense_amount"),
+    (lambda: db_helper.list_expenses(10, "2024-01-31_100"), "idx_expense_date"),
+    (db_helper.total_expense_today, "idx_rollup_type_day"),
+    (db_helper.total_expense_this_month, "idx_rollup_type_day"),
+    (db_helper.total_expense_by_year, "idx_rollup_type_day"),
+])
+def test_queries_use_their_index(explain, call, index):
+    call()
+    assert explain, "no query was executed"
+    for query, plan in explain:
+        assert any(uses_index(row, index) for row in plan), f"{index} not used for: {query}\n{plan}"
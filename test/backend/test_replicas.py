@@ -0,0 +1,85 @@
+import asyncio
+import os
+import sqlite3
+from datetime import date
+import pytest
+from backend import db_async, db_helper
+
+
+@pytest.fixture
+def replicas(monkeypatch, tmp_path):
+    """The test database doubles as its own replica; a second replica cannot be opened."""
+    monkeypatch.setattr(db_helper.result_cache, "enabled", False)
+    db_helper.configure(replicas=[{"name": "local"},
+                                  {"name": "broken", "sqlite_path": str(tmp_path / "missing" / "x.db"),
+                                   "host": "unreachable.invalid"}])
+    replica_set = db_helper.get_replicas()
+    replica_set.check_all()
+    db_helper.data_version()      # replicas serve once this process knows the version to compare them with
+    yield {replica.name: replica for replica in replica_set.replicas}
+    db_helper.configure(replicas=[])
+
+
+def test_reads_use_healthy_replicas_and_writes_the_primary(replicas, monkeypatch):
+    assert replicas["local"].healthy and not replicas["broken"].healthy
+    monkeypatch.setitem(db_helper.replica_config, "read_your_writes", 0)
+    primary_before = db_helper.pool_stats()["checkouts"]
+
+    db_helper.search_by_category("TEST_REPLICA")
+    asyncio.run(db_async.search_by_category("TEST_REPLICA"))
+    assert replicas["local"].pool.stats()["checkouts"] >= 1
+    assert db_helper.pool_stats()["checkouts"] == primary_before
+
+    db_helper.add_expense(date(2024, 3, 6), "TEST_REPLICA", "Self", "Expense", 1.0)
+    assert db_helper.pool_stats()["checkouts"] > primary_before
+    for row in db_helper.search_by_category("TEST_REPLICA"):
+        db_helper.delete_expense(row["id"])
+
+
+def test_recent_writer_reads_the_primary(replicas, monkeypatch):
+    db_helper.add_expense(date(2024, 3, 6), "TEST_REPLICA", "Self", "Expense", 1.0)
+    assert db_helper.read_replica() is None       # within read_your_writes of the write
+    monkeypatch.setitem(db_helper.replica_config, "read_your_writes", 0)
+    assert db_helper.read_replica() is replicas["local"]
+    for row in db_helper.search_by_category("TEST_REPLICA"):
+        db_helper.delete_expense(row["id"])
+
+
+@pytest.mark.skipif(os.environ.get("BILANCIO_TEST_DB_ENGINE", "sqlite") != "sqlite",
+                    reason="copies the SQLite file to make a lagging replica")
+def test_lagging_replica_is_checked_at_read_time(monkeypatch, tmp_path):
+    monkeypatch.setattr(db_helper.result_cache, "enabled", False)
+    monkeypatch.setitem(db_helper.replica_config, "read_your_writes", 0)
+    copy = tmp_path / "replica.db"
+
+    def replicate():
+        source, target = sqlite3.connect(db_helper.get_backend().path), sqlite3.connect(copy)
+        source.backup(target)
+        source.close()
+        target.close()
+
+    replicate()
+    db_helper.configure(replicas=[{"name": "copy", "sqlite_path": str(copy)}])
+    try:
+        replica = db_helper.get_replicas().replicas[0]
+        db_helper.get_replicas().check_all()
+        db_helper.add_expense(date(2024, 3, 6), "TEST_REPLICA", "Self", "Expense", 1.0)    # not on the copy
+
+        replica_before = replica.pool.stats()["checkouts"]
+        primary_before = db_helper.pool_stats()["checkouts"]
+        assert len(db_helper.search_by_category("TEST_REPLICA")) == 1
+        assert len(asyncio.run(db_async.search_by_category("TEST_REPLICA"))) == 1
+        assert replica.pool.stats()["checkouts"] == replica_before + 1     # asked, found behind
+        assert db_helper.pool_stats()["checkouts"] == primary_before + 1
+
+        replica.pool.dispose()
+        replicate()               # caught up, though no health check has seen it yet
+        primary_before = db_helper.pool_stats()["checkouts"]
+        assert len(db_helper.search_by_category("TEST_REPLICA")) == 1
+        assert db_helper.pool_stats()["checkouts"] == primary_before
+        assert replica.version == db_helper.data_version()[0]
+    finally:
+        asyncio.run(db_async.dispose_pool())
+        db_helper.configure(replicas=[])
+        for row in db_helper.search_by_category("TEST_REPLICA"):
+            db_helper.delete_expense(row["id"])
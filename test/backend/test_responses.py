@@ -0,0 +1,32 @@
+import json
+from datetime import date
+from decimal import Decimal
+from fastapi.testclient import TestClient
+from backend import db_helper, responses
+from backend.server import app
+
+
+def test_render_matches_the_default_encoding():
+    row = {"id": 1, "expense_date": date(2024, 3, 6), "amount": Decimal("12.50"), "whole": Decimal("5")}
+    assert json.loads(responses.render_json(row)) == {
+        "id": 1, "expense_date": "2024-03-06", "amount": 12.5, "whole": 5}
+
+
+def test_to_columns():
+    rows = [{"id": 1, "amount": 2}, {"id": 3, "amount": 4}]
+    assert responses.to_columns(rows) == {"columns": ["id", "amount"], "rows": [[1, 2], [3, 4]]}
+    assert responses.to_columns([]) == {"columns": [], "rows": []}
+
+
+def test_large_responses_are_compressed(monkeypatch):
+    monkeypatch.setitem(responses.response_config, "compress_min_size", 0)
+    db_helper.add_expense(date(2024, 3, 6), "TEST_GZIP", "Self", "Expense", 3.5)
+    client = TestClient(app)
+    response = client.get("/expenses/category/TEST_GZIP?shape=columns", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    body = response.json()      # decoded transparently by the client
+    assert body["columns"][0] == "id" and body["rows"][0][5] == 3.5
+
+    raw = client.get("/expenses/category/TEST_GZIP", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in raw.headers
+    db_helper.delete_expense(body["rows"][0][0])
@@ -0,0 +1,56 @@
+from datetime import date
+from decimal import Decimal
+import pytest
+from backend import storage
+
+
+@pytest.fixture
+def sqlite_backend(tmp_path):
+    return storage.SQLiteBackend(str(tmp_path / "storage.db"))
+
+
+def test_sqlite_cursor_accepts_percent_placeholders(sqlite_backend):
+    connection = sqlite_backend.connect()
+    cursor = sqlite_backend.cursor(connection)
+    cursor.execute("CREATE TABLE t (day DATE, amount DECIMAL(10,2))")
+    cursor.executemany("INSERT INTO t VALUES (%s, %s)", [(date(2024, 3, 6), Decimal("10.25"))])
+    cursor.execute("SELECT day, amount FROM t WHERE day = %s", (date(2024, 3, 6),))
+    assert cursor.fetchone() == {"day": date(2024, 3, 6), "amount": Decimal("10.25")}
+    connection.close()
+
+
+@pytest.mark.parametrize("bucket, expected", [
+    ("day", "2024-03-06"), ("week", "2024-03-04"), ("month", "2024-03-01"),
+])
+def test_sqlite_date_buckets(sqlite_backend, bucket, expected):
+    connection = sqlite_backend.connect()
+    cursor = sqlite_backend.cursor(connection)
+    cursor.execute("CREATE TABLE t (day DATE)")
+    cursor.execute("INSERT INTO t VALUES (%s)", (date(2024, 3, 6),))    # a Wednesday
+    cursor.execute(f"SELECT {sqlite_backend.date_bucket(bucket, 'day')} AS period FROM t")
+    assert str(cursor.fetchone()["period"]) == expected
+    connection.close()
+
+
+def test_unknown_engine_is_rejected():
+    with pytest.raises(ValueError):
+        storage.create_backend({"engine": "oracle"}, {})
+
+
+def test_sqlite_snapshot_ignores_later_commits(sqlite_backend):
+    reader, writer = sqlite_backend.connect(), sqlite_backend.connect()
+    writer.execute("CREATE TABLE t (n INTEGER)")
+    writer.commit()
+    cursor = sqlite_backend.cursor(reader)
+    sqlite_backend.begin_snapshot(cursor)
+    cursor.execute("SELECT COUNT(*) AS n FROM t")
+    assert cursor.fetchone()["n"] == 0
+    writer.execute("INSERT INTO t VALUES (1)")
+    writer.commit()
+    cursor.execute("SELECT COUNT(*) AS n FROM t")
+    assert cursor.fetchone()["n"] == 0
+    reader.commit()
+    cursor.execute("SELECT COUNT(*) AS n FROM t")
+    assert cursor.fetchone()["n"] == 1
+    reader.close()
+    writer.close()
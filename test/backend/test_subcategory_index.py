@@ -0,0 +1,58 @@
+import threading
+from datetime import date
+from fastapi.testclient import TestClient
+from backend import db_helper
+from backend.server import app
+from backend.subcategory_index import SubCategoryIndex
+
+
+def test_index_matches_substrings_and_follows_changes():
+    index = SubCategoryIndex()
+    index.load([{"id": 1, "sub_category": "Pizza"}, {"id": 2, "sub_category": "pizza hut"},
+                {"id": 3, "sub_category": "Uber"}], version=1)
+    assert index.matching_ids("IZZ") == {1, 2}
+    assert index.matching_ids("ub") == {3}
+    assert [s["sub_category"] for s in index.suggest("pi")] == ["Pizza", "pizza hut"]
+    assert [s["sub_category"] for s in index.suggest("hut")] == ["pizza hut"]
+
+    index.apply({"upserts": [{"id": 3, "sub_category": "Pizza"}], "deletes": [{"id": 2}],
+                 "next_since": 2, "has_more": False})
+    assert index.matching_ids("pizza") == {1, 3}
+    assert index.suggest("hut") == []
+    assert index.suggest("pi") == [{"sub_category": "Pizza", "count": 2}]
+
+
+def test_search_and_suggest_see_new_writes():
+    db_helper.add_expense(date(2024, 3, 6), "TEST_SUGGEST", "Zanzibar Trip", "Expense", 3.0)
+    assert [row["sub_category"] for row in db_helper.search_by_sub_category("nzib")] == ["Zanzibar Trip"]
+    response = TestClient(app).get("/suggest/sub_category", params={"q": "zanz"})
+    assert response.json() == [{"sub_category": "Zanzibar Trip", "count": 1}]
+
+    for row in db_helper.search_by_category("TEST_SUGGEST"):
+        db_helper.delete_expense(row["id"])
+    assert db_helper.search_by_sub_category("nzib") == []
+
+
+def test_lookups_run_safely_while_changes_are_applied():
+    index = SubCategoryIndex()
+    index.load([{"id": n, "sub_category": f"value {n}"} for n in range(200)], version=1)
+    errors, done = [], threading.Event()
+
+    def read():
+        try:
+            while not done.is_set():
+                index.suggest("val", limit=5)
+                index.matching_ids("lue 1")
+        except Exception as e:      # e.g. "dictionary changed size during iteration"
+            errors.append(e)
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    for n in range(200, 2000):
+        index.apply({"upserts": [{"id": n, "sub_category": f"value {n}"}], "deletes": [{"id": n - 200}],
+                     "next_since": n, "has_more": False})
+    index.load([{"id": 1, "sub_category": "Pizza"}], version=2)
+    done.set()
+    reader.join()
+    assert errors == []
+    assert index.matching_ids("pizz") == {1} and index.suggest("val") == []
@@ -0,0 +1,43 @@
+import asyncio
+import threading
+from datetime import date
+import pytest
+from backend import db_helper, rollup
+from backend.write_queue import GroupCommitQueue, QueueFull
+
+
+def test_concurrent_submits_share_commits_and_get_their_own_ids():
+    row = {"expense_date": date(2024, 3, 6), "category": "TEST_QUEUE", "sub_category": "Self",
+           "transaction_type": "Expense", "amount": 1.5}
+
+    async def scenario():
+        queue = GroupCommitQueue(db_helper.insert_expenses, max_batch=20, max_delay=0.05)
+        ids = await asyncio.gather(*(queue.submit({**row, "sub_category": f"n{n}"}) for n in range(50)))
+        return ids, queue.stats()
+
+    ids, stats = asyncio.run(scenario())
+    assert len(set(ids)) == 50 and stats["rows"] == 50 and stats["batches"] < 50
+    assert [db_helper.search_by_id(id)["sub_category"] for id in ids] == [f"n{n}" for n in range(50)]
+    assert rollup.verify() == []
+    db_helper.delete_expenses(ids=ids)
+
+
+def test_full_queue_pushes_back():
+    release = threading.Event()
+
+    def slow_insert(rows):
+        release.wait(5)
+        return list(range(len(rows)))
+
+    async def scenario():
+        queue = GroupCommitQueue(slow_insert, max_batch=1, max_delay=0, max_queue=1, put_timeout=0.05)
+        first = asyncio.ensure_future(queue.submit("a"))     # taken by the flusher
+        await asyncio.sleep(0.01)
+        second = asyncio.ensure_future(queue.submit("b"))    # fills the queue
+        await asyncio.sleep(0.01)
+        with pytest.raises(QueueFull):
+            await queue.submit("c")
+        release.set()
+        return await first, await second
+
+    assert asyncio.run(scenario()) == (0, 0)
@@ -0,0 +1,32 @@
+from datetime import date
+from benchmarks.generator import generate_expenses
+from benchmarks.harness import summarize
+
+
+def test_same_seed_gives_same_rows():
+    assert list(generate_expenses(500, seed=3)) == list(generate_expenses(500, seed=3))
+    assert list(generate_expenses(500, seed=3)) != list(generate_expenses(500, seed=4))
+
+
+def test_rows_respect_range_and_mix():
+    start, end = date(2020, 1, 1), date(2020, 12, 31)
+    rows = list(generate_expenses(5000, seed=1, start=start, end=end, income_ratio=0.2))
+    assert len(rows) == 5000
+    assert all(start <= r[0] <= end for r in rows)
+    assert all(r[4] >= 1 for r in rows)
+    income_share = sum(r[3] == "Income" for r in rows) / len(rows)
+    assert 0.17 < income_share < 0.23
+
+
+def test_recency_skew_favours_recent_dates():
+    start, end = date(2010, 1, 1), date(2019, 12, 31)
+    rows = list(generate_expenses(5000, seed=1, start=start, end=end, recency_skew=3))
+    recent = sum(r[0].year >= 2015 for r in rows)
+    assert recent > 0.7 * len(rows)
+
+
+def test_summarize_reports_percentiles():
+    stats = summarize([i / 1000 for i in range(1, 101)])
+    assert stats["calls"] == 100
+    assert stats["p50_ms"] < stats["p95_ms"] < stats["p99_ms"] <= stats["max_ms"]
+    assert stats["throughput_per_s"] > 0
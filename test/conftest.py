@@ -1,10 +1,27 @@
 import os
 import sys
 
+import pytest
+
 if __name__ == "__main__":
 
     root_folder = os.path.dirname(os.path.dirname(__file__))
 
     print(f"Project root: {root_folder}")
     sys.path.insert(0, root_folder)
-    print(sys.path)
\ No newline at end of file
+    print(sys.path)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def test_database(tmp_path_factory):
+    """Run the suite against a throwaway SQLite file unless BILANCIO_TEST_DB_ENGINE picks another engine."""
+    from backend import db_helper, migrations
+
+    engine = os.environ.get("BILANCIO_TEST_DB_ENGINE", "sqlite")
+    if engine == "sqlite":
+        db_helper.configure(engine="sqlite", sqlite_path=str(tmp_path_factory.mktemp("db") / "expense.db"))
+    else:
+        db_helper.configure(engine=engine)
+    migrations.migrate()
+    yield db_helper.get_backend()
+    db_helper.reset_pool()
@@ -0,0 +1,54 @@
+import json
+import logging
+import logging_setup
+from logging_setup import JsonFormatter, SamplingFilter, sampled, setup_logger
+
+
+def make_record(msg, *args, **extra):
+    record = logging.LogRecord("sample_test", logging.INFO, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_sampling_keeps_one_in_n():
+    sampler = SamplingFilter()
+    kept = [sampler.filter(make_record("hot path", **sampled(10))) for _ in range(100)]
+    assert sum(kept) == 10
+    assert all(sampler.filter(make_record("rare message")) for _ in range(5))
+
+
+def test_json_formatter_includes_extra_fields():
+    record = make_record("Inserted %s rows", 5, batches=2)
+    payload = json.loads(JsonFormatter().format(record))
+    assert payload["message"] == "Inserted 5 rows"
+    assert payload["batches"] == 2
+    assert payload["logger"] == "sample_test"
+
+
+def test_setup_logger_is_idempotent_and_uses_per_logger_level(monkeypatch):
+    monkeypatch.setitem(logging_setup.log_config, "levels", {"quiet_logger": "warning"})
+    logger = setup_logger("quiet_logger")
+    setup_logger("quiet_logger")
+    queue_handlers = [h for h in logger.handlers if isinstance(h, logging_setup.LazyQueueHandler)]
+    assert len(queue_handlers) == 1
+    assert logger.level == logging.WARNING
+
+
+def test_log_file_rotates_with_one_writer_per_file(monkeypatch, tmp_path):
+    monkeypatch.setitem(logging_setup.log_config, "log_dir", str(tmp_path))
+    file_handler = logging_setup._build_handlers("own.log")[0]
+    assert isinstance(file_handler, logging.handlers.RotatingFileHandler)
+    assert file_handler.baseFilename == str(tmp_path / "own.log")
+    file_handler.close()
+
+    # Another process already writes shared.log: this one takes the next free slot
+    with open(tmp_path / "shared.log.lock", "a+b") as other:
+        assert logging_setup._try_lock(other)
+        file_handler = logging_setup._build_handlers("shared.log")[0]
+    assert file_handler.baseFilename == str(tmp_path / "shared.1.log")
+    file_handler.close()
+
+    monkeypatch.setitem(logging_setup.log_config, "rotate", False)
+    file_handler = logging_setup._build_handlers("logrotated.log")[0]
+    assert type(file_handler) is logging.handlers.WatchedFileHandler
+    file_handler.close()